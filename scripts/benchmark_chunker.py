@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark Chunker
+
+This script compares the original BeautifulSoup + fixed-window chunking of the
+n8n integration with the streaming HTML→text→chunk pipeline on large pages,
+reporting wall time, peak Python memory and chunk statistics.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add src/python to path to allow its flat imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'python')))
+
+import tiktoken
+from bs4 import BeautifulSoup
+
+from text_chunker import chunk_file
+
+WORDS = ("workflow node trigger webhook credential agent embedding vector chunk "
+         "token crawler page sitemap analysis template integration").split()
+
+def generate_html(path, size_mb, seed=0):
+    """
+    Write a synthetic article-like HTML page.
+
+    Args:
+        path: Output file
+        size_mb: Approximate size in megabytes
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("<html><head><style>p { color: red; }</style></head><body>\n")
+        while written < target:
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+                for _ in range(rng.randint(2, 8))
+            ]
+            block = f"<h2>Section</h2><p>{' '.join(sentences)}</p>\n<script>var x = {written};</script>\n"
+            f.write(block)
+            written += len(block)
+        f.write("</body></html>\n")
+
+def legacy_chunks(path, encoding, chunk_size):
+    """Original pipeline: read whole file, BeautifulSoup, encode everything, fixed windows."""
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    soup = BeautifulSoup(html, 'lxml')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    phrases = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(phrase for phrase in phrases if phrase)
+
+    tokens = encoding.encode(text)
+    return [encoding.decode(tokens[i:i + chunk_size]) for i in range(0, len(tokens), chunk_size)]
+
+def streaming_chunks(path, encoding, chunk_size, overlap):
+    """Streaming pipeline from text_chunker."""
+    return list(chunk_file(path, encoding, chunk_size, overlap))
+
+def measure(name, func, encoding):
+    """Run func under tracemalloc and print timing, memory and chunk statistics."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sizes = [len(encoding.encode(chunk)) for chunk in chunks]
+    print(f"{name:10s} {elapsed:8.2f}s  peak {peak / 1024 / 1024:8.1f} MB  "
+          f"{len(chunks):6d} chunks  max {max(sizes, default=0):5d} tokens  "
+          f"mean {sum(sizes) / max(len(sizes), 1):7.1f} tokens")
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Benchmark Chunker")
+    parser.add_argument("--html", help="HTML file to chunk (default: generate a synthetic page)")
+    parser.add_argument("--size-mb", type=int, default=20, help="Size of the synthetic page")
+    parser.add_argument("--chunk-size", type=int, default=512, help="Tokens per chunk")
+    parser.add_argument("--overlap", type=int, default=64, help="Overlapping tokens between chunks")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only run the streaming pipeline")
+    args = parser.parse_args()
+
+    encoding = tiktoken.get_encoding("cl100k_base")
+
+    path = args.html
+    temp_dir = None
+    if not path:
+        temp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(temp_dir.name, "page.html")
+        generate_html(path, args.size_mb)
+
+    try:
+        print(f"Chunking {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+        if not args.skip_legacy:
+            measure("legacy", lambda: legacy_chunks(path, encoding, args.chunk_size), encoding)
+        measure("streaming", lambda: streaming_chunks(path, encoding, args.chunk_size, args.overlap), encoding)
+    finally:
+        if temp_dir:
+            temp_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Benchmark Pipeline
+
+This script measures end-to-end throughput of the batch pipeline
+(batch_workflow_processor --pipeline) without network access. Workflow pages
+are served by a local fixture server built from the samples in workflows/ and
+any recorded n8n.io pages, and LLM calls go to the OpenRouter stub server. The
+pipeline is run once per concurrency level and each run reports workflows/sec,
+per-stage p50/p95/p99 latency, CPU use and peak RSS. Results are saved as JSON
+and can be compared against a baseline to catch regressions.
+
+Usage:
+    python scripts/benchmark_pipeline.py --workflows 200 --concurrency 1,4,16
+    python scripts/benchmark_pipeline.py --baseline benchmarks/results/<earlier run>.json
+    python scripts/benchmark_pipeline.py --record 2859,2529   # save live n8n.io pages as fixtures
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import html
+import io
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import psutil
+from aiohttp import web
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, REPO_ROOT)
+
+from src.utils.config import get_settings
+from src.utils.openrouter_stub import parse_latency, start_stub_server
+
+STAGES = ("fetch", "extract", "repair", "analyze", "write", "llm_request")
+PERCENTILES = ("p50", "p95", "p99")
+
+def load_fixtures(workflows_dir, pages_dir=None):
+    """
+    Load the fixture pages.
+
+    Sample workflows become synthetic n8n.io pages; files that do not parse are
+    kept as they are, so malformed samples exercise the JSON repair path.
+    Recorded pages (<name>.html) are served unchanged.
+
+    Args:
+        workflows_dir: Directory with sample workflow JSON files
+        pages_dir: Directory with recorded n8n.io pages
+
+    Returns:
+        list: (name, kind, content) with kind "workflow" (JSON text) or "page" (HTML)
+    """
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(workflows_dir, "*.json"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read().strip()
+        if len(text) < 2:
+            continue
+        try:
+            workflow = json.loads(text)
+        except json.JSONDecodeError:
+            # Malformed samples still need something that looks like nodes to be worth repairing
+            if '"nodes"' in text:
+                fixtures.append((os.path.basename(path), "workflow", text))
+            continue
+        if isinstance(workflow, dict) and isinstance(workflow.get("nodes"), list) and workflow["nodes"]:
+            fixtures.append((os.path.basename(path), "workflow", text))
+
+    if pages_dir:
+        for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+            with open(path, 'r', encoding='utf-8') as f:
+                fixtures.append((os.path.basename(path), "page", f.read()))
+    return fixtures
+
+def render_page(workflow_id, name, kind, content):
+    """
+    Render the page of one benchmark workflow.
+
+    The workflow name gets the workflow ID appended, so no two prompts are
+    identical and the LLM single-flight does not coalesce them.
+    """
+    if kind == "page":
+        return content
+    content = re.sub(r'"name"\s*:\s*"', f'"name": "#{workflow_id} ', content, count=1)
+    title = html.escape(f"{name} #{workflow_id}")
+    return (
+        f"<html><head><title>{title}</title></head><body>"
+        f"<div class=\"workflow-container\"><h1 class=\"workflow-title\">{title}</h1>"
+        f"<div class=\"workflow-description\">Benchmark fixture {html.escape(name)}</div>"
+        f"<n8n-demo workflow=\"{html.escape(content, quote=True)}\"></n8n-demo>"
+        f"</div></body></html>"
+    )
+
+async def start_fixture_server(pages, latency="0", host="127.0.0.1"):
+    """
+    Serve workflow pages at /workflows/{workflow_id}.
+
+    Args:
+        pages: {workflow_id: HTML}
+        latency: Response latency distribution (see parse_latency)
+        host: Host to bind
+
+    Returns:
+        tuple: (AppRunner to clean up, base URL for N8N_BASE_URL)
+    """
+    sample_latency = parse_latency(latency)
+
+    async def get_workflow(request):
+        page = pages.get(request.match_info["workflow_id"])
+        if page is None:
+            return web.Response(status=404, text="Workflow not found")
+        await asyncio.sleep(sample_latency())
+        return web.Response(text=page, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/workflows/{workflow_id}", get_workflow)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, 0)
+    await site.start()
+    return runner, f"http://{host}:{runner.addresses[0][1]}"
+
+def record_pages(workflow_ids, pages_dir):
+    """Download live n8n.io workflow pages into pages_dir as fixtures."""
+    import requests
+    os.makedirs(pages_dir, exist_ok=True)
+    for workflow_id in workflow_ids:
+        response = requests.get(f"https://n8n.io/workflows/{workflow_id}", timeout=30)
+        response.raise_for_status()
+        path = os.path.join(pages_dir, f"{workflow_id}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f"Recorded {path} ({len(response.text) / 1024:.0f} KB)")
+
+class ResourceSampler:
+    """
+    Samples CPU time and RSS of this process and its children (parse workers)
+    in a background thread.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.cpu = {}
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        rss = 0
+        for process in [self.process] + self.process.children(recursive=True):
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+            # Keep the last reading per process; children may exit before the run ends
+            self.cpu[process.pid] = times.user + times.system
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._start_cpu = dict(self.cpu)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    @property
+    def cpu_seconds(self):
+        """CPU time used since the sampler started."""
+        return sum(seconds - self._start_cpu.get(pid, 0.0) for pid, seconds in self.cpu.items())
+
+def reset_process_state():
+    """Give every run fresh routing stats, breakers, hedge latencies and stage spans."""
+    from src.utils import circuit_breaker, hedging, model_router
+    from src.utils.tracing import configure_tracing
+    with circuit_breaker._breakers_lock:
+        circuit_breaker._breakers.clear()
+    hedging._tracker = hedging.LatencyTracker()
+    model_router._router = model_router.ModelRouter()
+    return configure_tracing(None, service_name="benchmark")
+
+async def run_level(concurrency, workflow_ids, args, work_dir):
+    """
+    Run the pipeline over every benchmark workflow at one concurrency level.
+
+    Args:
+        concurrency: Fetch and LLM workers (parsers and writers scale with it)
+        workflow_ids: Workflows to process
+        args: Parsed arguments
+        work_dir: Scratch directory of this run
+
+    Returns:
+        dict: Run results
+    """
+    # Imported late so the processors pick up the stub URL and API key from the environment
+    from src.processors.pipeline import WorkflowPipeline
+    from src.utils.output_manager import OutputManager
+    from src.utils.smart_queue import SmartQueue
+
+    tracer = reset_process_state()
+    queue = SmartQueue(queue_file=os.path.join(work_dir, "queue.json"),
+                       completed_file=os.path.join(work_dir, "completed.json"))
+    await queue.add_jobs([f"https://n8n.io/workflows/{workflow_id}" for workflow_id in workflow_ids])
+    processor = WorkflowPipeline(
+        fetchers=concurrency,
+        parsers=min(concurrency, os.cpu_count() or 1),
+        llm_workers=concurrency,
+        writers=max(1, concurrency // 2),
+        analysis_batch_size=args.analysis_batch_size,
+        force=True,
+        output_manager=OutputManager(output_dir=os.path.join(work_dir, "output")),
+        poll_interval=0.05,
+    )
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with ResourceSampler() as sampler, output:
+        start_time = time.perf_counter()
+        await processor.process_queue(queue, drain=True)
+        wall = time.perf_counter() - start_time
+
+    spans = tracer.get_stats()
+    stats = processor.stats
+    return {
+        "concurrency": concurrency,
+        "workflows": len(workflow_ids),
+        "succeeded": stats["urls_succeeded"],
+        "failed": stats["urls_failed"],
+        "skipped": stats["urls_skipped"],
+        "wall_seconds": round(wall, 3),
+        "workflows_per_second": round(stats["urls_succeeded"] / wall, 3) if wall else 0,
+        "cpu_seconds": round(sampler.cpu_seconds, 3),
+        "cpu_percent": round(100 * sampler.cpu_seconds / wall, 1) if wall else 0,
+        "peak_rss_mb": round(sampler.peak_rss / 1024 / 1024, 1),
+        "stages": {
+            name: {"count": spans[name]["count"], **{pct: spans[name][pct] for pct in PERCENTILES}}
+            for name in STAGES if name in spans
+        },
+    }
+
+def print_run(run):
+    """Print the summary of one run."""
+    print(f"\nconcurrency {run['concurrency']:3d}: {run['workflows_per_second']:8.2f} workflows/s  "
+          f"{run['succeeded']}/{run['workflows']} ok  wall {run['wall_seconds']:.2f}s  "
+          f"cpu {run['cpu_percent']:.0f}%  peak RSS {run['peak_rss_mb']:.0f} MB")
+    for name, stage in run["stages"].items():
+        values = "  ".join(f"{pct} {stage[pct] * 1000:8.1f} ms" for pct in PERCENTILES)
+        print(f"    {name:12s} n={stage['count']:5d}  {values}")
+
+def compare(results, baseline, threshold):
+    """
+    Compare runs with the runs of a baseline at the same concurrency.
+
+    Throughput may not drop, and stage p95 latency and peak RSS may not grow,
+    by more than threshold (a fraction).
+
+    Returns:
+        list: Regression descriptions
+    """
+    regressions = []
+    baseline_runs = {run["concurrency"]: run for run in baseline.get("runs", [])}
+    print(f"\nComparison with baseline from {baseline.get('started_at')} ({baseline.get('git_commit')}):")
+    for run in results["runs"]:
+        before = baseline_runs.get(run["concurrency"])
+        if not before:
+            continue
+        checks = [("workflows/s", before["workflows_per_second"], run["workflows_per_second"], False),
+                  ("peak RSS MB", before["peak_rss_mb"], run["peak_rss_mb"], True)]
+        checks += [(f"{name} p95", before["stages"][name]["p95"], stage["p95"], True)
+                   for name, stage in run["stages"].items() if name in before.get("stages", {})]
+        for label, old, new, higher_is_worse in checks:
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if higher_is_worse else change < -threshold
+            flag = "  REGRESSION" if worse else ""
+            print(f"    concurrency {run['concurrency']:3d} {label:20s} {old:10.4f} -> {new:10.4f} "
+                  f"({change:+.1%}){flag}")
+            if worse:
+                regressions.append(f"concurrency {run['concurrency']} {label} {change:+.1%}")
+    return regressions
+
+def git_commit():
+    """Return the current commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_benchmark(args):
+    """Start the fixture and stub servers and run every concurrency level."""
+    fixtures = load_fixtures(args.workflows_dir, args.pages_dir)
+    if not fixtures:
+        raise SystemExit(f"No fixtures found in {args.workflows_dir} or {args.pages_dir}")
+    workflow_ids = [str(100000 + index) for index in range(args.workflows)]
+    pages = {workflow_id: render_page(workflow_id, *fixtures[index % len(fixtures)])
+             for index, workflow_id in enumerate(workflow_ids)}
+
+    profiles = {"default": {"latency": args.llm_latency, "token_delay": args.token_delay,
+                            "error_rate": args.llm_error_rate}}
+    if args.stub_config:
+        with open(args.stub_config, 'r', encoding='utf-8') as f:
+            profiles = json.load(f)
+    fixture_runner, n8n_base_url = await start_fixture_server(pages, args.page_latency)
+    stub_runner, openrouter_base_url, stub = await start_stub_server(port=0, profiles=profiles, seed=args.seed)
+    os.environ.update({"OPENROUTER_BASE_URL": openrouter_base_url, "OPENROUTER_API_KEY": "stub"})
+    # Settings may already be loaded, so the rest is set on the settings object
+    settings = get_settings()
+    settings.n8n_base_url = n8n_base_url
+    settings.llm_budget_file = ""
+    settings.mirror_dir = ""
+
+    results = {
+        "started_at": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "record")},
+        "fixtures": [name for name, _, _ in fixtures],
+        "runs": [],
+    }
+    print(f"Benchmarking {args.workflows} workflows from {len(fixtures)} fixtures "
+          f"at concurrency {', '.join(map(str, args.concurrency))}")
+    try:
+        with tempfile.TemporaryDirectory(prefix="benchmark-") as temp_dir:
+            # The processors keep their state (manifest, corpus index, logs) and find their prompt
+            # templates relative to the working directory
+            previous_dir = os.getcwd()
+            os.chdir(temp_dir)
+            os.symlink(os.path.join(REPO_ROOT, "cline_docs"), os.path.join(temp_dir, "cline_docs"))
+            try:
+                for concurrency in args.concurrency:
+                    work_dir = os.path.join(temp_dir, f"run-{concurrency}")
+                    os.makedirs(work_dir)
+                    run = await run_level(concurrency, workflow_ids, args, work_dir)
+                    run["llm_requests"] = {f"{model}/{outcome}": count
+                                           for (model, outcome), count in sorted(stub.stats.items())}
+                    stub.stats.clear()
+                    results["runs"].append(run)
+                    print_run(run)
+            finally:
+                os.chdir(previous_dir)
+    finally:
+        await stub_runner.cleanup()
+        await fixture_runner.cleanup()
+    return results
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Benchmark Pipeline")
+    parser.add_argument("--workflows", type=int, default=100, help="Workflows processed per run")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        help="Comma-separated concurrency levels (fetch and LLM workers)")
+    parser.add_argument("--workflows-dir", default=os.path.join(REPO_ROOT, "workflows"),
+                        help="Sample workflow JSON files to build fixture pages from")
+    parser.add_argument("--pages-dir", default=os.path.join(REPO_ROOT, "benchmarks", "pages"),
+                        help="Recorded n8n.io pages (<name>.html) to serve as well")
+    parser.add_argument("--record", help="Comma-separated workflow IDs to download into --pages-dir, then exit")
+    parser.add_argument("--page-latency", default="uniform:0.02,0.1", help="Fixture page latency distribution")
+    parser.add_argument("--llm-latency", default="lognormal:0.3,0.4", help="Stub LLM latency distribution")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Stub delay between streamed chunks")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of stub LLM requests that fail")
+    parser.add_argument("--stub-config", help="Stub profiles JSON (overrides the --llm-* options)")
+    parser.add_argument("--analysis-batch-size", type=int, default=None,
+                        help="Small workflows analyzed per LLM request (default from settings)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the stub")
+    parser.add_argument("--results-dir", default=os.path.join(REPO_ROOT, "benchmarks", "results"),
+                        help="Directory the results JSON is saved to")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Show the processors' output")
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    if args.record:
+        record_pages([workflow_id.strip() for workflow_id in args.record.split(",")], args.pages_dir)
+        return
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    results = asyncio.run(run_benchmark(args))
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    path = os.path.join(args.results_dir, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
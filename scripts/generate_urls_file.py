@@ -10,9 +10,12 @@ import argparse
 import json
 import os
 import random
-import requests
-import xml.etree.ElementTree as ET
-from urllib.parse import urlparse
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.sitemap import is_workflow_url, iter_sitemap_urls_sync
 
 def fetch_urls_from_sitemap(sitemap_url="https://n8n.io/sitemap-workflows.xml", max_urls=None):
     """
@@ -27,28 +30,17 @@ def fetch_urls_from_sitemap(sitemap_url="https://n8n.io/sitemap-workflows.xml",
     """
     try:
         print(f"Fetching URLs from {sitemap_url}...")
-        response = requests.get(sitemap_url, timeout=30)
-        response.raise_for_status()
-        
-        # Parse XML
-        root = ET.fromstring(response.content)
-        
-        # Extract URLs from <loc> tags
-        # The namespace is typically in the format {http://www.sitemaps.org/schemas/sitemap/0.9}
-        namespace = root.tag.split('}')[0] + '}'
         urls = []
         
-        for url_element in root.findall(f'.//{namespace}url'):
-            loc_element = url_element.find(f'{namespace}loc')
-            if loc_element is not None and loc_element.text:
-                # Ensure it's a workflow URL
-                parsed_url = urlparse(loc_element.text)
-                if '/workflows/' in parsed_url.path:
-                    urls.append(loc_element.text)
-                    
-                    # Break if we've reached the maximum
-                    if max_urls and len(urls) >= max_urls:
-                        break
+        # Stream <loc> entries (following sitemap indexes and .xml.gz files)
+        # instead of loading the whole document into memory
+        for batch in iter_sitemap_urls_sync(sitemap_url, url_filter=is_workflow_url):
+            urls.extend(batch)
+            
+            # Stop early if we've reached the maximum
+            if max_urls and len(urls) >= max_urls:
+                urls = urls[:max_urls]
+                break
         
         print(f"Found {len(urls)} workflow URLs in sitemap")
         return urls
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Prompt Token Report
+
+This script compares the token count of the original analysis prompt
+(indented workflow JSON rendered into the template) with the compact,
+token-budgeted prompt for every workflow JSON file in a directory.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.config import get_settings
+from src.utils.prompt_builder import PromptBuilder, count_tokens, _get_encoding
+from src.processors.n8n_workflow_processor import load_analysis_template, render_template
+
+def legacy_prompt(template, workflow_json):
+    """Render the prompt the way analyze_workflow_json did before the prompt builder."""
+    nodes = [{"name": node.get("name", "Unnamed Node"), "type": node.get("type", "Unknown Type")}
+             for node in workflow_json.get("nodes", [])]
+    return render_template(
+        template,
+        workflow_json=json.dumps(workflow_json, indent=2),
+        nodes=nodes,
+        workflow_name=workflow_json.get("name", "Unknown Workflow")
+    )
+
+def load_workflows(directory):
+    """Yield (file name, workflow JSON) for files that parse and contain nodes."""
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        # Consolidated files keep the workflow under scraped_data
+        if isinstance(data, dict) and "nodes" not in data:
+            data = data.get("scraped_data", {}).get("workflow", {}).get("json") or data
+        if isinstance(data, dict) and isinstance(data.get("nodes"), list) and data["nodes"] and "connections" in data:
+            yield os.path.basename(path), data
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Prompt Token Report")
+    parser.add_argument("--dir", default="workflows", help="Directory with workflow JSON files")
+    parser.add_argument("--model", default=get_settings().default_model, help="Model whose tokenizer and budget are used")
+    parser.add_argument("--template", default=None, help="Path to analysis template file")
+    args = parser.parse_args()
+
+    template = load_analysis_template(args.template)
+    builder = PromptBuilder(template, args.model)
+    tokenizer = "tiktoken" if _get_encoding(args.model) else "chars/4 estimate"
+    print(f"Model: {args.model}  budget: {builder.budget} tokens  tokenizer: {tokenizer}\n")
+    print(f"{'workflow':60s} {'nodes':>5s} {'before':>7s} {'after':>7s} {'saved':>6s}")
+
+    total_before = total_after = 0
+    for name, workflow_json in load_workflows(args.dir):
+        before = count_tokens(legacy_prompt(template, workflow_json), args.model)
+        built = builder.build(workflow_json)
+        total_before += before
+        total_after += built["tokens"]
+        flag = "" if built["fits"] else "  over budget"
+        print(f"{name[:60]:60s} {len(workflow_json['nodes']):5d} {before:7d} {built['tokens']:7d} "
+              f"{1 - built['tokens'] / before:6.1%}{flag}")
+
+    if total_before:
+        print(f"\n{'total':60s} {'':5s} {total_before:7d} {total_after:7d} {1 - total_after / total_before:6.1%}")
+
+if __name__ == "__main__":
+    main()
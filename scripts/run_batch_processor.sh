@@ -4,6 +4,7 @@
 
 # Default values
 URLS_FILE="urls.txt"
+SITEMAP=""
 INITIAL_CONCURRENCY=2
 MAX_CONCURRENCY=5
 ENABLE_API=false
@@ -17,6 +18,10 @@ while [[ $# -gt 0 ]]; do
       URLS_FILE="$2"
       shift 2
       ;;
+    --sitemap)
+      SITEMAP="$2"
+      shift 2
+      ;;
     --initial-concurrency)
       INITIAL_CONCURRENCY="$2"
       shift 2
@@ -29,6 +34,10 @@ while [[ $# -gt 0 ]]; do
       ENABLE_API=true
       shift
       ;;
+    --force)
+      FORCE=true
+      shift
+      ;;
     --api-port)
       API_PORT="$2"
       shift 2
@@ -49,9 +58,11 @@ while [[ $# -gt 0 ]]; do
       echo "Usage: $0 [options]"
       echo "Options:"
       echo "  --urls-file FILE          File containing URLs to process (default: urls.txt)"
+      echo "  --sitemap URL             Stream URLs from a sitemap or sitemap index"
       echo "  --initial-concurrency N   Initial number of concurrent workers (default: 2)"
       echo "  --max-concurrency N       Maximum number of concurrent workers (default: 5)"
       echo "  --enable-api              Enable API endpoint"
+      echo "  --force                   Reprocess workflows even if unchanged"
       echo "  --api-port PORT           Port for API endpoint (default: 8080)"
       echo "  --api-host HOST           Host for API endpoint (default: 0.0.0.0)"
       echo "  --generate                Generate URLs file before running"
@@ -75,18 +86,28 @@ if [ "$GENERATE" = true ]; then
   python scripts/generate_urls_file.py --output "$URLS_FILE" ${COUNT:+--count "$COUNT"}
 fi
 
-# Check if URLs file exists
-if [ ! -f "$URLS_FILE" ]; then
-  echo "Error: URLs file '$URLS_FILE' not found"
-  exit 1
-fi
+# Build command
+CMD="python -m src.processors.batch_workflow_processor --initial-concurrency $INITIAL_CONCURRENCY --max-concurrency $MAX_CONCURRENCY"
 
-# Count URLs in file
-URL_COUNT=$(wc -l < "$URLS_FILE")
-echo "Processing $URL_COUNT URLs from $URLS_FILE"
+if [ -n "$SITEMAP" ]; then
+  echo "Streaming URLs from sitemap $SITEMAP"
+  CMD="$CMD --sitemap $SITEMAP"
+else
+  # Check if URLs file exists
+  if [ ! -f "$URLS_FILE" ]; then
+    echo "Error: URLs file '$URLS_FILE' not found"
+    exit 1
+  fi
 
-# Build command
-CMD="python -m src.processors.batch_workflow_processor --urls-file $URLS_FILE --initial-concurrency $INITIAL_CONCURRENCY --max-concurrency $MAX_CONCURRENCY"
+  # Count URLs in file
+  URL_COUNT=$(wc -l < "$URLS_FILE")
+  echo "Processing $URL_COUNT URLs from $URLS_FILE"
+  CMD="$CMD --urls-file $URLS_FILE"
+fi
+
+if [ "$FORCE" = true ]; then
+  CMD="$CMD --force"
+fi
 
 if [ "$ENABLE_API" = true ]; then
   CMD="$CMD --enable-api --api-port $API_PORT --api-host $API_HOST"
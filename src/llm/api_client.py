@@ -8,7 +8,7 @@ logger = logging.getLogger(__name__)
 class OpenRouterClient:
     def __init__(self):
         self.settings = get_settings()
-        self.base_url = self.settings.openrouter_base_url
+        self.base_url = self.settings.openrouter_base_url.rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {self.settings.openrouter_api_key}",
             "Content-Type": "application/json",
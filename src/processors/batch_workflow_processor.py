@@ -7,6 +7,7 @@ This script processes a batch of n8n workflow URLs with adaptive resource manage
 
 import asyncio
 import argparse
+import functools
 import logging
 import os
 import sys
@@ -21,7 +22,16 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from src.utils.smart_queue import SmartQueue
 from src.utils.adaptive_processor import AdaptiveProcessor
 from src.utils.system_monitor import SystemMonitor
-from src.processors.n8n_workflow_processor import process_workflow
+from src.utils.sitemap import enqueue_sitemap_urls, is_workflow_url
+from src.utils.metrics import REGISTRY, CONTENT_TYPE
+from src.utils.tracing import configure_tracing
+from src.utils.llm_stream import ANALYSIS_STREAMS
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.config import get_settings
+from src.processors.n8n_workflow_processor import (
+    process_workflow, get_corpus_store, get_corpus_index, workflow_id_from_url
+)
+from src.processors.pipeline import WorkflowPipeline
 
 # Configure logging
 logging.basicConfig(
@@ -35,12 +45,21 @@ logging.basicConfig(
 
 logger = logging.getLogger("batch_processor")
 
-async def process_workflow_url(url):
+# Gauges refreshed from processor and queue state on every /metrics scrape
+QUEUE_DEPTH = REGISTRY.gauge("batch_queue_urls", "URLs in the batch queue by state", ["state"])
+IN_FLIGHT = REGISTRY.gauge("batch_in_flight", "Workflow URLs currently being processed")
+CONCURRENCY_TARGET = REGISTRY.gauge("batch_concurrency_target", "Current adaptive concurrency target")
+CONCURRENCY_MAX = REGISTRY.gauge("batch_concurrency_max", "Maximum concurrency")
+PAUSED = REGISTRY.gauge("batch_paused", "1 if processing is paused")
+
+async def process_workflow_url(url, force=False, corpus_store=None):
     """
     Process a single workflow URL.
     
     Args:
         url: URL to process
+        force: Reprocess the workflow even if it is unchanged since the last run
+        corpus_store: CorpusStore to add processed workflows to
         
     Returns:
         dict: Processing result
@@ -49,12 +68,10 @@ async def process_workflow_url(url):
         logger.info(f"Processing workflow URL: {url}")
         
         # Extract workflow ID from URL
-        workflow_id = url.split('/')[-1]
-        if not workflow_id:
-            workflow_id = url.split('/')[-2]
+        workflow_id = workflow_id_from_url(url)
         
         # Process workflow
-        result = await process_workflow(workflow_id)
+        result = await process_workflow(workflow_id, force=force, corpus_store=corpus_store)
         
         return {
             "url": url,
@@ -62,6 +79,9 @@ async def process_workflow_url(url):
             "success": True,
             "result": result
         }
+    except CircuitOpenError:
+        # The processor requeues the URL and waits for the upstream
+        raise
     except Exception as e:
         logger.error(f"Error processing workflow URL {url}: {e}")
         logger.debug(traceback.format_exc())
@@ -71,16 +91,17 @@ async def process_workflow_url(url):
             "error": str(e)
         }
 
-async def setup_api_endpoint(processor, queue, monitor, host="0.0.0.0", port=8080):
+async def setup_api_endpoint(processor, queue, monitor, host="0.0.0.0", port=8080, corpus_index=None):
     """
     Set up a simple API endpoint for monitoring and control.
     
     Args:
-        processor: AdaptiveProcessor instance
+        processor: AdaptiveProcessor or WorkflowPipeline instance
         queue: SmartQueue instance
         monitor: SystemMonitor instance
         host: Host to bind to
         port: Port to bind to
+        corpus_index: CorpusIndex instance for the /index endpoints
     """
     from aiohttp import web
     
@@ -99,6 +120,33 @@ async def setup_api_endpoint(processor, queue, monitor, host="0.0.0.0", port=808
             "system": system_stats
         })
     
+    async def get_metrics(request):
+        """Expose metrics in the Prometheus text format."""
+        queue_stats = await queue.get_stats()
+        for state in ("queued", "in_progress", "completed", "failed", "permanent_failures"):
+            QUEUE_DEPTH.set(queue_stats.get(state, 0), state=state)
+        IN_FLIGHT.set(processor.active_tasks)
+        CONCURRENCY_TARGET.set(processor.current_concurrency)
+        CONCURRENCY_MAX.set(processor.max_concurrency)
+        PAUSED.set(1 if processor.paused else 0)
+        
+        return web.Response(body=REGISTRY.render().encode("utf-8"),
+                            headers={"Content-Type": CONTENT_TYPE})
+    
+    async def stream_analysis(request):
+        """Stream a workflow analysis while it is generated (server-sent events)."""
+        workflow_id = request.match_info["workflow_id"]
+        if not ANALYSIS_STREAMS.is_active(workflow_id):
+            return web.json_response({"error": "No analysis in progress"}, status=404)
+        
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        async for entry in ANALYSIS_STREAMS.subscribe(workflow_id):
+            data = {key: value for key, value in entry.items() if key != "event"}
+            await response.write(f"event: {entry['event']}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        await response.write_eof()
+        return response
+    
     async def pause_processing(request):
         """Pause processing."""
         processor.pause()
@@ -120,8 +168,52 @@ async def setup_api_endpoint(processor, queue, monitor, host="0.0.0.0", port=808
         added = await queue.add_jobs(urls)
         return web.json_response({"added": added})
     
+    async def query_index(request):
+        """Query the corpus index by node type, integration or credential type."""
+        if corpus_index is None:
+            return web.json_response({"error": "Corpus index disabled"}, status=404)
+        
+        params = request.query
+        if "node_type" in params:
+            workflows = corpus_index.workflows_with_node_type(params["node_type"])
+        elif "integration" in params:
+            workflows = corpus_index.workflows_with_integration(params["integration"])
+        elif "credential" in params:
+            workflows = corpus_index.workflows_with_credential(params["credential"])
+        else:
+            return web.json_response({"summary": corpus_index.summary()})
+        
+        return web.json_response({"count": len(workflows), "workflows": workflows})
+    
+    async def top_index(request):
+        """Get the most used node types, integrations or credential types."""
+        if corpus_index is None:
+            return web.json_response({"error": "Corpus index disabled"}, status=404)
+        
+        try:
+            top = corpus_index.top(request.query.get("by", "integrations"),
+                                   int(request.query.get("limit", 20)))
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response({"top": top})
+    
+    async def workflow_graph(request):
+        """Get connection-graph statistics of a workflow."""
+        if corpus_index is None:
+            return web.json_response({"error": "Corpus index disabled"}, status=404)
+        
+        stats = corpus_index.get_graph_stats(request.match_info["workflow_id"])
+        if stats is None:
+            return web.json_response({"error": "Workflow not indexed"}, status=404)
+        return web.json_response(stats)
+    
     # Set up routes
     app.router.add_get("/status", get_status)
+    app.router.add_get("/metrics", get_metrics)
+    app.router.add_get("/analysis/{workflow_id}/stream", stream_analysis)
+    app.router.add_get("/index", query_index)
+    app.router.add_get("/index/top", top_index)
+    app.router.add_get("/index/graph/{workflow_id}", workflow_graph)
     app.router.add_post("/pause", pause_processing)
     app.router.add_post("/resume", resume_processing)
     app.router.add_post("/add-urls", add_urls)
@@ -140,6 +232,10 @@ async def main():
     """Main function."""
     parser = argparse.ArgumentParser(description="Batch Workflow Processor")
     parser.add_argument("--urls-file", help="File containing URLs to process")
+    parser.add_argument("--sitemap",
+                       help="Sitemap or sitemap index URL to stream workflow URLs from")
+    parser.add_argument("--sitemap-batch-size", type=int, default=500,
+                       help="Number of sitemap URLs added to the queue at a time")
     parser.add_argument("--initial-concurrency", type=int, default=2,
                        help="Initial number of concurrent workers")
     parser.add_argument("--max-concurrency", type=int, default=5,
@@ -150,8 +246,30 @@ async def main():
                        help="Host for API endpoint")
     parser.add_argument("--enable-api", action="store_true",
                        help="Enable API endpoint")
+    parser.add_argument("--force", action="store_true",
+                       help="Reprocess workflows even if they are unchanged since the last run")
+    parser.add_argument("--corpus-db", default=None,
+                       help="SQLite corpus database to store processed workflows in")
+    parser.add_argument("--pipeline", action="store_true",
+                       help="Run fetch, parse, LLM and write as separate worker pools instead of "
+                            "one adaptive worker per URL")
+    parser.add_argument("--fetchers", type=int, default=20,
+                       help="Concurrent page downloads (--pipeline)")
+    parser.add_argument("--parsers", type=int, default=4,
+                       help="Parse worker processes (--pipeline)")
+    parser.add_argument("--llm-workers", type=int, default=4,
+                       help="Concurrent LLM analysis calls (--pipeline)")
+    parser.add_argument("--writers", type=int, default=2,
+                       help="Concurrent artifact writers (--pipeline)")
+    parser.add_argument("--analysis-batch-size", type=int, default=get_settings().analysis_batch_size,
+                       help="Small workflows analyzed per LLM request, 1 to disable (--pipeline)")
+    parser.add_argument("--trace-file", default=get_settings().trace_file or None,
+                       help="Append OpenTelemetry (OTLP/JSON) trace spans to this file")
     args = parser.parse_args()
     
+    if args.trace_file:
+        configure_tracing(args.trace_file, service_name="batch-workflow-processor")
+    
     # Ensure required directories exist
     os.makedirs("logs", exist_ok=True)
     os.makedirs("db", exist_ok=True)
@@ -174,11 +292,25 @@ async def main():
             logger.error(f"Error loading URLs from {args.urls_file}: {e}")
             return
     
-    # Initialize processor with conservative settings
-    processor = AdaptiveProcessor(
-        initial_concurrency=args.initial_concurrency,
-        max_concurrency=args.max_concurrency
-    )
+    corpus_store = get_corpus_store(args.corpus_db)
+    
+    if args.pipeline:
+        # Each stage gets its own worker pool, connected by bounded queues
+        processor = WorkflowPipeline(
+            fetchers=args.fetchers,
+            parsers=args.parsers,
+            llm_workers=args.llm_workers,
+            writers=args.writers,
+            analysis_batch_size=args.analysis_batch_size,
+            force=args.force,
+            corpus_store=corpus_store
+        )
+    else:
+        # Initialize processor with conservative settings
+        processor = AdaptiveProcessor(
+            initial_concurrency=args.initial_concurrency,
+            max_concurrency=args.max_concurrency
+        )
     
     # Initialize system monitor
     monitor = SystemMonitor(processor, queue)
@@ -189,25 +321,39 @@ async def main():
         try:
             api_runner = await setup_api_endpoint(
                 processor, queue, monitor,
-                host=args.api_host, port=args.api_port
+                host=args.api_host, port=args.api_port,
+                corpus_index=get_corpus_index()
             )
         except Exception as e:
             logger.error(f"Error setting up API endpoint: {e}")
     
+    # Stream sitemap URLs into the queue while workers are already running
+    sitemap_task = None
+    if args.sitemap:
+        sitemap_task = asyncio.create_task(enqueue_sitemap_urls(
+            queue, args.sitemap, batch_size=args.sitemap_batch_size, url_filter=is_workflow_url
+        ))
+    
     # Start monitoring
     monitor_task = asyncio.create_task(monitor.start_monitoring())
     
     try:
         # Start processing
         logger.info("Starting batch processing")
-        await processor.process_queue(queue, process_workflow_url)
+        await processor.process_queue(queue, functools.partial(
+            process_workflow_url,
+            force=args.force,
+            corpus_store=corpus_store
+        ))
     except KeyboardInterrupt:
         logger.info("Processing interrupted by user")
     except Exception as e:
         logger.error(f"Error in batch processing: {e}")
         logger.debug(traceback.format_exc())
     finally:
-        # Stop monitoring
+        # Stop sitemap streaming and monitoring
+        if sitemap_task:
+            sitemap_task.cancel()
         monitor_task.cancel()
         
         # Stop processor
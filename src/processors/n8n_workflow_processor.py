@@ -13,31 +13,95 @@ import argparse
 import uuid
 import traceback
 import re
-import shutil
 import asyncio
 import string
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 # Import from shared modules
-from src.utils.common import call_openrouter, fix_json_with_llm
+from src.utils.common import call_openrouter, call_site_options, fix_json_with_llm
 from src.utils.config import get_settings
+from src.utils.workflow_manifest import WorkflowManifest
+from src.utils.output_manager import OutputManager, parse_artifacts
+from src.utils.corpus_store import CorpusStore
+from src.utils.corpus_index import CorpusIndex
+from src.utils.metrics import WORKFLOWS_PROCESSED, CACHE_REQUESTS
+from src.utils.tracing import get_tracer, stage, configure_tracing, current_span
+from src.utils.single_flight import SingleFlight, ThreadSingleFlight
+from src.utils.prompt_builder import PromptBuilder, STICKY_NOTE_TYPE
+from src.utils.workflow_splitter import split_workflow
+from src.utils.batch_analysis import analyze_batch, is_batchable, pack_batches
+from src.utils.model_router import get_router
+from src.utils.llm_stream import ANALYSIS_STREAMS, partial_file_listener
+from src.utils.circuit_breaker import CircuitOpenError, get_breaker
+
+_manifest = None
+_corpus_store = None
+_corpus_index = None
+
+# Concurrent requests for the same workflow (queue, API, retries) share one fetch / run
+_fetch_flight = ThreadSingleFlight("workflow_fetch")
+_workflow_flight = SingleFlight("workflow")
+
+# Completion token limits of map-reduce analysis requests
+PART_MAX_TOKENS = 1500
+MERGE_MAX_TOKENS = 2000
+
+def get_manifest():
+    """Return the shared workflow manifest, loading it on first use."""
+    global _manifest
+    if _manifest is None:
+        _manifest = WorkflowManifest()
+    return _manifest
+
+def get_corpus_store(db_path=None):
+    """Return the shared corpus store, or None if no corpus database is configured."""
+    global _corpus_store
+    db_path = db_path or get_settings().corpus_db
+    if not db_path:
+        return None
+    if _corpus_store is None or _corpus_store.db_path != db_path:
+        _corpus_store = CorpusStore(db_path)
+    return _corpus_store
+
+def get_corpus_index(db_path=None):
+    """Return the shared corpus index, or None if indexing is disabled."""
+    global _corpus_index
+    db_path = db_path or get_settings().corpus_index_db
+    if not db_path:
+        return None
+    if _corpus_index is None or _corpus_index.db_path != db_path:
+        _corpus_index = CorpusIndex(db_path)
+    return _corpus_index
+
+def find_workflow_attribute(soup):
+    """Return the raw workflow attribute of the page's <n8n-demo> tag, or None."""
+    n8n_demo_tag = soup.find('n8n-demo')
+    if not n8n_demo_tag or not n8n_demo_tag.get('workflow'):
+        return None
+    return n8n_demo_tag['workflow']
 
 def extract_and_clean_n8n_json(html_string):
     """Extracts, decodes, and cleans n8n JSON from dynamic HTML"""
+    # Use BeautifulSoup to parse the HTML
     try:
-        # Use BeautifulSoup to parse the HTML
-        try:
-            from bs4 import BeautifulSoup
-        except ImportError:
-            print("❌ ERROR: BeautifulSoup not installed. Please install it with 'pip install beautifulsoup4'")
-            return None
-            
-        soup = BeautifulSoup(html_string, 'html.parser')
-
-        # Locate the <n8n-demo> tag
-        n8n_demo_tag = soup.find('n8n-demo')
+        from bs4 import BeautifulSoup
+    except ImportError:
+        print("❌ ERROR: BeautifulSoup not installed. Please install it with 'pip install beautifulsoup4'")
+        return None
+        
+    raw_json = find_workflow_attribute(BeautifulSoup(html_string, 'html.parser'))
+    if raw_json is None:
+        print("❌ ERROR: n8n-demo tag not found")
+        return None
+    return clean_n8n_json(raw_json)
 
-        if n8n_demo_tag:
-            # Explicitly extract and print raw JSON
-            raw_json = n8n_demo_tag['workflow']
+def clean_n8n_json(raw_json):
+    """Decode and clean the raw workflow attribute of a page, repairing it with the LLM"""
+    try:
+        if raw_json:
+            # Explicitly print raw JSON
             print(f"Raw JSON: {raw_json}")
             
             # Count nodes in raw JSON using regex to get a baseline
@@ -57,7 +121,7 @@ def extract_and_clean_n8n_json(html_string):
             except json.JSONDecodeError as e:
                 print(f"❌ ERROR: Failed to parse fixed JSON: {e}")
                 # Try one more time with a more aggressive approach
-                fixed_json = fix_json_with_llm(raw_json, model="openai/gpt-4-turbo")
+                fixed_json = fix_json_with_llm(raw_json, model=get_router().strongest("repair"))
                 response_data = json.loads(fixed_json)
             
             # Check if the response has a cleaned_workflow field (from the LLM response format)
@@ -128,99 +192,217 @@ def extract_and_clean_n8n_json(html_string):
                 
             return workflow_data
         else:
-            print("❌ ERROR: n8n-demo tag not found")
+            print("❌ ERROR: Empty workflow attribute")
             return None
 
     except json.JSONDecodeError as e:
         print(f"❌ ERROR: Invalid JSON format - {e}")
         return None
+    except CircuitOpenError:
+        raise
     except Exception as e:
         print(f"❌ ERROR: {e}")
         traceback.print_exc()
         return None
 
-def fetch_workflow_from_api(workflow_id, output_dir="."):
-    """Fetch workflow from n8n.io website directly and save consolidated files."""
-    url = f"https://n8n.io/workflows/{workflow_id}"
-    print(f"Fetching workflow from: {url}")
+def workflow_url(workflow_id):
+    """Return the n8n.io page URL of a workflow (N8N_BASE_URL points it at a fixture server)."""
+    return f"{get_settings().n8n_base_url.rstrip('/')}/workflows/{workflow_id}"
+
+def workflow_id_from_url(url):
+    """Return the workflow ID (last path segment) of a workflow URL."""
+    workflow_id = url.split('/')[-1]
+    if not workflow_id:
+        workflow_id = url.split('/')[-2]
+    return workflow_id
+
+def download_workflow_html(url):
+    """
+    Download the HTML page of a workflow, sharing downloads of the same URL already in flight.
     
+    Args:
+        url: Workflow page URL
+        
+    Returns:
+        str: Page HTML, or None if the server did not return HTTP 200
+        
+    Raises:
+        CircuitOpenError: If n8n.io is failing and the download was not attempted
+    """
+    return _fetch_flight.do(url, _download_workflow_html, url)
+
+def _download_workflow_html(url):
+    """Download the HTML page of a workflow (see download_workflow_html)."""
+    breaker = get_breaker("n8n", get_settings().n8n_slow_call_seconds)
+    # Try to use urllib if requests is not available
     try:
-        # Try to use urllib if requests is not available
+        # Use requests with custom SSL verification
+        import requests
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+        breaker.before_call()
+        start_time = time.perf_counter()
         try:
-            # Use requests with custom SSL verification
-            import requests
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
             response = requests.get(url, headers=headers, timeout=30, verify=False)
-            
-            if response.status_code != 200:
-                print(f"❌ Failed to fetch workflow: HTTP {response.status_code}")
-                return None
-                
-            html_response_text = response.text
-        except ImportError:
-            print("⚠️ Requests module not available, using urllib")
-            import urllib.request
-            import ssl
-            
-            # Create a context that doesn't verify SSL certificates
-            context = ssl._create_unverified_context()
-            
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, context=context, timeout=30) as response:
-                html_response_text = response.read().decode('utf-8')
+        except Exception:
+            breaker.record(False, time.perf_counter() - start_time)
+            raise
+        # A missing workflow (404) is an answer; server errors and rate limits count against n8n.io
+        breaker.record(response.status_code < 500 and response.status_code != 429,
+                       time.perf_counter() - start_time)
         
-        # Parse HTML with BeautifulSoup
-        try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_response_text, 'html.parser')
-            
-            # Extract and clean n8n JSON using the Python function
-            workflow_data = extract_and_clean_n8n_json(html_response_text)
+        if response.status_code != 200:
+            print(f"❌ Failed to fetch workflow: HTTP {response.status_code}")
+            return None
             
-            # Prepare result data
-            data = {
-                'scraped_data': {
-                    'workflow': {
-                        'metadata': {
-                            'title': soup.find('h1', {'class': 'workflow-title'}).text.strip() if soup.find('h1', {'class': 'workflow-title'}) else "Unknown Workflow",
-                            'description': soup.find('div', {'class': 'workflow-description'}).text.strip() if soup.find('div', {'class': 'workflow-description'}) else "",
-                            'url': url
-                        },
-                        'nodes': [],
-                        'raw_html': str(soup.find('div', {'class': 'workflow-container'})),
-                        'full_description': str(soup.find('div', {'class': 'workflow-description'}))
-                    }
+        return response.text
+    except ImportError:
+        print("⚠️ Requests module not available, using urllib")
+        import urllib.request
+        import ssl
+        
+        # Create a context that doesn't verify SSL certificates
+        context = ssl._create_unverified_context()
+        
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+        
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req, context=context, timeout=30) as response:
+            return response.read().decode('utf-8')
+
+def parse_workflow_html(html_response_text, url, repair=True):
+    """
+    Extract the workflow JSON and page metadata from workflow HTML.
+    
+    Without repair this is only the CPU-bound part of fetching a workflow; it
+    then depends on its arguments alone, so it can run in a worker process.
+    
+    Args:
+        html_response_text: Page HTML
+        url: Workflow page URL
+        repair: Clean the workflow JSON (with LLM repair) now; False leaves the raw
+                workflow attribute in scraped_data.workflow.raw_json for repair_workflow_data
+        
+    Returns:
+        dict: Scraped data; scraped_data.workflow.json holds the workflow if one was found
+    """
+    raw_json = None
+    # Parse HTML with BeautifulSoup
+    try:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_response_text, 'html.parser')
+        
+        raw_json = find_workflow_attribute(soup)
+        if raw_json is None:
+            print("❌ ERROR: n8n-demo tag not found")
+        
+        # Clean the n8n JSON unless the caller repairs it later
+        workflow_data = clean_n8n_json(raw_json) if repair and raw_json else None
+        
+        # Prepare result data
+        data = {
+            'scraped_data': {
+                'workflow': {
+                    'metadata': {
+                        'title': soup.find('h1', {'class': 'workflow-title'}).text.strip() if soup.find('h1', {'class': 'workflow-title'}) else "Unknown Workflow",
+                        'description': soup.find('div', {'class': 'workflow-description'}).text.strip() if soup.find('div', {'class': 'workflow-description'}) else "",
+                        'url': url
+                    },
+                    'nodes': [],
+                    'raw_html': str(soup.find('div', {'class': 'workflow-container'})),
+                    'full_description': str(soup.find('div', {'class': 'workflow-description'}))
                 }
             }
-        except ImportError:
-            print("❌ ERROR: BeautifulSoup not installed. Using minimal data structure.")
-            # Create a minimal data structure
-            workflow_data = None
-            data = {
-                'scraped_data': {
-                    'workflow': {
-                        'metadata': {
-                            'title': "Unknown Workflow",
-                            'description': "No description available (BeautifulSoup not installed)",
-                            'url': url
-                        },
-                        'nodes': [],
-                        'raw_html': "",
-                        'full_description': ""
-                    }
+        }
+    except ImportError:
+        print("❌ ERROR: BeautifulSoup not installed. Using minimal data structure.")
+        # Create a minimal data structure
+        workflow_data = None
+        data = {
+            'scraped_data': {
+                'workflow': {
+                    'metadata': {
+                        'title': "Unknown Workflow",
+                        'description': "No description available (BeautifulSoup not installed)",
+                        'url': url
+                    },
+                    'nodes': [],
+                    'raw_html': "",
+                    'full_description': ""
                 }
             }
+        }
+    
+    # If we found workflow JSON, add it to the result
+    if workflow_data:
+        data['scraped_data']['workflow']['json'] = workflow_data
+    elif raw_json and not repair:
+        data['scraped_data']['workflow']['raw_json'] = raw_json
+    
+    return data
+
+def repair_workflow_data(data):
+    """
+    Clean the raw workflow attribute left by parse_workflow_html(repair=False).
+    
+    Args:
+        data: Scraped data; scraped_data.workflow.json is set on success
         
-        # If we found workflow JSON, add it to the result and save files
+    Returns:
+        dict: Workflow JSON, or None if it could not be repaired
+    """
+    workflow = data['scraped_data']['workflow']
+    raw_json = workflow.pop('raw_json', None)
+    if raw_json and not workflow.get('json'):
+        workflow_data = clean_n8n_json(raw_json)
         if workflow_data:
-            data['scraped_data']['workflow']['json'] = workflow_data
+            workflow['json'] = workflow_data
+    return workflow.get('json')
+
+def set_extract_attributes(span, data):
+    """Record the payload size of extracted workflow data on a span."""
+    workflow = data.get("scraped_data", {}).get("workflow", {})
+    workflow_data = workflow.get("json")
+    if workflow_data:
+        span.set_attribute("node_count", len(workflow_data.get("nodes", [])))
+        span.set_attribute("workflow_bytes", len(json.dumps(workflow_data, separators=(",", ":"))))
+    elif workflow.get("raw_json"):
+        span.set_attribute("workflow_bytes", len(workflow["raw_json"]))
+
+def fetch_workflow_from_api(workflow_id, output_dir=".", save_files=True, repair=True):
+    """Fetch workflow from n8n.io website directly and save consolidated files.
+    
+    With save_files=False nothing is written to disk; the caller receives the
+    scraped data in memory and is responsible for emitting artifacts. With
+    repair=False (only together with save_files=False) the workflow JSON is left
+    for repair_workflow_data, so callers can decide to skip it first.
+    """
+    url = workflow_url(workflow_id)
+    print(f"Fetching workflow from: {url}")
+    
+    try:
+        # Time the download separately from parsing
+        with stage("fetch", url=url) as span:
+            html_response_text = download_workflow_html(url)
+            if html_response_text is None:
+                return None, url
+            span.set_attribute("html_bytes", len(html_response_text))
             
+        with stage("extract") as span:
+            data = parse_workflow_html(html_response_text, url, repair=repair or save_files)
+            set_extract_attributes(span, data)
+        workflow_data = data['scraped_data']['workflow'].get('json')
+        
+        # Callers with their own output stage only need the data in memory
+        if not save_files:
+            if not workflow_data and not data['scraped_data']['workflow'].get('raw_json'):
+                print("❌ WARNING: No workflow JSON found using any extraction method")
+            return data, url
+        
+        if workflow_data:
             # Create output directory if it doesn't exist
             try:
                 os.makedirs(output_dir, exist_ok=True)
@@ -298,6 +480,8 @@ def fetch_workflow_from_api(workflow_id, output_dir="."):
                 marker_file.write(f"No JSON found for workflow: {url}")
         
         return data, url
+    except CircuitOpenError:
+        raise
     except Exception as e:
         print(f"❌ ERROR: Failed to fetch workflow - {e}")
         traceback.print_exc()
@@ -371,6 +555,196 @@ def render_template(template, **kwargs):
     
     return rendered
 
+def is_valid_analysis(text):
+    """Check whether an LLM response is a usable analysis (has markdown sections)."""
+    return re.search(r"^#+\s+\S", text, re.MULTILINE) is not None
+
+def analyze_workflow_json(workflow_json, model=get_settings().default_model, template_path=None, sink=None):
+    """
+    Analyze parsed workflow JSON with LLM using a template and return the analysis text.
+    
+    With a TokenSink the analysis is streamed into it as it is generated
+    (single-request analyses only; map-reduce results arrive at the end).
+    """
+    # Load the analysis template
+    template_content = load_analysis_template(template_path)
+    
+    # Call OpenRouter API for workflow analysis
+    print("\n🧠 Calling LLM for workflow analysis...")
+    
+    # Render a compact projection of the workflow within the model's token budget
+    built = PromptBuilder(template_content, model).build(workflow_json)
+    print(f"Prompt: {built['tokens']} tokens (budget {built['budget']})"
+          + (f", reduced: {', '.join(built['reductions'])}" if built['reductions'] else ""))
+    span = current_span()
+    if span:
+        span.set_attribute("prompt_tokens", built["tokens"])
+    
+    # Large workflows are analyzed in parts so no single request truncates
+    node_count = sum(1 for node in workflow_json.get('nodes', []) if node.get('type') != STICKY_NOTE_TYPE)
+    if node_count > get_settings().map_reduce_threshold_nodes or not built["fits"]:
+        llm_response = analyze_workflow_map_reduce(workflow_json, model, template_content)
+    else:
+        def request(name):
+            if sink is not None:
+                # A rejected analysis from a lower tier must not stay in the stream
+                sink.reset()
+            return call_openrouter(built["prompt"], model=name, sink=sink, **call_site_options("analysis"))
+        
+        # Start on the cheapest model tier suited to the workflow and escalate if the analysis is unusable
+        llm_response, routed_model = get_router().run(
+            "analysis",
+            request,
+            is_valid_analysis,
+            size=node_count,
+            model=model
+        )
+        if routed_model and routed_model != model:
+            print(f"🔀 Analysis escalated to {routed_model}")
+    
+    if llm_response:
+        print("\n📝 LLM Analysis Report:")
+        print("=" * 80)
+        print(llm_response)
+        print("=" * 80)
+        return llm_response
+    
+    print("❌ ERROR: Failed to get LLM analysis")
+    return None
+
+def load_prompt_template(name):
+    """Load a helper prompt template from cline_docs/prompt_templates, or None if missing."""
+    path = os.path.join("cline_docs", "prompt_templates", name)
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return file.read()
+    except OSError as e:
+        print(f"⚠️ Error loading template {path}: {e}")
+        return None
+
+def split_part_analysis(text):
+    """Split a part analysis into its node analysis and its part summary."""
+    match = re.search(r"^#+\s*Part Summary\s*$", text, re.MULTILINE | re.IGNORECASE)
+    if not match:
+        return text.strip(), text.strip()
+    nodes_text = re.sub(r"^#+\s*Nodes\s*\n", "", text[:match.start()].strip(), flags=re.IGNORECASE)
+    return nodes_text.strip(), text[match.end():].strip()
+
+def merge_sections(template_content):
+    """
+    Split an analysis template around its node section.
+    
+    Returns:
+        tuple: (heading of the node section, instructions for the remaining sections)
+    """
+    heading = "### Node Analysis"
+    head, marker, tail = template_content.partition("{{/nodes}}")
+    if not marker:
+        return heading, template_content
+    for line in head[:head.find("{{#nodes}}")].splitlines():
+        if line.startswith("#") and "{{" not in line:
+            heading = line.strip()
+    return heading, tail.strip()
+
+def analyze_workflow_map_reduce(workflow_json, model, template_content):
+    """
+    Analyze a large workflow in parts and merge the results.
+    
+    The workflow is split into connected parts that are analyzed in parallel
+    (node analysis plus a part summary each). One merge request then writes the
+    workflow-level sections from an overview and the part summaries, so latency
+    is bounded by the largest part rather than the whole workflow.
+    
+    Returns:
+        str: Combined analysis, or None if a part or the merge failed
+    """
+    settings = get_settings()
+    part_template = load_prompt_template("partial_analysis.md")
+    merge_template = load_prompt_template("merge_analysis.md")
+    if not part_template or not merge_template:
+        print("⚠️ Map-reduce templates unavailable, analyzing the workflow in one request")
+        return call_openrouter(PromptBuilder(template_content, model).build(workflow_json)["prompt"], model=model,
+                               **call_site_options("analysis"))
+    
+    parts = split_workflow(workflow_json, settings.map_reduce_part_nodes)
+    print(f"🧩 Analyzing {len(parts)} parts of up to {settings.map_reduce_part_nodes} nodes in parallel")
+    
+    def analyze_part(part):
+        with get_tracer().span("analyze_part", part=part["name"], nodes=len(part["nodes"])):
+            external = "\n".join(f"- {edge}" for edge in part["external_edges"]) or "- none"
+            built = PromptBuilder(part_template, model).build(part, external_edges=external)
+            return call_openrouter(built["prompt"], model=model, max_tokens=PART_MAX_TOKENS,
+                                   **call_site_options("analysis"))
+    
+    with ThreadPoolExecutor(max_workers=settings.map_reduce_concurrency) as executor:
+        # Copy the context so part spans nest under the current analyze span
+        futures = [executor.submit(contextvars.copy_context().run, analyze_part, part) for part in parts]
+        responses = [future.result() for future in futures]
+    
+    if not all(responses):
+        print("❌ ERROR: Failed to analyze every workflow part")
+        return None
+    
+    node_sections, summaries = [], []
+    for part, response in zip(parts, responses):
+        nodes_text, summary = split_part_analysis(response)
+        node_sections.append(nodes_text)
+        names = ", ".join(node.get("name", "?") for node in part["nodes"])
+        summaries.append(f"#### {part['name']}\nNodes: {names}\n{summary}")
+    
+    # The merge request sees every node and connection, but only sticky notes keep their parameters
+    overview = dict(workflow_json, nodes=[
+        node if node.get("type") == STICKY_NOTE_TYPE else {key: value for key, value in node.items() if key != "parameters"}
+        for node in workflow_json.get("nodes", [])
+    ])
+    heading, sections = merge_sections(template_content)
+    built = PromptBuilder(merge_template, model).build(
+        overview, partial_summaries="\n\n".join(summaries), sections=sections
+    )
+    merged = call_openrouter(built["prompt"], model=model, max_tokens=MERGE_MAX_TOKENS,
+                             **call_site_options("analysis"))
+    if not merged:
+        print("❌ ERROR: Failed to merge the part analyses")
+        return None
+    
+    title = f"# Comprehensive Workflow Analysis for \"{workflow_json.get('name', 'Unknown Workflow')}\""
+    return "\n\n".join([title, heading, *node_sections, merged.strip()])
+
+def analyze_workflows_batch(items, model=get_settings().default_model, template_path=None, batch_size=None):
+    """
+    Analyze several workflows, sharing one request between small workflows.
+    
+    Workflows with at most analysis_batch_max_nodes nodes are packed into
+    batches of up to batch_size (default analysis_batch_size); the rest, and any workflow missing
+    from a batch response, are analyzed individually. Batching needs the
+    default template because the batch template mirrors its sections.
+    
+    Args:
+        items: List of (workflow_id, workflow_json)
+        model: OpenRouter model to use
+        template_path: Path to analysis template file
+        batch_size: Maximum workflows per request
+        
+    Returns:
+        dict: {workflow_id: analysis text or None}
+    """
+    settings = get_settings()
+    results = {}
+    
+    small = [item for item in items if is_batchable(item[1], settings.analysis_batch_max_nodes)]
+    template = load_prompt_template("batch_analysis.md") if template_path is None and len(small) > 1 else None
+    if template:
+        for batch in pack_batches(small, template, model, batch_size or settings.analysis_batch_size):
+            if len(batch) > 1:
+                print(f"\n🧠 Calling LLM for a batch of {len(batch)} workflows...")
+                results.update(analyze_batch(batch, template, model,
+                                             functools.partial(call_openrouter, **call_site_options("analysis"))))
+    
+    for workflow_id, workflow_json in items:
+        if workflow_id not in results:
+            results[workflow_id] = analyze_workflow_json(workflow_json, model, template_path)
+    return results
+
 def analyze_workflow(workflow_file, model=get_settings().default_model, template_path=None):
     """Analyze workflow JSON with LLM using a template."""
     try:
@@ -399,39 +773,9 @@ def analyze_workflow(workflow_file, model=get_settings().default_model, template
                 print(f"❌ ERROR: Could not fix JSON - {e2}")
                 return None
         
-        # Load the analysis template
-        template_content = load_analysis_template(template_path)
-        
-        # Call OpenRouter API for workflow analysis
-        print("\n🧠 Calling LLM for workflow analysis...")
-        
-        # Prepare node data for template
-        nodes_data = []
-        for node in workflow_json.get('nodes', []):
-            nodes_data.append({
-                'name': node.get('name', 'Unnamed Node'),
-                'type': node.get('type', 'Unknown Type')
-            })
-        
-        # Get workflow name
-        workflow_name = workflow_json.get('name', 'Unknown Workflow')
-        
-        # Render the template with workflow data
-        llm_prompt = render_template(
-            template_content,
-            workflow_json=json.dumps(workflow_json, indent=2),
-            nodes=nodes_data,
-            workflow_name=workflow_name
-        )
-        
-        llm_response = call_openrouter(llm_prompt, model=model)
+        llm_response = analyze_workflow_json(workflow_json, model, template_path)
         
         if llm_response:
-            print("\n📝 LLM Analysis Report:")
-            print("=" * 80)
-            print(llm_response)
-            print("=" * 80)
-            
             # Save the analysis report
             analysis_file = workflow_file.replace(".json", "_analysis.txt")
             with open(analysis_file, "w", encoding="utf-8") as file:
@@ -440,7 +784,6 @@ def analyze_workflow(workflow_file, model=get_settings().default_model, template
             
             return analysis_file
         else:
-            print("❌ ERROR: Failed to get LLM analysis")
             return None
             
     except Exception as e:
@@ -448,53 +791,23 @@ def analyze_workflow(workflow_file, model=get_settings().default_model, template
         traceback.print_exc()
         return None
 
-def create_output_folder(workflow_id, workflow_file, metadata_file, analysis_file):
-    """Create a folder with workflow JSON and README.md with metadata and analysis."""
-    try:
-        # Create folder
-        folder_name = workflow_id
-        os.makedirs(folder_name, exist_ok=True)
-        
-        # Also create the folder in the n8n_workflows directory
-        target_dir = "/root/ai_n8n_workflowmaker/n8n_workflows"
-        target_folder = os.path.join(target_dir, workflow_id)
-        os.makedirs(target_dir, exist_ok=True)
-        os.makedirs(target_folder, exist_ok=True)
-        
-        # Load workflow JSON
-        with open(workflow_file, 'r', encoding='utf-8') as file:
-            workflow_content = file.read()
-            workflow_json = json.loads(workflow_content)
-        
-        # Load metadata JSON
-        with open(metadata_file, 'r', encoding='utf-8') as file:
-            metadata_content = file.read()
-            metadata_json = json.loads(metadata_content)
-        
-        # Load analysis text
-        with open(analysis_file, 'r', encoding='utf-8') as file:
-            analysis_text = file.read()
-        
-        # Save workflow JSON to folder
-        workflow_output_file = os.path.join(folder_name, f"{workflow_id}.json")
-        with open(workflow_output_file, 'w', encoding='utf-8') as file:
-            json.dump(workflow_json, file, indent=2)
-        
-        # Create a mapping of node names to their types from the workflow JSON
-        node_types = {}
-        for node in workflow_json.get('nodes', []):
-            node_types[node.get('name')] = node.get('type')
-        
-        # Print node types for debugging
-        print("\nNode Types:")
-        for name, type_value in node_types.items():
-            print(f"  {name}: {type_value}")
-        
-        # Get workflow name from the workflow JSON
-        workflow_name = workflow_json.get('name', 'N8N Workflow')
-        
-        # Create README.md with metadata and analysis
-        readme_content = f"""# {workflow_name}
+def build_readme(workflow_json, metadata_json, analysis_text):
+    """Build README.md content with metadata, node types and analysis."""
+    # Create a mapping of node names to their types from the workflow JSON
+    node_types = {}
+    for node in workflow_json.get('nodes', []):
+        node_types[node.get('name')] = node.get('type')
+    
+    # Print node types for debugging
+    print("\nNode Types:")
+    for name, type_value in node_types.items():
+        print(f"  {name}: {type_value}")
+    
+    # Get workflow name from the workflow JSON
+    workflow_name = workflow_json.get('name', 'N8N Workflow')
+    
+    # Create README.md with metadata and analysis
+    readme_content = f"""# {workflow_name}
 
 ## Metadata
 
@@ -517,89 +830,103 @@ def create_output_folder(workflow_id, workflow_file, metadata_file, analysis_fil
 ## Analysis
 
 """
+    
+    # Add the analysis text
+    readme_content += analysis_text
+    
+    # Now, manually add the node types to the README.md
+    readme_lines = readme_content.split('\n')
+    modified_lines = []
+    in_node_analysis = False
+    
+    for line in readme_lines:
+        modified_lines.append(line)
         
-        # Add the analysis text
-        readme_content += analysis_text
+        # Check if we're in the Node Analysis section
+        if "#### 1. Node Analysis" in line:
+            in_node_analysis = True
+        # Check if we're starting a new node description
+        elif in_node_analysis and "- **" in line and "**:" in line:
+            # Extract node name
+            node_name_match = re.search(r'- \*\*(.*?)\*\*:', line)
+            if node_name_match:
+                node_name = node_name_match.group(1).strip()
+                
+                # Find matching node type
+                for workflow_node_name, node_type in node_types.items():
+                    if workflow_node_name.lower() == node_name.lower():
+                        # Add the Type field
+                        type_line = f"  - **Type**: `{node_type}`"
+                        modified_lines.append(type_line)
+                        break
+        # Check if we're moving to a new section
+        elif line.strip().startswith("#### 2."):
+            in_node_analysis = False
+    
+    return '\n'.join(modified_lines)
+
+def get_output_manager(artifacts=None):
+    """Create an OutputManager from settings, optionally overriding the artifacts."""
+    settings = get_settings()
+    return OutputManager(
+        output_dir=settings.output_dir,
+        mirror_dir=settings.mirror_dir,
+        artifacts=artifacts or settings.output_artifacts
+    )
+
+def open_analysis_stream(workflow_id, output_manager=None):
+    """
+    Start streaming a workflow's analysis to its partial analysis file and live subscribers.
+    
+    Returns:
+        TokenSink: Sink for analyze_workflow_json; close it when the analysis is done
+    """
+    path = (output_manager or get_output_manager()).partial_path(workflow_id, "analysis")
+    return ANALYSIS_STREAMS.open(workflow_id, [partial_file_listener(path)] if path else [])
+
+def create_output_folder(workflow_id, workflow_file, metadata_file, analysis_file):
+    """Create a folder with workflow JSON and README.md with metadata and analysis."""
+    try:
+        # Load workflow JSON
+        with open(workflow_file, 'r', encoding='utf-8') as file:
+            workflow_json = json.load(file)
         
-        # Now, manually add the node types to the README.md
-        readme_lines = readme_content.split('\n')
-        modified_lines = []
-        in_node_analysis = False
+        # Load metadata JSON
+        with open(metadata_file, 'r', encoding='utf-8') as file:
+            metadata_json = json.load(file)
         
-        for line in readme_lines:
-            modified_lines.append(line)
-            
-            # Check if we're in the Node Analysis section
-            if "#### 1. Node Analysis" in line:
-                in_node_analysis = True
-            # Check if we're starting a new node description
-            elif in_node_analysis and "- **" in line and "**:" in line:
-                # Extract node name
-                node_name_match = re.search(r'- \*\*(.*?)\*\*:', line)
-                if node_name_match:
-                    node_name = node_name_match.group(1).strip()
-                    
-                    # Find matching node type
-                    for workflow_node_name, node_type in node_types.items():
-                        if workflow_node_name.lower() == node_name.lower():
-                            # Add the Type field
-                            type_line = f"  - **Type**: `{node_type}`"
-                            modified_lines.append(type_line)
-                            break
-            # Check if we're moving to a new section
-            elif line.strip().startswith("#### 2."):
-                in_node_analysis = False
-        
-        # Write the modified README.md
-        readme_file = os.path.join(folder_name, "README.md")
-        with open(readme_file, 'w', encoding='utf-8') as file:
-            file.write('\n'.join(modified_lines))
-        
-        # Copy files to the target directory
-        target_workflow_file = os.path.join(target_folder, f"{workflow_id}.json")
-        target_readme_file = os.path.join(target_folder, "README.md")
-        
-        # Copy the workflow JSON and README.md to the target directory
-        shutil.copy2(workflow_output_file, target_workflow_file)
-        shutil.copy2(readme_file, target_readme_file)
-        
-        print(f"✅ Output folder created: {folder_name}")
-        print(f"✅ Workflow JSON saved as: {workflow_output_file}")
+        # Load analysis text
+        with open(analysis_file, 'r', encoding='utf-8') as file:
+            analysis_text = file.read()
+        
+        outputs = get_output_manager(artifacts=("workflow", "readme")).write(workflow_id, {
+            "workflow": workflow_json,
+            "readme": build_readme(workflow_json, metadata_json, analysis_text)
+        })
+        
+        print(f"✅ Output folder created: {outputs['output_folder']}")
+        print(f"✅ Workflow JSON saved as: {outputs['workflow_file']}")
         print(f"✅ README.md created with metadata and analysis")
-        print(f"✅ Files copied to: {target_folder}")
+        if outputs.get("mirror_folder"):
+            print(f"✅ Files linked to: {outputs['mirror_folder']}")
         
-        return folder_name
+        return outputs['output_folder']
     
     except Exception as e:
         print(f"❌ ERROR: Failed to create output folder - {e}")
         traceback.print_exc()
         return None
 
-async def process_workflow(workflow_id, model=get_settings().default_model, template_path=None):
+def extract_metadata(data):
     """
-    Process a workflow by ID.
+    Collect the metadata artifact from scraped workflow data.
     
     Args:
-        workflow_id: Workflow ID to process
-        model: OpenRouter model to use
+        data: Scraped data returned by parse_workflow_html
         
     Returns:
-        dict: Processing result
+        dict: Metadata (page metadata, nodes, template details and description)
     """
-    print("=" * 80)
-    print(f"🚀 Processing workflow: {workflow_id}")
-    print("=" * 80)
-    
-    print(f"Using model: {model}")
-    
-    # Fetch workflow and metadata
-    data, url = fetch_workflow_from_api(workflow_id)
-    
-    if not data:
-        print("❌ ERROR: Failed to fetch workflow")
-        return {"success": False, "error": "Failed to fetch workflow"}
-        
-    # Extract metadata
     metadata = {}
     if "scraped_data" in data and "workflow" in data["scraped_data"]:
         workflow_data = data["scraped_data"]["workflow"]
@@ -619,46 +946,163 @@ async def process_workflow(workflow_id, model=get_settings().default_model, temp
         if "full_description" in workflow_data:
             metadata["n8n_template_description"] = workflow_data["full_description"]
     
+    return metadata
+
+def write_workflow_outputs(workflow_id, data, metadata, analysis_text, fingerprint,
+                           output_manager=None, corpus_store=None, corpus_index=None):
+    """
+    Write the artifacts of an analyzed workflow and update the corpus store and index.
+    
+    Args:
+        workflow_id: Workflow ID
+        data: Scraped data including the workflow JSON
+        metadata: Metadata returned by extract_metadata
+        analysis_text: LLM analysis
+        fingerprint: Fingerprint from WorkflowManifest.fingerprint
+        output_manager: OutputManager deciding which artifacts are written where
+        corpus_store: CorpusStore to add the workflow to (default from settings)
+        corpus_index: CorpusIndex to update with the workflow (default from settings)
+        
+    Returns:
+        dict: Paths of the written artifacts
+    """
+    workflow_json = data["scraped_data"]["workflow"]["json"]
+    
+    # Build every artifact in memory and write each of them once
+    output_manager = output_manager or get_output_manager()
+    outputs = output_manager.write(workflow_id, {
+        "workflow": workflow_json,
+        "metadata": metadata,
+        "analysis": analysis_text,
+        "consolidated": data,
+        "readme": build_readme(workflow_json, metadata, analysis_text)
+    })
+    
+    # Add the workflow to the consolidated corpus store if one is configured
+    corpus_store = corpus_store or get_corpus_store()
+    if corpus_store:
+        corpus_store.put(workflow_id, workflow_json, metadata, analysis_text, fingerprint["workflow_hash"])
+        print(f"✅ Stored in corpus: {corpus_store.db_path}")
+    
+    # Keep the node type / integration index current
+    corpus_index = corpus_index or get_corpus_index()
+    if corpus_index:
+        corpus_index.update(workflow_id, workflow_json)
+    
+    return outputs
+
+async def process_workflow(workflow_id, model=get_settings().default_model, template_path=None, force=False,
+                           output_manager=None, corpus_store=None, corpus_index=None):
+    """
+    Process a workflow by ID.
+    
+    Args:
+        workflow_id: Workflow ID to process
+        model: OpenRouter model to use
+        template_path: Path to analysis template file
+        force: Reprocess even if the workflow is unchanged since the last run
+        output_manager: OutputManager deciding which artifacts are written where
+        corpus_store: CorpusStore to add the processed workflow to (default from settings)
+        corpus_index: CorpusIndex to update with the workflow (default from settings)
+        
+    Returns:
+        dict: Processing result
+    """
+    # Concurrent calls for the same workflow and settings share one run and its result
+    key = (workflow_id, model, template_path, force)
+    return await _workflow_flight.do(key, _traced_process_workflow, workflow_id, model, template_path, force,
+                                     output_manager, corpus_store, corpus_index)
+
+async def _traced_process_workflow(workflow_id, model, template_path, force, output_manager, corpus_store,
+                                   corpus_index):
+    """Run _process_workflow under a process_workflow span."""
+    # Root span; the fetch, extract, analyze and write stages nest under it
+    with get_tracer().span("process_workflow", workflow_id=workflow_id, model=model) as span:
+        result = await _process_workflow(workflow_id, model, template_path, force,
+                                         output_manager, corpus_store, corpus_index)
+        span.set_attribute("result", "skipped" if result.get("skipped") else
+                           "success" if result["success"] else "failed")
+        return result
+
+async def _process_workflow(workflow_id, model, template_path, force, output_manager, corpus_store, corpus_index):
+    """Fetch, analyze and write a workflow (see process_workflow)."""
+    print("=" * 80)
+    print(f"🚀 Processing workflow: {workflow_id}")
+    print("=" * 80)
+    
+    print(f"Using model: {model}")
+    
+    # Fetch workflow and metadata (kept in memory; outputs are written once at the end)
+    data, url = await asyncio.to_thread(fetch_workflow_from_api, workflow_id, save_files=False, repair=False)
+    
+    if not data:
+        print("❌ ERROR: Failed to fetch workflow")
+        WORKFLOWS_PROCESSED.inc(result="failed")
+        return {"success": False, "error": "Failed to fetch workflow"}
+        
+    # Extract metadata
+    metadata = extract_metadata(data)
+    
+    # Fingerprint the workflow as published, before the (non-deterministic) LLM repair
+    raw_json = data.get("scraped_data", {}).get("workflow", {}).get("raw_json")
+    if not raw_json:
+        print("❌ ERROR: No workflow JSON found")
+        WORKFLOWS_PROCESSED.inc(result="failed")
+        return {"success": False, "error": "No workflow JSON found"}
+    
+    fingerprint = WorkflowManifest.fingerprint(raw_json, model, template_path)
+    
+    # Skip analysis and output when nothing changed since the last run
+    manifest = get_manifest()
+    unchanged = not force and manifest.is_unchanged(workflow_id, fingerprint)
+    if not force:
+        CACHE_REQUESTS.inc(cache="workflow_manifest", result="hit" if unchanged else "miss")
+    if unchanged:
+        print(f"⏭️ Workflow {workflow_id} unchanged since last run, skipping (use --force to reprocess)")
+        WORKFLOWS_PROCESSED.inc(result="skipped")
+        return {
+            "success": True,
+            "skipped": True,
+            **manifest.get_outputs(workflow_id)
+        }
+    
     # Extract workflow JSON
-    raw_workflow = None
-    if data and "scraped_data" in data and "workflow" in data["scraped_data"]:
-        workflow_data = data["scraped_data"]["workflow"]
-        if "json" in workflow_data:
-            raw_workflow = json.dumps(workflow_data["json"], indent=2)
-    
-    # Save the raw workflow JSON
-    workflow_file = f"{workflow_id}_workflow.json"
-    with open(workflow_file, "w", encoding="utf-8") as file:
-        file.write(raw_workflow if raw_workflow else "{}")
-    print(f"✅ Workflow saved as: {workflow_file}")
-    
-    # Save the metadata
-    metadata_file = f"{workflow_id}_metadata.json"
-    with open(metadata_file, "w", encoding="utf-8") as file:
-        json.dump(metadata, file, indent=2)
-    print(f"✅ Metadata saved as: {metadata_file}")
-    
-    # Analyze workflow
-    analysis_file = analyze_workflow(workflow_file, model, template_path)
-    if not analysis_file:
+    workflow_json = await asyncio.to_thread(repair_workflow_data, data)
+    if not workflow_json:
+        print("❌ ERROR: No workflow JSON found")
+        WORKFLOWS_PROCESSED.inc(result="failed")
+        return {"success": False, "error": "No workflow JSON found"}
+    
+    # Analyze workflow, streaming it to the partial analysis file and live subscribers
+    analysis_text = None
+    sink = open_analysis_stream(workflow_id, output_manager)
+    try:
+        with stage("analyze", model=model) as span:
+            analysis_text = await asyncio.to_thread(analyze_workflow_json, workflow_json, model, template_path, sink)
+            span.set_attribute("analysis_chars", len(analysis_text or ""))
+    finally:
+        sink.close(None if analysis_text else "Failed to analyze workflow")
+    if not analysis_text:
         print("❌ ERROR: Failed to analyze workflow")
+        WORKFLOWS_PROCESSED.inc(result="failed")
         return {"success": False, "error": "Failed to analyze workflow"}
     
-    # Create output folder with workflow JSON and README.md
-    output_folder = create_output_folder(workflow_id, workflow_file, metadata_file, analysis_file)
+    with stage("write") as span:
+        outputs = await asyncio.to_thread(write_workflow_outputs, workflow_id, data, metadata, analysis_text,
+                                          fingerprint, output_manager, corpus_store, corpus_index)
+        span.set_attribute("artifacts", len(outputs) - 1)
     
     print("\n✅ Processing completed successfully!")
-    print(f"Workflow: {workflow_file}")
-    print(f"Metadata: {metadata_file}")
-    print(f"Analysis: {analysis_file}")
-    print(f"Output Folder: {output_folder}")
+    for key, path in outputs.items():
+        print(f"{key}: {path}")
+    
+    # Remember what was processed so identical reruns can be skipped
+    manifest.record(workflow_id, fingerprint, outputs)
+    WORKFLOWS_PROCESSED.inc(result="success")
     
     return {
         "success": True,
-        "workflow_file": workflow_file,
-        "metadata_file": metadata_file,
-        "analysis_file": analysis_file,
-        "output_folder": output_folder
+        **outputs
     }
 
 def main():
@@ -669,10 +1113,26 @@ def main():
                         default=get_settings().default_model)
     parser.add_argument("--template", help="Path to analysis template file", 
                         default=None)
+    parser.add_argument("--force", action="store_true",
+                        help="Reprocess the workflow even if it is unchanged since the last run")
+    parser.add_argument("--artifacts", type=parse_artifacts, default=None,
+                        help="Comma-separated artifacts to write "
+                             f"(default: {get_settings().output_artifacts})")
+    parser.add_argument("--corpus-db", default=None,
+                        help="SQLite corpus database to store the processed workflow in "
+                             "(default: CORPUS_DB setting, disabled if empty)")
+    parser.add_argument("--trace-file", default=get_settings().trace_file or None,
+                        help="Append OpenTelemetry (OTLP/JSON) trace spans to this file "
+                             "(default: TRACE_FILE setting, disabled if empty)")
     args = parser.parse_args()
     
+    if args.trace_file:
+        configure_tracing(args.trace_file)
+    
     # Process workflow
-    result = asyncio.run(process_workflow(args.workflow_id, args.model, args.template))
+    result = asyncio.run(process_workflow(args.workflow_id, args.model, args.template, force=args.force,
+                                          output_manager=get_output_manager(args.artifacts),
+                                          corpus_store=get_corpus_store(args.corpus_db)))
     
     # Check result
     if not result["success"]:
@@ -0,0 +1,553 @@
+"""
+Workflow Pipeline
+
+This module processes workflow URLs as a staged pipeline: fetch, parse, LLM
+analysis and write each run in their own worker pool, connected by bounded
+asyncio queues. A worker waiting on OpenRouter no longer holds a slot that could
+be downloading the next page, every resource is kept busy independently and a
+full queue makes the upstream stage wait (backpressure).
+"""
+
+import asyncio
+import logging
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import psutil
+
+from src.utils.config import get_settings
+from src.utils.metrics import REGISTRY, WORKFLOWS_PROCESSED, WORKFLOW_SECONDS, CACHE_REQUESTS
+from src.utils.tracing import get_tracer, stage
+from src.utils.model_router import get_router
+from src.utils.circuit_breaker import CircuitOpenError, get_breaker_stats
+from src.utils.token_budget import get_token_limiter
+from src.utils.workflow_manifest import WorkflowManifest
+from src.utils.batch_analysis import is_batchable
+from src.processors.n8n_workflow_processor import (
+    analyze_workflow_json, analyze_workflows_batch, download_workflow_html, extract_metadata, get_manifest,
+    open_analysis_stream, parse_workflow_html, repair_workflow_data, set_extract_attributes, workflow_id_from_url,
+    workflow_url, write_workflow_outputs
+)
+
+logger = logging.getLogger("pipeline")
+
+STAGES = ("fetch", "parse", "llm", "write")
+
+STAGE_QUEUE_DEPTH = REGISTRY.gauge(
+    "pipeline_stage_queue_items", "Items waiting in front of each pipeline stage", ["stage"]
+)
+STAGE_BUSY = REGISTRY.gauge(
+    "pipeline_stage_busy_workers", "Pipeline workers currently handling an item", ["stage"]
+)
+
+class WorkflowPipeline:
+    """
+    Processes workflow URLs from a SmartQueue through fetch, parse, LLM and write stages.
+
+    Downloads run in a thread pool, HTML parsing in a process pool (it is
+    CPU-bound), LLM calls and writes in their own thread pools. Parse workers
+    only extract the raw workflow attribute; its LLM JSON repair runs on the
+    LLM stage, so token budgets, metrics and spans stay in this process.
+    """
+
+    def __init__(self,
+                fetchers=20,
+                parsers=4,
+                llm_workers=4,
+                writers=2,
+                queue_size=None,
+                parse_processes=True,
+                model=None,
+                template_path=None,
+                force=False,
+                output_manager=None,
+                corpus_store=None,
+                corpus_index=None,
+                analysis_batch_size=None,
+                batch_wait=0.5,
+                poll_interval=5):
+        """
+        Initialize the WorkflowPipeline.
+
+        Args:
+            fetchers: Concurrent page downloads
+            parsers: Parse worker processes
+            llm_workers: Concurrent LLM analysis calls
+            writers: Concurrent artifact writers
+            queue_size: Capacity of the queue in front of each stage (default: twice its workers)
+            parse_processes: Parse in a process pool (False to parse in threads)
+            model: OpenRouter model for the analysis (default from settings)
+            template_path: Path to analysis template file
+            force: Reprocess workflows even if they are unchanged since the last run
+            output_manager: OutputManager deciding which artifacts are written where
+            corpus_store: CorpusStore to add processed workflows to
+            corpus_index: CorpusIndex to update with processed workflows
+            analysis_batch_size: Small workflows analyzed per LLM request (default from settings, 1 disables)
+            batch_wait: Seconds an LLM worker waits for more small workflows to fill a batch
+            poll_interval: Seconds to wait before polling an empty queue again
+        """
+        self.workers = {"fetch": fetchers, "parse": parsers, "llm": llm_workers, "write": writers}
+        for name, count in self.workers.items():
+            if count < 1:
+                raise ValueError(f"{name} stage needs at least one worker")
+        self.queue_size = queue_size
+        self.parse_processes = parse_processes
+        self.model = model or get_settings().default_model
+        self.template_path = template_path
+        self.force = force
+        self.output_manager = output_manager
+        self.corpus_store = corpus_store
+        self.corpus_index = corpus_index
+        self.poll_interval = poll_interval
+        settings = get_settings()
+        self.analysis_batch_size = analysis_batch_size or settings.analysis_batch_size
+        self.analysis_batch_max_nodes = settings.analysis_batch_max_nodes
+        self.batch_wait = batch_wait
+        # The batch template mirrors the default analysis template only
+        self.batching = self.analysis_batch_size > 1 and template_path is None
+
+        self.inboxes = {}
+        self.executors = {}
+        self.busy = {name: 0 for name in STAGES}
+        self.stage_stats = {name: {"processed": 0, "failed": 0} for name in STAGES}
+
+        # AdaptiveProcessor-compatible state used by the batch API and SystemMonitor
+        self.current_concurrency = sum(self.workers.values())
+        self.max_concurrency = self.current_concurrency
+        self.active_tasks = 0
+        self.running = False
+        self.paused = False
+        # Set while an upstream circuit breaker is open (monotonic deadline and upstream name)
+        self.held_until = 0.0
+        self.hold_reason = None
+
+        # Statistics
+        self.stats = {
+            "started_at": None,
+            "urls_processed": 0,
+            "urls_succeeded": 0,
+            "urls_skipped": 0,
+            "urls_failed": 0,
+            "urls_requeued": 0,
+            "avg_processing_time": 0,
+        }
+
+    async def process_queue(self, queue, url_processor=None, drain=False):
+        """
+        Process URLs from the queue until stopped.
+
+        Args:
+            queue: SmartQueue instance
+            url_processor: Ignored; accepted for compatibility with AdaptiveProcessor
+            drain: Return once the queue is empty and nothing is in flight
+        """
+        self.running = True
+        self.stats["started_at"] = datetime.now().isoformat()
+        self.queue = queue
+
+        self.inboxes = {
+            name: asyncio.Queue(maxsize=self.queue_size or 2 * self.workers[name]) for name in STAGES
+        }
+        self.executors = {
+            "fetch": ThreadPoolExecutor(self.workers["fetch"], thread_name_prefix="pipeline-fetch"),
+            "parse": (ProcessPoolExecutor(self.workers["parse"]) if self.parse_processes else
+                      ThreadPoolExecutor(self.workers["parse"], thread_name_prefix="pipeline-parse")),
+            "llm": ThreadPoolExecutor(self.workers["llm"], thread_name_prefix="pipeline-llm"),
+            "write": ThreadPoolExecutor(self.workers["write"], thread_name_prefix="pipeline-write"),
+        }
+        handlers = {"fetch": self._fetch, "parse": self._parse, "llm": self._analyze, "write": self._write}
+
+        pools = {}
+        for i, name in enumerate(STAGES):
+            outbox = self.inboxes[STAGES[i + 1]] if i + 1 < len(STAGES) else None
+            if name == "llm" and self.batching:
+                workers = [self._batch_llm_worker(outbox) for _ in range(self.workers[name])]
+            else:
+                workers = [self._stage_worker(name, handlers[name], outbox) for _ in range(self.workers[name])]
+            pools[name] = [asyncio.create_task(worker) for worker in workers]
+
+        try:
+            await self._feed(queue, drain)
+
+            # Shut the stages down in order so every item already fed finishes
+            for name in STAGES:
+                for _ in pools[name]:
+                    await self.inboxes[name].put(None)
+                await asyncio.gather(*pools[name])
+        except asyncio.CancelledError:
+            logger.info("Processing cancelled")
+            raise
+        finally:
+            self.running = False
+            for tasks in pools.values():
+                for task in tasks:
+                    task.cancel()
+            await asyncio.gather(*(task for tasks in pools.values() for task in tasks),
+                                 return_exceptions=True)
+            for executor in self.executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._update_gauges()
+
+    async def _feed(self, queue, drain):
+        """Move URLs from the SmartQueue into the fetch stage, waiting while it is full."""
+        while self.running:
+            if self.paused:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            # Feed nothing while an upstream is unavailable; those items would only be requeued
+            hold = self.held_until - time.monotonic()
+            if hold > 0:
+                await asyncio.sleep(min(hold, self.poll_interval))
+                continue
+
+            url = await queue.get_next()
+            if not url:
+                # Failed URLs may be requeued for retry, so only stop once nothing is in flight
+                if drain and self.active_tasks == 0:
+                    break
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            self.active_tasks += 1
+            item = {"url": url, "workflow_id": workflow_id_from_url(url), "started": time.perf_counter()}
+            await self.inboxes["fetch"].put(item)
+            self._update_gauges()
+
+    async def _stage_worker(self, name, handler, outbox):
+        """Handle items of one stage and pass results to the next stage's queue."""
+        inbox = self.inboxes[name]
+        while True:
+            item = await inbox.get()
+            if item is None:
+                break
+
+            self.busy[name] += 1
+            self._update_gauges()
+            try:
+                result = await handler(item)
+                self.stage_stats[name]["processed"] += 1
+            except CircuitOpenError as e:
+                await self._requeue(item, e)
+                result = None
+            except Exception as e:
+                self.stage_stats[name]["failed"] += 1
+                logger.error(f"{name} stage failed for {item['url']}: {e}")
+                logger.debug(traceback.format_exc())
+                await self._finish(item, error=f"{name}: {e}")
+                result = None
+            finally:
+                self.busy[name] -= 1
+
+            # Blocks while the next stage is saturated, which holds this worker back
+            if result is not None and outbox is not None:
+                await outbox.put(result)
+            self._update_gauges()
+
+    async def _batch_llm_worker(self, outbox):
+        """LLM stage worker that gathers small workflows into one batched request."""
+        loop = asyncio.get_running_loop()
+        inbox = self.inboxes["llm"]
+        stopping = False
+        while not stopping:
+            item = await inbox.get()
+            if item is None:
+                break
+
+            batch, singles = [], []
+            if await self._prepare(item):
+                (batch if self._batchable(item) else singles).append(item)
+            if batch:
+                # Wait briefly for more small workflows; whatever arrives in time shares the request
+                deadline = loop.time() + self.batch_wait
+                while len(batch) < self.analysis_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        more = await asyncio.wait_for(inbox.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if more is None:
+                        stopping = True
+                        break
+                    if await self._prepare(more):
+                        (batch if self._batchable(more) else singles).append(more)
+
+            groups = ([batch] if len(batch) > 1 else [[item] for item in batch]) + [[item] for item in singles]
+            for group in groups:
+                self.busy["llm"] += 1
+                self._update_gauges()
+                try:
+                    results = await self._analyze_group(group)
+                except CircuitOpenError as e:
+                    for item in group:
+                        await self._requeue(item, e)
+                    continue
+                finally:
+                    self.busy["llm"] -= 1
+
+                for item, error in results:
+                    if error:
+                        self.stage_stats["llm"]["failed"] += 1
+                        logger.error(f"llm stage failed for {item['url']}: {error}")
+                        await self._finish(item, error=f"llm: {error}")
+                    else:
+                        self.stage_stats["llm"]["processed"] += 1
+                        await outbox.put(item)
+                self._update_gauges()
+
+    async def _prepare(self, item):
+        """
+        Repair an item's workflow JSON before it is grouped for analysis.
+
+        Returns:
+            bool: True if the item can be analyzed; failed items are finished or requeued
+        """
+        self.busy["llm"] += 1
+        self._update_gauges()
+        try:
+            await self._repair(item)
+            return True
+        except CircuitOpenError as e:
+            await self._requeue(item, e)
+        except Exception as e:
+            self.stage_stats["llm"]["failed"] += 1
+            logger.error(f"llm stage failed for {item['url']}: {e}")
+            await self._finish(item, error=f"llm: {e}")
+        finally:
+            self.busy["llm"] -= 1
+        return False
+
+    def _batchable(self, item):
+        """Check whether an item is small enough to share an LLM request."""
+        return is_batchable(item["data"]["scraped_data"]["workflow"]["json"], self.analysis_batch_max_nodes)
+
+    async def _analyze_group(self, group):
+        """
+        Analyze one item or a batch of small items.
+
+        Returns:
+            list: (item, error) pairs, error None on success
+
+        Raises:
+            CircuitOpenError: If the analysis was not attempted because OpenRouter is unavailable
+        """
+        if len(group) == 1:
+            try:
+                return [(await self._analyze(group[0]), None)]
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                logger.debug(traceback.format_exc())
+                return [(group[0], str(e))]
+
+        loop = asyncio.get_running_loop()
+        items = [(item["workflow_id"], item["data"]["scraped_data"]["workflow"]["json"]) for item in group]
+        try:
+            with stage("analyze", model=self.model, batch=len(group)) as span:
+                analyses = await loop.run_in_executor(self.executors["llm"], analyze_workflows_batch,
+                                                      items, self.model, None, self.analysis_batch_size)
+                span.set_attribute("analysis_chars", sum(len(text or "") for text in analyses.values()))
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.debug(traceback.format_exc())
+            return [(item, str(e)) for item in group]
+
+        results = []
+        for item in group:
+            item["analysis"] = analyses.get(item["workflow_id"])
+            results.append((item, None if item["analysis"] else "Failed to analyze workflow"))
+        return results
+
+    async def _fetch(self, item):
+        """Download the workflow page."""
+        loop = asyncio.get_running_loop()
+        url = workflow_url(item["workflow_id"])
+        with stage("fetch", url=url, workflow_id=item["workflow_id"]) as span:
+            html = await loop.run_in_executor(self.executors["fetch"], download_workflow_html, url)
+            if html is None:
+                raise RuntimeError("Failed to fetch workflow")
+            span.set_attribute("html_bytes", len(html))
+        item["page_url"] = url
+        item["html"] = html
+        return item
+
+    async def _parse(self, item):
+        """Extract workflow JSON and metadata; skip workflows unchanged since the last run."""
+        loop = asyncio.get_running_loop()
+        html = item.pop("html")
+        with stage("extract", workflow_id=item["workflow_id"]) as span:
+            data = await loop.run_in_executor(self.executors["parse"], parse_workflow_html,
+                                              html, item["page_url"], False)
+            set_extract_attributes(span, data)
+
+        # Fingerprint the workflow as published, before the (non-deterministic) LLM repair
+        raw_json = data.get("scraped_data", {}).get("workflow", {}).get("raw_json")
+        if not raw_json:
+            raise RuntimeError("No workflow JSON found")
+
+        item["data"] = data
+        item["metadata"] = extract_metadata(data)
+        item["fingerprint"] = WorkflowManifest.fingerprint(raw_json, self.model, self.template_path)
+
+        if not self.force:
+            unchanged = get_manifest().is_unchanged(item["workflow_id"], item["fingerprint"])
+            CACHE_REQUESTS.inc(cache="workflow_manifest", result="hit" if unchanged else "miss")
+            if unchanged:
+                logger.info(f"Workflow {item['workflow_id']} unchanged since last run, skipping")
+                await self._finish(item, skipped=True)
+                return None
+        return item
+
+    async def _repair(self, item):
+        """Clean the raw workflow JSON on an LLM worker thread (the repair calls the LLM)."""
+        loop = asyncio.get_running_loop()
+        workflow = item["data"]["scraped_data"]["workflow"]
+        if "raw_json" in workflow:
+            if not await loop.run_in_executor(self.executors["llm"], repair_workflow_data, item["data"]):
+                raise RuntimeError("No workflow JSON found")
+
+    async def _analyze(self, item):
+        """Repair the workflow JSON if needed and run the LLM analysis."""
+        loop = asyncio.get_running_loop()
+        await self._repair(item)
+        workflow_json = item["data"]["scraped_data"]["workflow"]["json"]
+        analysis_text = None
+        sink = open_analysis_stream(item["workflow_id"], self.output_manager)
+        try:
+            with stage("analyze", model=self.model, workflow_id=item["workflow_id"]) as span:
+                analysis_text = await loop.run_in_executor(self.executors["llm"], analyze_workflow_json,
+                                                           workflow_json, self.model, self.template_path, sink)
+                span.set_attribute("analysis_chars", len(analysis_text or ""))
+        finally:
+            sink.close(None if analysis_text else "Failed to analyze workflow")
+        if not analysis_text:
+            raise RuntimeError("Failed to analyze workflow")
+        item["analysis"] = analysis_text
+        return item
+
+    async def _write(self, item):
+        """Write the artifacts and record the workflow in the manifest."""
+        loop = asyncio.get_running_loop()
+        with stage("write", workflow_id=item["workflow_id"]) as span:
+            outputs = await loop.run_in_executor(
+                self.executors["write"], write_workflow_outputs,
+                item["workflow_id"], item["data"], item["metadata"], item["analysis"], item["fingerprint"],
+                self.output_manager, self.corpus_store, self.corpus_index
+            )
+            span.set_attribute("artifacts", len(outputs) - 1)
+        get_manifest().record(item["workflow_id"], item["fingerprint"], outputs)
+        await self._finish(item)
+        return None
+
+    async def _finish(self, item, error=None, skipped=False):
+        """Mark a URL completed or failed in the SmartQueue and update statistics."""
+        processing_time = time.perf_counter() - item["started"]
+        self.active_tasks -= 1
+        self.stats["urls_processed"] += 1
+
+        if error:
+            self.stats["urls_failed"] += 1
+            WORKFLOWS_PROCESSED.inc(result="failed")
+            await self.queue.mark_failed(item["url"], error)
+            return
+
+        if skipped:
+            self.stats["urls_skipped"] += 1
+            WORKFLOWS_PROCESSED.inc(result="skipped")
+        else:
+            self.stats["urls_succeeded"] += 1
+            WORKFLOWS_PROCESSED.inc(result="success")
+        WORKFLOW_SECONDS.observe(processing_time)
+        await self.queue.mark_completed(item["url"])
+
+        if self.stats["avg_processing_time"] == 0:
+            self.stats["avg_processing_time"] = processing_time
+        else:
+            self.stats["avg_processing_time"] = (
+                self.stats["avg_processing_time"] * 0.9 + processing_time * 0.1
+            )
+        logger.info(f"Processed URL in {processing_time:.2f}s: {item['url']}")
+
+    async def _requeue(self, item, error):
+        """
+        Return an item to the SmartQueue because an upstream circuit breaker is open,
+        and hold feeding until the breaker lets a probe through.
+        """
+        self.active_tasks -= 1
+        self.stats["urls_requeued"] += 1
+        await self.queue.requeue(item["url"])
+
+        held_until = time.monotonic() + error.retry_after
+        if held_until > self.held_until:
+            self.held_until = held_until
+            self.hold_reason = error.upstream
+            logger.warning(f"Holding new work for {error.retry_after:.1f}s: {error.upstream} unavailable")
+
+    def _update_gauges(self):
+        """Refresh the per-stage queue depth and busy worker gauges."""
+        for name in STAGES:
+            inbox = self.inboxes.get(name)
+            STAGE_QUEUE_DEPTH.set(inbox.qsize() if inbox else 0, stage=name)
+            STAGE_BUSY.set(self.busy[name], stage=name)
+
+    def pause(self):
+        """Pause feeding new URLs; items already in the pipeline finish."""
+        if not self.paused:
+            self.paused = True
+            logger.info("Processing paused")
+
+    def resume(self):
+        """Resume feeding URLs."""
+        if self.paused:
+            self.paused = False
+            logger.info("Processing resumed")
+
+    def stop(self):
+        """Stop feeding URLs."""
+        self.running = False
+        logger.info("Processing stopped")
+
+    async def get_stats(self):
+        """
+        Get statistics about the pipeline.
+
+        Returns:
+            dict: Pipeline statistics, including workers, busy workers and queued items per stage
+        """
+        return {
+            **self.stats,
+            "mode": "pipeline",
+            "current_concurrency": self.current_concurrency,
+            "max_concurrency": self.max_concurrency,
+            "active_tasks": self.active_tasks,
+            "paused": self.paused,
+            "running": self.running,
+            "held_for": round(max(0.0, self.held_until - time.monotonic()), 1),
+            "hold_reason": self.hold_reason if self.held_until > time.monotonic() else None,
+            "stages": {
+                name: {
+                    "workers": self.workers[name],
+                    "busy": self.busy[name],
+                    "queued": self.inboxes[name].qsize() if name in self.inboxes else 0,
+                    **self.stage_stats[name]
+                }
+                for name in STAGES
+            },
+            # Per-stage latency percentiles (seconds) from the trace spans
+            "stage_latency": get_tracer().get_stats(),
+            # Attempts, success rate and latency per task/size class/model route
+            "model_routes": get_router().get_stats(),
+            "circuit_breakers": get_breaker_stats(),
+            # Tokens per minute, today's token and cost spend and the remaining daily budget
+            "llm_budget": get_token_limiter().get_stats(),
+            "system": {
+                "cpu_usage": psutil.cpu_percent(),
+                "memory_usage": psutil.virtual_memory().percent,
+                "disk_usage": psutil.disk_usage('/').percent
+            }
+        }
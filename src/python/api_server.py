@@ -1,8 +1,8 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, File, UploadFile, Request, Body
+from fastapi import FastAPI, HTTPException, BackgroundTasks, File, UploadFile, Request, Body, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 import uvicorn
 import time
 import os
@@ -25,6 +25,11 @@ import traceback
 from contextlib import asynccontextmanager
 import uuid
 
+# Add the repository root to the path for the shared src.utils modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.utils.metrics import REGISTRY, CONTENT_TYPE
+from src.utils.single_flight import SingleFlight
+
 # Setup structured logging
 import structlog
 logger = structlog.get_logger()
@@ -61,6 +66,11 @@ app.add_middleware(
 )
 
 from rate_limiter import BatchProcessor, RateLimitConfig
+from job_events import JobEventBus
+
+# Progress events of submitted jobs, streamed over SSE and WebSockets
+job_events = JobEventBus()
+JOB_EVENTS_HEARTBEAT = 15  # seconds between SSE keepalive comments
 
 # Initialize rate limiter and batch processor
 rate_limit_config = RateLimitConfig(
@@ -69,13 +79,48 @@ rate_limit_config = RateLimitConfig(
     max_concurrent_requests=10,
     cooldown_period=1.0
 )
-batch_processor = BatchProcessor(rate_limit_config)
+batch_processor = BatchProcessor(rate_limit_config, event_bus=job_events)
 
 # Store active crawlers and grid scrape jobs
 active_crawlers: Dict[str, AsyncWebCrawler] = {}
 grid_scrape_jobs: Dict[str, Dict[str, Any]] = {}
+job_tasks: Dict[str, asyncio.Task] = {}
 JOB_CLEANUP_THRESHOLD = timedelta(hours=24)  # Clean up jobs older than 24 hours
 
+# HTTP and job metrics exposed on /metrics
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "HTTP request latency by route", ["method", "route"])
+JOBS = REGISTRY.gauge("api_jobs", "Grid scrape and batch jobs by kind and status", ["kind", "status"])
+ACTIVE_CRAWLERS = REGISTRY.gauge("api_active_crawlers", "Crawler instances kept alive")
+EVENT_SUBSCRIBERS = REGISTRY.gauge("api_job_event_subscribers", "Open SSE and WebSocket job event streams")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and observe their latency per route template"""
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Use the route template (e.g. /jobs/{job_id}) to keep label cardinality bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=path, status=str(status))
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start_time, method=request.method, route=path)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Expose metrics in the Prometheus text format"""
+    JOBS.clear()
+    for kind, jobs in (("grid_scrape", grid_scrape_jobs), ("batch", batch_processor.jobs)):
+        for job in jobs.values():
+            JOBS.inc(kind=kind, status=job["status"])
+    ACTIVE_CRAWLERS.set(len(active_crawlers))
+    EVENT_SUBSCRIBERS.set(sum(len(queues) for queues in job_events.subscribers.values()))
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -129,168 +174,201 @@ async def test_minimal():
         logger.error("test_minimal_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/test-grid-scrape")
-async def test_grid_scrape(url: str):
-    """Test endpoint for grid scraping"""
+async def scrape_workflow(job_id: str, url: str, progress: Optional[Callable[[str], None]] = None):
+    """Crawl a workflow page and extract its workflow JSON
+    
+    Args:
+        job_id: Job ID used for the crawler and logging
+        url: Workflow page URL
+        progress: Optional callback receiving the current stage name
+        
+    Returns:
+        tuple: (response content, HTTP status code)
+    """
+    def report(stage: str):
+        if progress:
+            progress(stage)
+    
+    # Create crawler instance
+    report("starting_browser")
+    crawler = AsyncWebCrawler(job_id)
+    logger.info("crawler_created", job_id=job_id)
+    
     try:
-        logger.info("grid_scrape_called", url=url)
+        # Crawl the URL
+        logger.info("starting_crawl", job_id=job_id, url=url)
+        report("crawling")
+        await crawler.crawl(url)
+        logger.info("crawl_completed", job_id=job_id, url=url)
         
-        # Generate job ID
-        job_id = str(uuid.uuid4())
-        logger.info("job_id_generated", job_id=job_id)
+        # Get the scraped data
+        data = crawler.page_data
+        logger.info("data_retrieved", 
+                   job_id=job_id, 
+                   url=url, 
+                   data_size=len(str(data)),
+                   urls_scraped=len(data) if isinstance(data, dict) else 0)
         
-        # Create crawler instance
-        crawler = AsyncWebCrawler(job_id)
-        logger.info("crawler_created", job_id=job_id)
+        # Parse and structure workflow data
+        report("extracting")
+        structured_workflow = {}
+        workflow_json = None
         
-        try:
-            # Crawl the URL
-            logger.info("starting_crawl", job_id=job_id, url=url)
-            await crawler.crawl(url)
-            logger.info("crawl_completed", job_id=job_id, url=url)
-            
-            # Get the scraped data
-            data = crawler.page_data
-            logger.info("data_retrieved", 
-                       job_id=job_id, 
-                       url=url, 
-                       data_size=len(str(data)),
-                       urls_scraped=len(data) if isinstance(data, dict) else 0)
-            
-            # Parse and structure workflow data
-            structured_workflow = {}
-            workflow_json = None
-            
-            if url in data:
+        if url in data:
+            try:
+                # Use the n8n_extract.js script to extract workflow JSON
+                import subprocess
+                import tempfile
+                
+                # Create a temporary file with the HTML content
+                with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as temp_file:
+                    temp_file_path = temp_file.name
+                    # Get the page source from the crawler
+                    page_source = crawler.driver.page_source if hasattr(crawler, 'driver') and crawler.driver else ""
+                    if not page_source and 'page_source' in data[url]:
+                        page_source = data[url]['page_source']
+                    
+                    # Write the page source to the temp file
+                    temp_file.write(page_source.encode('utf-8'))
+                
                 try:
-                    # Use the n8n_extract.js script to extract workflow JSON
-                    import subprocess
-                    import tempfile
+                    # Run the n8n_extract.js script on the temp file
+                    result = subprocess.run(
+                        ['node', 'n8n_extract.js', temp_file_path],
+                        capture_output=True,
+                        text=True,
+                        check=False
+                    )
                     
-                    # Create a temporary file with the HTML content
-                    with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as temp_file:
-                        temp_file_path = temp_file.name
-                        # Get the page source from the crawler
-                        page_source = crawler.driver.page_source if hasattr(crawler, 'driver') and crawler.driver else ""
-                        if not page_source and 'page_source' in data[url]:
-                            page_source = data[url]['page_source']
+                    # Check if the script was successful
+                    if result.returncode == 0 and result.stdout.strip():
+                        # Parse the JSON output - skip the first line which is a log message
+                        stdout_lines = result.stdout.strip().split('\n')
+                        json_output = stdout_lines[-1]  # Get the last line which should be the JSON
                         
-                        # Write the page source to the temp file
-                        temp_file.write(page_source.encode('utf-8'))
-                    
-                    try:
-                        # Run the n8n_extract.js script on the temp file
-                        result = subprocess.run(
-                            ['node', 'n8n_extract.js', temp_file_path],
-                            capture_output=True,
-                            text=True,
-                            check=False
-                        )
+                        try:
+                            workflow_json = json.loads(json_output)
+                        except json.JSONDecodeError:
+                            # If the last line isn't valid JSON, try to find a valid JSON object in the output
+                            import re
+                            json_pattern = r'(\{.*\})'
+                            match = re.search(json_pattern, result.stdout, re.DOTALL)
+                            if match:
+                                workflow_json = json.loads(match.group(1))
+                            else:
+                                workflow_json = None
                         
-                        # Check if the script was successful
-                        if result.returncode == 0 and result.stdout.strip():
-                            # Parse the JSON output - skip the first line which is a log message
-                            stdout_lines = result.stdout.strip().split('\n')
-                            json_output = stdout_lines[-1]  # Get the last line which should be the JSON
-                            
-                            try:
-                                workflow_json = json.loads(json_output)
-                            except json.JSONDecodeError:
-                                # If the last line isn't valid JSON, try to find a valid JSON object in the output
-                                import re
-                                json_pattern = r'(\{.*\})'
-                                match = re.search(json_pattern, result.stdout, re.DOTALL)
-                                if match:
-                                    workflow_json = json.loads(match.group(1))
-                                else:
-                                    workflow_json = None
+                        # Create simplified response with just the workflow JSON
+                        response = {
+                            "workflow": workflow_json
+                        }
+                        
+                        logger.info("extracted_workflow_json_with_js_script", url=url)
+                        return response, 200
+                    else:
+                        # If script failed, fall back to text parsing
+                        if 'n8n_workflow_json' in data[url] and isinstance(data[url]['n8n_workflow_json'], str):
+                            workflow_content = data[url]['n8n_workflow_json']
                             
-                            # Create simplified response with just the workflow JSON
-                            response = {
-                                "workflow": workflow_json
+                            # Parse pipe-separated sections into structured data
+                            sections = [s.strip() for s in workflow_content.split('|') if s.strip()]
+                            structured_workflow = {
+                                "metadata": {
+                                    "title": sections[0] if len(sections) > 0 else "",
+                                    "description": sections[1] if len(sections) > 1 else "",
+                                    "version": "1.1"
+                                },
+                                "nodes": [],
+                                "connections": [],
                             }
                             
-                            logger.info("extracted_workflow_json_with_js_script", url=url)
-                            return JSONResponse(content=response)
-                        else:
-                            # If script failed, fall back to text parsing
-                            if 'n8n_workflow_json' in data[url] and isinstance(data[url]['n8n_workflow_json'], str):
-                                workflow_content = data[url]['n8n_workflow_json']
-                                
-                                # Parse pipe-separated sections into structured data
-                                sections = [s.strip() for s in workflow_content.split('|') if s.strip()]
-                                structured_workflow = {
-                                    "metadata": {
-                                        "title": sections[0] if len(sections) > 0 else "",
-                                        "description": sections[1] if len(sections) > 1 else "",
-                                        "version": "1.1"
-                                    },
-                                    "nodes": [],
-                                    "connections": [],
-                                }
-                                
-                                # Parse node details from subsequent sections
-                                for section in sections[2:]:
-                                    if ':' in section:
-                                        key, value = section.split(':', 1)
-                                        structured_workflow["nodes"].append({
-                                            "type": key.strip(),
-                                            "description": value.strip()
-                                        })
-                                logger.info("extracted_workflow_text", url=url)
-                                
-                                # Return simplified response with structured workflow
-                                return JSONResponse(content={"workflow": structured_workflow})
+                            # Parse node details from subsequent sections
+                            for section in sections[2:]:
+                                if ':' in section:
+                                    key, value = section.split(':', 1)
+                                    structured_workflow["nodes"].append({
+                                        "type": key.strip(),
+                                        "description": value.strip()
+                                    })
+                            logger.info("extracted_workflow_text", url=url)
                             
-                            # Log the error
-                            if result.stderr:
-                                logger.warning("js_script_error", url=url, error=result.stderr)
-                                
-                            # Return error response
-                            return JSONResponse(
-                                content={"error": "Failed to extract workflow JSON"},
-                                status_code=500
-                            )
-                    finally:
-                        # Clean up the temp file
-                        try:
-                            os.unlink(temp_file_path)
-                        except Exception as e:
-                            logger.warning("temp_file_cleanup_failed", url=url, error=str(e))
-                except Exception as e:
-                    logger.error("workflow_parsing_failed", url=url, error=str(e))
-                    return JSONResponse(
-                        content={"error": f"Workflow parsing failed: {str(e)}"},
-                        status_code=500
-                    )
-            
-            # If we get here, we couldn't extract a workflow
-            return JSONResponse(
-                content={"error": "No workflow found in the provided URL"},
-                status_code=404
-            )
-            
+                            # Return simplified response with structured workflow
+                            return {"workflow": structured_workflow}, 200
+                        
+                        # Log the error
+                        if result.stderr:
+                            logger.warning("js_script_error", url=url, error=result.stderr)
+                            
+                        # Return error response
+                        return {"error": "Failed to extract workflow JSON"}, 500
+                finally:
+                    # Clean up the temp file
+                    try:
+                        os.unlink(temp_file_path)
+                    except Exception as e:
+                        logger.warning("temp_file_cleanup_failed", url=url, error=str(e))
+            except Exception as e:
+                logger.error("workflow_parsing_failed", url=url, error=str(e))
+                return {"error": f"Workflow parsing failed: {str(e)}"}, 500
+        
+        # If we get here, we couldn't extract a workflow
+        return {"error": "No workflow found in the provided URL"}, 404
+        
+    except Exception as e:
+        logger.error("crawl_execution_failed",
+                    job_id=job_id,
+                    url=url,
+                    error=str(e),
+                    error_type=type(e).__name__)
+        raise
+    finally:
+        logger.info("closing_crawler", job_id=job_id)
+        crawler.close()
+
+# Concurrent scrapes of the same URL (/test-grid-scrape, /jobs, batch items) share one crawl
+scrape_flight = SingleFlight("grid_scrape")
+
+async def scrape_workflow_once(job_id: str, url: str, progress: Optional[Callable[[str], None]] = None):
+    """Scrape a workflow, joining a scrape of the same URL that is already running
+    
+    A caller that joins another scrape only receives its result; progress
+    callbacks are reported for the scrape that actually runs.
+    """
+    return await scrape_flight.do(url, scrape_workflow, job_id, url, progress)
+
+def record_failed_job(job_id: str, url: str, error: Exception):
+    """Store error information for a grid scrape job and notify subscribers"""
+    grid_scrape_jobs[job_id] = {
+        "status": "failed",
+        "url": url,
+        "timestamp": datetime.now().isoformat(),
+        "error": str(error),
+        "error_type": type(error).__name__,
+        "is_running": False
+    }
+    job_events.publish(job_id, "failed", {
+        "url": url,
+        "error": str(error),
+        "error_type": type(error).__name__
+    })
+
+@app.get("/test-grid-scrape")
+async def test_grid_scrape(url: str):
+    """Test endpoint for grid scraping"""
+    try:
+        logger.info("grid_scrape_called", url=url)
+        
+        # Generate job ID
+        job_id = str(uuid.uuid4())
+        logger.info("job_id_generated", job_id=job_id)
+        
+        try:
+            content, status_code = await scrape_workflow_once(job_id, url)
         except Exception as e:
-            logger.error("crawl_execution_failed",
-                        job_id=job_id,
-                        url=url,
-                        error=str(e),
-                        error_type=type(e).__name__)
-            
-            # Store error information
-            grid_scrape_jobs[job_id] = {
-                "status": "failed",
-                "url": url,
-                "timestamp": datetime.now().isoformat(),
-                "error": str(e),
-                "error_type": type(e).__name__,
-                "is_running": False
-            }
-            
+            record_failed_job(job_id, url, e)
             raise
-        finally:
-            logger.info("closing_crawler", job_id=job_id)
-            crawler.close()
+        
+        return JSONResponse(content=content, status_code=status_code)
             
     except Exception as e:
         logger.error("grid_scrape_failed", 
@@ -306,10 +384,135 @@ async def test_grid_scrape(url: str):
             }
         )
 
+class JobRequest(BaseModel):
+    url: Optional[str] = None
+    urls: Optional[List[str]] = None
+
+async def run_grid_scrape_job(job_id: str, url: str):
+    """Run a submitted grid scrape job, publishing progress events"""
+    job = grid_scrape_jobs[job_id]
+    
+    def progress(stage: str):
+        job["stage"] = stage
+        job_events.publish(job_id, "progress", {"url": url, "stage": stage})
+    
+    job.update(status="running", is_running=True)
+    job_events.publish(job_id, "running", {"url": url})
+    
+    try:
+        content, status_code = await scrape_workflow_once(job_id, url, progress)
+    except Exception as e:
+        record_failed_job(job_id, url, e)
+        return
+    
+    workflow = content.get("workflow")
+    job.update(
+        status="completed" if status_code == 200 else "failed",
+        is_running=False,
+        status_code=status_code,
+        result=content,
+        workflow_json=json.dumps(workflow) if workflow else None,
+        error=content.get("error")
+    )
+    if status_code == 200:
+        job_events.publish(job_id, "completed", {"url": url, "result": content})
+    else:
+        job_events.publish(job_id, "failed", {"url": url, "error": content.get("error"), "status_code": status_code})
+    logger.info("grid_scrape_job_finished", job_id=job_id, status=job["status"])
+
+async def scrape_batch_item(url: str) -> Dict[str, Any]:
+    """Scrape one URL of a batch job, raising on failure so it is counted as an error"""
+    content, status_code = await scrape_workflow_once(str(uuid.uuid4()), url)
+    if status_code != 200:
+        raise RuntimeError(content.get("error", f"HTTP {status_code}"))
+    return {"url": url, **content}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """Submit a grid scrape (url) or batch (urls) job and return immediately"""
+    if bool(request.url) == bool(request.urls):
+        raise HTTPException(status_code=400, detail="Provide either 'url' or a non-empty 'urls' list")
+    
+    if request.urls:
+        job_id = batch_processor.submit_batch(request.urls, scrape_batch_item)
+    else:
+        job_id = str(uuid.uuid4())
+        grid_scrape_jobs[job_id] = {
+            "status": "queued",
+            "url": request.url,
+            "timestamp": datetime.now().isoformat(),
+            "is_running": False
+        }
+        job_events.publish(job_id, "queued", {"url": request.url})
+        task = asyncio.create_task(run_grid_scrape_job(job_id, request.url))
+        job_tasks[job_id] = task
+        task.add_done_callback(lambda _: job_tasks.pop(job_id, None))
+    
+    logger.info("job_submitted", job_id=job_id)
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events",
+        "websocket_url": f"/jobs/{job_id}/ws"
+    }
+
+def job_exists(job_id: str) -> bool:
+    """Check whether a grid scrape or batch job is known"""
+    return job_id in grid_scrape_jobs or job_id in batch_processor.jobs or job_events.has_job(job_id)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """Stream job progress and results as Server-Sent Events"""
+    if not job_exists(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Resume after the last event the client saw when it reconnects
+    last_event_id = request.headers.get("last-event-id")
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    
+    async def event_stream():
+        async for entry in job_events.subscribe(job_id, last_event_id, heartbeat=JOB_EVENTS_HEARTBEAT):
+            if await request.is_disconnected():
+                break
+            yield ": keepalive\n\n" if entry is None else job_events.format_sse(entry)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/jobs/{job_id}/ws")
+async def job_events_websocket(websocket: WebSocket, job_id: str):
+    """Stream job progress and results over a WebSocket"""
+    await websocket.accept()
+    if not job_exists(job_id):
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    
+    try:
+        async for entry in job_events.subscribe(job_id):
+            await websocket.send_json(entry)
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("job_websocket_disconnected", job_id=job_id)
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, include_failed: bool = True, limit: int = 100, offset: int = 0):
+    """Get results of a batch job"""
+    try:
+        return batch_processor.get_job_results(job_id, include_failed, limit, offset)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
 @app.get("/jobs/{job_id}")
 async def get_job_status(job_id: str):
     """Get status of a grid scrape job"""
     try:
+        if job_id in batch_processor.jobs:
+            return batch_processor.get_job_status(job_id)
+        
         if job_id not in grid_scrape_jobs:
             logger.error("job_not_found", job_id=job_id)
             raise HTTPException(status_code=404, detail="Job not found")
@@ -357,6 +560,16 @@ async def list_jobs():
                 "timestamp": job["timestamp"],
                 "is_running": job.get("is_running", False)
             })
+        for job_id, job in batch_processor.jobs.items():
+            jobs_list.append({
+                "job_id": job_id,
+                "status": job["status"],
+                "url": None,
+                "timestamp": datetime.fromtimestamp(job["start_time"]).isoformat(),
+                "is_running": job["status"] in ("queued", "running"),
+                "total": job["total"],
+                "completed": job["completed"]
+            })
         
         logger.info("jobs_listed", count=len(jobs_list))
         return {"jobs": jobs_list}
@@ -374,8 +587,17 @@ async def cleanup_old_jobs():
                 job_time = datetime.fromisoformat(job["timestamp"])
                 if current_time - job_time > JOB_CLEANUP_THRESHOLD:
                     del grid_scrape_jobs[job_id]
+                    job_events.discard(job_id)
                     logger.info("cleaned_up_job", job_id=job_id)
             
+            # Clean up finished batch jobs
+            for job_id, job in list(batch_processor.jobs.items()):
+                job_time = datetime.fromtimestamp(job["start_time"])
+                if job["status"] in ("completed", "failed") and current_time - job_time > JOB_CLEANUP_THRESHOLD:
+                    del batch_processor.jobs[job_id]
+                    job_events.discard(job_id)
+                    logger.info("cleaned_up_batch_job", job_id=job_id)
+            
             # Clean up inactive crawlers
             for job_id, crawler in list(active_crawlers.items()):
                 if not crawler.is_running and crawler.completion_time:
@@ -25,6 +25,21 @@ HTML_CONTENT_DIR = os.getenv("HTML_CONTENT_DIR", "html_content")
 MARKDOWN_CONTENT_DIR = os.getenv("MARKDOWN_CONTENT_DIR", "markdown_content")
 EXTRACTED_CONTENT_DIR = os.getenv("EXTRACTED_CONTENT_DIR", "extracted_content")
 
+# Embedding Cache Settings (set EMBEDDING_CACHE_MAX_ENTRIES=0 to disable)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CACHE_DIR, "embeddings.sqlite"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 100000))
+
+# n8n Crawl Settings (URLs processed at once per /n8n/crawl request)
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", 4))
+
+# Chunking Settings (tokens per chunk and tokens shared between neighbouring chunks)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 512))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 64))
+
+# Vector Index Settings (supabase, numpy or hnsw)
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "supabase")
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", os.path.join(CACHE_DIR, "vector_index"))
+
 # Logging Settings
 LOG_FILE = os.getenv("LOG_FILE", "crawler.log")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO") 
\ No newline at end of file
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+from logging_config import get_logger
+
+logger = get_logger("embedding_cache")
+
+class EmbeddingCache:
+    """Persistent, LRU-bounded cache of embeddings keyed by a hash of model + text.
+
+    Vectors are stored as packed float32 blobs (4 bytes per dimension) in SQLite,
+    so a 1536-dim embedding costs ~6 KB instead of ~30 KB of JSON.
+    """
+
+    def __init__(self, path: str = "cache/embeddings.sqlite", max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> bytes:
+        """Hash model and text into a fixed-size cache key"""
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings for texts, returning None for misses"""
+        keys = [self.make_key(model, text) for text in texts]
+        found: Dict[bytes, bytes] = {}
+
+        with self.lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, vector in self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ):
+                    found[key] = vector
+
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self.conn.commit()
+
+            results = []
+            for key in keys:
+                if key in found:
+                    self.hits += 1
+                    results.append(array("f", found[key]).tolist())
+                else:
+                    self.misses += 1
+                    results.append(None)
+
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]) -> None:
+        """Store embeddings and evict least recently used entries beyond max_entries"""
+        now = time.time()
+        rows = [
+            (self.make_key(model, text), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        if not rows:
+            return
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self) -> None:
+        """Trim the cache to 90% of max_entries once it overflows (caller holds the lock)"""
+        count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+
+        excess = count - int(self.max_entries * 0.9)
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        logger.info("embedding_cache_evicted", evicted=excess, max_entries=self.max_entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit-rate metrics and cache size"""
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries
+        }
+
+    def close(self) -> None:
+        """Close the database connection"""
+        self.conn.close()
@@ -0,0 +1,109 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from logging_config import get_logger
+
+logger = get_logger("job_events")
+
+# Events after which a job produces no further updates
+TERMINAL_EVENTS = {"completed", "failed"}
+
+class JobEventBus:
+    """In-process publish/subscribe of job progress events.
+
+    Every job keeps a bounded event history so late subscribers (or clients
+    reconnecting with Last-Event-ID) replay what they missed before receiving
+    live events.
+    """
+
+    def __init__(self, history_limit: int = 1000):
+        self.history_limit = history_limit
+        self.history: Dict[str, List[Dict[str, Any]]] = {}
+        self.sequence: Dict[str, int] = {}
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def publish(self, job_id: str, event: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Record an event for a job and deliver it to current subscribers"""
+        seq = self.sequence.get(job_id, 0) + 1
+        self.sequence[job_id] = seq
+        entry = {
+            "id": seq,
+            "job_id": job_id,
+            "event": event,
+            "data": data or {},
+            "timestamp": datetime.now().isoformat()
+        }
+
+        history = self.history.setdefault(job_id, [])
+        history.append(entry)
+        if len(history) > self.history_limit:
+            # Keep the first event so replays still show when the job started
+            del history[1:len(history) - self.history_limit + 1]
+
+        for queue in self.subscribers.get(job_id, ()):
+            queue.put_nowait(entry)
+        return entry
+
+    def has_job(self, job_id: str) -> bool:
+        """Check whether any event was published for a job"""
+        return job_id in self.history
+
+    def is_finished(self, job_id: str) -> bool:
+        """Check whether a job has published a terminal event"""
+        history = self.history.get(job_id)
+        return bool(history) and history[-1]["event"] in TERMINAL_EVENTS
+
+    async def subscribe(self,
+                        job_id: str,
+                        last_event_id: Optional[int] = None,
+                        heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield past and live events of a job until it finishes
+
+        Args:
+            job_id: Job to follow
+            last_event_id: Skip events up to this id (resume after reconnect)
+            heartbeat: Yield None after this many idle seconds so callers can send keepalives
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.setdefault(job_id, set()).add(queue)
+        last_id = last_event_id or 0
+
+        try:
+            # Subscribe before replaying so no event is lost in between; duplicates are skipped by id
+            for entry in list(self.history.get(job_id, ())):
+                if entry["id"] > last_id:
+                    last_id = entry["id"]
+                    yield entry
+            if self.is_finished(job_id):
+                return
+
+            while True:
+                try:
+                    entry = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                if entry["id"] <= last_id:
+                    continue
+                last_id = entry["id"]
+                yield entry
+                if entry["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            subscribers = self.subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self.subscribers[job_id]
+
+    def discard(self, job_id: str) -> None:
+        """Forget the event history of a job"""
+        self.history.pop(job_id, None)
+        self.sequence.pop(job_id, None)
+
+    @staticmethod
+    def format_sse(entry: Dict[str, Any]) -> str:
+        """Format an event as a Server-Sent Events message"""
+        return f"id: {entry['id']}\nevent: {entry['event']}\ndata: {json.dumps(entry, default=str)}\n\n"
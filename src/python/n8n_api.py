@@ -1,14 +1,24 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Dict, Optional, Union
 from n8n_integration import Crawl4AIAgent
 import asyncio
+import json
 import uvicorn
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Shutdown: save the local vector index (the hnsw graph is only saved periodically)
+    agent.close()
 
 app = FastAPI(
     title="Crawl4AI n8n API",
     description="n8n-specific endpoints for Crawl4AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Initialize agent
@@ -17,6 +27,8 @@ agent = Crawl4AIAgent()
 class CrawlRequest(BaseModel):
     urls: Union[str, List[str]]
     metadata: Optional[Dict] = None
+    concurrency: Optional[int] = None
+    stream: bool = False
 
 class SearchRequest(BaseModel):
     query: str
@@ -25,9 +37,20 @@ class SearchRequest(BaseModel):
 @app.post("/n8n/crawl")
 async def crawl_urls(request: CrawlRequest):
     """Crawl one or more URLs and store in Supabase."""
+    urls = [request.urls] if isinstance(request.urls, str) else request.urls
+    if request.concurrency is not None and request.concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1")
+
+    # Stream one NDJSON line per URL as soon as it finishes
+    if request.stream:
+        async def ndjson():
+            async for result in agent.iter_process_urls(urls, request.metadata, request.concurrency):
+                yield json.dumps(result, default=str) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
     try:
-        urls = [request.urls] if isinstance(request.urls, str) else request.urls
-        results = await agent.process_urls(urls, request.metadata)
+        results = await agent.process_urls(urls, request.metadata, request.concurrency)
         return {
             "status": "success",
             "results": results
@@ -47,6 +70,17 @@ async def search_content(request: SearchRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/n8n/stats")
+async def get_stats():
+    """Get embedding cache and vector index metrics."""
+    return {
+        "embedding_cache": agent.get_cache_stats(),
+        "vector_index": {
+            "backend": type(agent.vector_index).__name__,
+            "chunks": await asyncio.to_thread(agent.vector_index.count)
+        }
+    }
+
 @app.get("/n8n/health")
 async def health_check():
     """Check if the service is healthy."""
@@ -1,102 +1,185 @@
 import os
 from supabase import create_client, Client
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import openai
 from datetime import datetime
 import tiktoken
 import json
 from crawler_script import AsyncWebCrawler
-from bs4 import BeautifulSoup
+from embedding_cache import EmbeddingCache
+from vector_index import VectorIndex, create_vector_index
+from text_chunker import TextChunker, extract_text, iter_file_pieces
+from config import (EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+                    VECTOR_INDEX_BACKEND, VECTOR_INDEX_PATH, CHUNK_SIZE, CHUNK_OVERLAP,
+                    CRAWL_CONCURRENCY)
+from logging_config import get_logger
 import asyncio
 
+logger = get_logger("n8n_integration")
+
 class Crawl4AIAgent:
-    def __init__(self):
-        # Initialize Supabase
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+    def __init__(self,
+                 supabase_client: Optional[Client] = None,
+                 embeddings_client=None,
+                 crawler=None,
+                 embedding_batch_size: Optional[int] = None,
+                 insert_batch_size: Optional[int] = None,
+                 embedding_concurrency: Optional[int] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None,
+                 vector_index: Optional[VectorIndex] = None):
+        # Initialize Supabase (a client pointed at a local PostgREST stub can be injected);
+        # local vector index backends work offline without it
+        if supabase_client is None and vector_index is None and VECTOR_INDEX_BACKEND == "supabase":
+            supabase_url = os.getenv("SUPABASE_URL")
+            supabase_key = os.getenv("SUPABASE_KEY")
+            supabase_client = create_client(supabase_url, supabase_key)
+        self.supabase: Optional[Client] = supabase_client
+        self.vector_index = vector_index or create_vector_index(
+            VECTOR_INDEX_BACKEND, VECTOR_INDEX_PATH, supabase_client
+        )
         
-        # Initialize OpenAI
+        # Initialize OpenAI (OPENAI_BASE_URL redirects the default client to a local stub)
         openai.api_key = os.getenv("OPENAI_API_KEY")
+        self.embeddings_client = embeddings_client or openai.embeddings
         self.embedding_model = "text-embedding-3-small"
         self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.chunker = TextChunker(self.encoding, CHUNK_SIZE, CHUNK_OVERLAP)
+        
+        # Batching: many chunks per embedding request and per insert
+        self.embedding_batch_size = embedding_batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", 96))
+        self.insert_batch_size = insert_batch_size or int(os.getenv("SUPABASE_INSERT_BATCH_SIZE", 100))
+        self.embedding_semaphore = asyncio.Semaphore(
+            embedding_concurrency or int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+        )
+        
+        # Persistent embedding cache so recrawls and repeated queries skip the API
+        if embedding_cache is None and EMBEDDING_CACHE_MAX_ENTRIES > 0:
+            embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES)
+        self.embedding_cache = embedding_cache
         
-        # Initialize crawler
-        self.crawler = AsyncWebCrawler()
+        # Initialize crawler; its single browser session is shared by all workers,
+        # so page loads are serialized while embedding and inserts overlap
+        self.crawler = crawler or AsyncWebCrawler()
+        self.crawl_lock = asyncio.Lock()
+        self.crawl_concurrency = CRAWL_CONCURRENCY
 
     def get_embedding(self, text: str) -> List[float]:
         """Get OpenAI embedding for text."""
-        response = openai.embeddings.create(
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get OpenAI embeddings for many texts, batching inputs per request."""
+        results, missing = self._lookup_cached(texts)
+        embeddings = []
+        for i in range(0, len(missing), self.embedding_batch_size):
+            embeddings.extend(self._embed_batch(missing[i:i + self.embedding_batch_size]))
+        return self._fill_missing(texts, results, missing, embeddings)
+
+    def _lookup_cached(self, texts: List[str]):
+        """Return cached embeddings (None for misses) and the unique texts still to embed."""
+        if self.embedding_cache:
+            results = self.embedding_cache.get_many(self.embedding_model, texts)
+        else:
+            results = [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        return results, missing
+
+    def _fill_missing(self, texts: List[str], results: List, missing: List[str],
+                      embeddings: List[List[float]]) -> List[List[float]]:
+        """Cache freshly computed embeddings and merge them into the results."""
+        if self.embedding_cache and missing:
+            self.embedding_cache.put_many(self.embedding_model, missing, embeddings)
+        computed = dict(zip(missing, embeddings))
+        return [result if result is not None else computed[text] for text, result in zip(texts, results)]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a single batch of texts with one API request."""
+        response = self.embeddings_client.create(
             model=self.embedding_model,
-            input=text
+            input=texts
         )
-        return response.data[0].embedding
+        # The API may return items out of order; restore input order
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
 
-    def chunk_text(self, text: str, chunk_size: int = 512) -> List[str]:
-        """Split text into chunks of roughly equal token length."""
-        tokens = self.encoding.encode(text)
-        chunks = []
-        
-        for i in range(0, len(tokens), chunk_size):
-            chunk = tokens[i:i + chunk_size]
-            chunks.append(self.encoding.decode(chunk))
-            
-        return chunks
+    async def aget_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get embeddings without blocking the event loop, running batches concurrently."""
+        async def embed(batch):
+            async with self.embedding_semaphore:
+                return await asyncio.to_thread(self._embed_batch, batch)
+
+        # Cache reads, writes and eviction are SQLite disk I/O; keep them off the event loop too
+        results, missing = await asyncio.to_thread(self._lookup_cached, texts)
+        batches = [missing[i:i + self.embedding_batch_size]
+                   for i in range(0, len(missing), self.embedding_batch_size)]
+        embedded = await asyncio.gather(*(embed(batch) for batch in batches))
+        embeddings = [embedding for batch in embedded for embedding in batch]
+        return await asyncio.to_thread(self._fill_missing, texts, results, missing, embeddings)
+
+    def get_cache_stats(self) -> Dict:
+        """Get embedding cache hit-rate metrics."""
+        if not self.embedding_cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.embedding_cache.get_stats()}
+
+    async def insert_chunks(self, rows: List[Dict]) -> int:
+        """Bulk insert chunk rows into the vector index, one request per insert batch."""
+        if self.vector_index.local:
+            # Local indexes replace a URL's chunks as a whole, so add them in one call
+            return await asyncio.to_thread(self.vector_index.add, rows)
+
+        batches = [rows[i:i + self.insert_batch_size]
+                   for i in range(0, len(rows), self.insert_batch_size)]
+        await asyncio.gather(*(asyncio.to_thread(self.vector_index.add, batch) for batch in batches))
+        return len(rows)
+
+    def chunk_text(self, text: str, chunk_size: Optional[int] = None) -> List[str]:
+        """Split text into overlapping chunks along paragraph and sentence boundaries."""
+        chunker = self.chunker
+        if chunk_size and chunk_size != chunker.chunk_size:
+            chunker = TextChunker(self.encoding, chunk_size, min(chunker.overlap, chunk_size // 4))
+        return chunker.chunk_text(text)
 
     def extract_text_from_html(self, html: str) -> str:
-        """Extract clean text from HTML."""
-        soup = BeautifulSoup(html, 'lxml')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-            
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text
+        """Extract clean text from HTML, one line per block element."""
+        return extract_text(html)
+
+    def chunk_html_file(self, html_path: str) -> List[str]:
+        """Stream an HTML file through text extraction and chunking."""
+        return list(self.chunker.chunk_html(iter_file_pieces(html_path)))
 
     async def process_url(self, url: str, metadata: Optional[Dict] = None) -> Dict:
         """Process a single URL and store results in Supabase."""
-        # Crawl the URL
-        await self.crawler.crawl(url)
-        
-        # Get the HTML content
+        # Crawl the URL and get the HTML content
         html_path = None
-        for row in self.crawler.cursor.execute("SELECT html_path FROM pages WHERE url = ?", (url,)):
-            html_path = row[0]
+        async with self.crawl_lock:
+            await self.crawler.crawl(url)
+            for row in self.crawler.cursor.execute("SELECT html_path FROM pages WHERE url = ?", (url,)):
+                html_path = row[0]
             
         if not html_path:
             return {"status": "error", "message": "Failed to crawl URL"}
             
-        # Read HTML content
-        with open(html_path, 'r', encoding='utf-8') as f:
-            html = f.read()
-            
-        # Extract text
-        text = self.extract_text_from_html(html)
-        
-        # Chunk text
-        chunks = self.chunk_text(text)
+        # Extract and chunk text while streaming the HTML file (off the event loop)
+        chunks = await asyncio.to_thread(self.chunk_html_file, html_path)
         
-        # Get embeddings and store in Supabase
-        for i, chunk in enumerate(chunks):
-            embedding = self.get_embedding(chunk)
-            
-            # Store in Supabase
-            self.supabase.table("page_chunks").insert({
+        # Get embeddings in batches and bulk insert into Supabase
+        embeddings = await self.aget_embeddings(chunks)
+        crawl_date = datetime.now().isoformat()
+        rows = [
+            {
                 "url": url,
                 "chunk_index": i,
                 "content": chunk,
                 "embedding": embedding,
                 "metadata": {
                     **(metadata or {}),
-                    "crawl_date": datetime.now().isoformat(),
+                    "crawl_date": crawl_date,
                     "chunk_count": len(chunks)
                 }
-            }).execute()
+            }
+            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+        ]
+        await self.insert_chunks(rows)
             
         return {
             "status": "success",
@@ -105,27 +188,63 @@ class Crawl4AIAgent:
             "metadata": metadata
         }
 
-    async def search_similar(self, query: str, limit: int = 5) -> List[Dict]:
+    async def search_similar(self, query: str, limit: int = 5, threshold: float = 0.5) -> List[Dict]:
         """Search for similar content using vector similarity."""
-        query_embedding = self.get_embedding(query)
-        
-        # Search using Supabase's vector similarity
-        response = self.supabase.rpc(
-            'match_page_chunks',
-            {
-                'query_embedding': query_embedding,
-                'match_threshold': 0.5,
-                'match_count': limit
-            }
-        ).execute()
+        query_embedding = (await self.aget_embeddings([query]))[0]
         
-        return response.data
+        # Local indexes answer in-process; Supabase goes through the match_page_chunks RPC
+        if self.vector_index.local:
+            return self.vector_index.search(query_embedding, limit, threshold)
+        return await asyncio.to_thread(self.vector_index.search, query_embedding, limit, threshold)
+
+    async def process_urls(self, urls: List[str], metadata: Optional[Dict] = None,
+                           concurrency: Optional[int] = None) -> List[Dict]:
+        """Process multiple URLs with a bounded worker pool, returning results in input order."""
+        results: List[Optional[Dict]] = [None] * len(urls)
+        async for index, result in self._run_workers(urls, metadata, concurrency):
+            results[index] = result
+        return results
+
+    async def iter_process_urls(self, urls: List[str], metadata: Optional[Dict] = None,
+                                concurrency: Optional[int] = None) -> AsyncIterator[Dict]:
+        """Process multiple URLs with a bounded worker pool, yielding results as they finish."""
+        async for _, result in self._run_workers(urls, metadata, concurrency):
+            yield result
+
+    async def _run_workers(self, urls: List[str], metadata: Optional[Dict],
+                           concurrency: Optional[int]) -> AsyncIterator[Tuple[int, Dict]]:
+        """Run at most `concurrency` process_url calls at a time, yielding (index, result)."""
+        pending: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(urls):
+            pending.put_nowait(item)
+        finished: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            while True:
+                try:
+                    index, url = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    result = await self.process_url(url, metadata)
+                except Exception as e:
+                    # One failing URL must not abort the rest of the request
+                    logger.error("process_url_failed", url=url, error=str(e))
+                    result = {"status": "error", "url": url, "message": str(e)}
+                await finished.put((index, result))
 
-    async def process_urls(self, urls: List[str], metadata: Optional[Dict] = None) -> List[Dict]:
-        """Process multiple URLs in parallel."""
-        tasks = [self.process_url(url, metadata) for url in urls]
-        return await asyncio.gather(*tasks)
+        worker_count = max(1, min(concurrency or self.crawl_concurrency, len(urls)))
+        workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+        try:
+            for _ in range(len(urls)):
+                yield await finished.get()
+        finally:
+            # Stop remaining work if the consumer goes away (e.g. a client disconnects)
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
     def close(self):
         """Clean up resources."""
+        self.vector_index.close()
         self.crawler.close() 
\ No newline at end of file
@@ -24,6 +24,7 @@ load_dotenv()
 
 # OpenRouter API Configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
 OPENROUTER_MODEL = "openai/gpt-4-turbo"
 
 def call_openrouter(prompt):
@@ -46,7 +47,7 @@ def call_openrouter(prompt):
     }
     
     try:
-        response = requests.post("https://openrouter.ai/api/v1/chat/completions", json=payload, headers=headers)
+        response = requests.post(f"{OPENROUTER_BASE_URL}/chat/completions", json=payload, headers=headers)
         response.raise_for_status()
         return response.json()["choices"][0]["message"]["content"]
     except requests.exceptions.RequestException as e:
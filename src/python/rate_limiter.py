@@ -1,5 +1,6 @@
 import asyncio
 import time
+import uuid
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional
 import structlog
@@ -15,34 +16,67 @@ class RateLimitConfig:
     cooldown_period: float = 1.0
 
 class BatchProcessor:
-    def __init__(self, config: RateLimitConfig):
+    def __init__(self, config: RateLimitConfig, event_bus=None):
         self.config = config
+        self.event_bus = event_bus
+        self.tasks: Dict[str, asyncio.Task] = {}
         self.jobs: Dict[str, Dict[str, Any]] = {}
         self.semaphore = asyncio.Semaphore(config.max_concurrent_requests)
         self.last_request_time = 0
         self.request_count = 0
         self.window_start = time.time()
         
-    async def process_batch(self, items: List[Any], process_func: Callable) -> str:
+    def _create_job(self, items: List[Any], status: str) -> str:
+        """Register a new batch job and return its ID"""
+        job_id = f"batch_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        
+        self.jobs[job_id] = {
+            "total": len(items),
+            "completed": 0,
+            "results": [],
+            "errors": [],
+            "start_time": time.time(),
+            "status": status
+        }
+        self._publish(job_id, status, total=len(items))
+        return job_id
+    
+    def _publish(self, job_id: str, event: str, **data) -> None:
+        """Forward a job event to the event bus, if any"""
+        if self.event_bus is not None:
+            self.event_bus.publish(job_id, event, data)
+    
+    def submit_batch(self, items: List[Any], process_func: Callable) -> str:
+        """Start processing a batch in the background and return its job ID immediately"""
+        job_id = self._create_job(items, "queued")
+        task = asyncio.create_task(self.process_batch(items, process_func, job_id=job_id))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda done: self._forget_task(job_id, done))
+        return job_id
+    
+    def _forget_task(self, job_id: str, task: asyncio.Task) -> None:
+        """Drop a finished background task; failures are already recorded on the job"""
+        self.tasks.pop(job_id, None)
+        if not task.cancelled():
+            task.exception()
+    
+    async def process_batch(self, items: List[Any], process_func: Callable,
+                            job_id: Optional[str] = None) -> str:
         """Process a batch of items with rate limiting
         
         Args:
             items: List of items to process
             process_func: Async function to process each item
+            job_id: ID of a job created by submit_batch (a new job is created if omitted)
             
         Returns:
             str: Job ID for tracking progress
         """
-        job_id = f"batch_{int(time.time())}"
-        
-        self.jobs[job_id] = {
-            "total": len(items),
-            "completed": 0,
-            "results": [],
-            "errors": [],
-            "start_time": time.time(),
-            "status": "running"
-        }
+        if job_id is None:
+            job_id = self._create_job(items, "running")
+        else:
+            self.jobs[job_id]["status"] = "running"
+            self._publish(job_id, "running", total=len(items))
         
         logger.info("batch_job_started",
                    job_id=job_id,
@@ -70,6 +104,9 @@ class BatchProcessor:
                 await asyncio.sleep(self.config.cooldown_period)
             
             self.jobs[job_id]["status"] = "completed"
+            self._publish(job_id, "completed",
+                          completed=self.jobs[job_id]["completed"],
+                          errors=len(self.jobs[job_id]["errors"]))
             logger.info("batch_job_completed",
                        job_id=job_id,
                        total_processed=self.jobs[job_id]["completed"],
@@ -77,6 +114,7 @@ class BatchProcessor:
             
         except Exception as e:
             self.jobs[job_id]["status"] = "failed"
+            self._publish(job_id, "failed", error=str(e))
             logger.error("batch_job_failed",
                         job_id=job_id,
                         error=str(e))
@@ -98,6 +136,11 @@ class BatchProcessor:
                 # Update job status
                 self.jobs[job_id]["results"].append(result)
                 self.jobs[job_id]["completed"] += 1
+                self._publish(job_id, "item_completed",
+                              item=item,
+                              result=result,
+                              completed=self.jobs[job_id]["completed"],
+                              total=self.jobs[job_id]["total"])
                 
                 logger.debug("item_processed",
                            job_id=job_id,
@@ -109,6 +152,11 @@ class BatchProcessor:
                 "item": item,
                 "error": str(e)
             })
+            self._publish(job_id, "item_failed",
+                          item=item,
+                          error=str(e),
+                          errors=len(self.jobs[job_id]["errors"]),
+                          total=self.jobs[job_id]["total"])
             logger.error("item_processing_failed",
                         job_id=job_id,
                         item=item,
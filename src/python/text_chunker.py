@@ -0,0 +1,170 @@
+import re
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List
+
+# Elements whose text never belongs in the extracted content
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+
+# Elements that end a block of text (paragraph boundary)
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "details", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "summary", "table", "td", "th",
+    "tr", "ul"
+}
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+WHITESPACE = re.compile(r"\s+")
+
+# Upper bound on characters per token, used to skip encoding blocks that cannot fit a chunk
+MAX_CHARS_PER_TOKEN = 16
+
+class HTMLTextExtractor(HTMLParser):
+    """Incremental HTML-to-text parser that emits one text block per block-level element."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.parts: List[str] = []
+        self.blocks: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    def _end_block(self):
+        """Collapse whitespace of the pending text and emit it as a block"""
+        if self.parts:
+            text = WHITESPACE.sub(" ", "".join(self.parts)).strip()
+            self.parts = []
+            if text:
+                self.blocks.append(text)
+
+    def drain(self) -> List[str]:
+        """Return and clear the blocks completed so far"""
+        blocks, self.blocks = self.blocks, []
+        return blocks
+
+    def close(self):
+        super().close()
+        self._end_block()
+
+def iter_html_blocks(html_pieces: Iterable[str]) -> Iterator[str]:
+    """Stream text blocks out of HTML supplied in pieces (e.g. file reads)"""
+    parser = HTMLTextExtractor()
+    for piece in html_pieces:
+        parser.feed(piece)
+        yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+def iter_file_pieces(path: str, piece_size: int = 65536) -> Iterator[str]:
+    """Read a text file in fixed-size pieces"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            piece = f.read(piece_size)
+            if not piece:
+                break
+            yield piece
+
+class TextChunker:
+    """Token-bounded chunker with overlap that splits on paragraph and sentence boundaries.
+
+    Tokens are counted per segment as text streams through, so only the
+    segments of the chunk being built (plus the overlap) are held in memory.
+    """
+
+    def __init__(self, encoding, chunk_size: int = 512, overlap: int = 64):
+        if overlap >= chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens of a text segment"""
+        return len(self.encoding.encode(text))
+
+    def _segments(self, block: str) -> Iterator[tuple]:
+        """Split a block into (text, tokens) segments that each fit in a chunk"""
+        # Blocks far longer than a chunk are split without encoding them whole
+        if len(block) <= self.chunk_size * MAX_CHARS_PER_TOKEN:
+            tokens = self.count_tokens(block)
+            if tokens <= self.chunk_size:
+                yield block, tokens
+                return
+
+        for sentence in SENTENCE_END.split(block):
+            tokens = self.count_tokens(sentence)
+            if tokens <= self.chunk_size:
+                yield sentence, tokens
+                continue
+
+            # Oversized sentence: fall back to token windows of this sentence only
+            encoded = self.encoding.encode(sentence)
+            for i in range(0, len(encoded), self.chunk_size):
+                window = encoded[i:i + self.chunk_size]
+                yield self.encoding.decode(window), len(window)
+
+    def iter_chunks(self, blocks: Iterable[str]) -> Iterator[str]:
+        """Pack text blocks into chunks of at most chunk_size tokens"""
+        current: List[tuple] = []
+        current_tokens = 0
+
+        for block in blocks:
+            for segment, tokens in self._segments(block):
+                # Budget one token for the joining space
+                if current and current_tokens + tokens + 1 > self.chunk_size:
+                    yield " ".join(text for text, _ in current)
+                    current, current_tokens = self._overlap_tail(current, tokens)
+                current_tokens += tokens + (1 if current else 0)
+                current.append((segment, tokens))
+
+        if current:
+            yield " ".join(text for text, _ in current)
+
+    def _overlap_tail(self, segments: List[tuple], incoming: int) -> tuple:
+        """Keep trailing segments up to the overlap budget, leaving room for the next segment"""
+        budget = min(self.overlap, self.chunk_size - incoming)
+        tail: List[tuple] = []
+        total = 0
+        for segment, tokens in reversed(segments):
+            if total + tokens + 1 > budget:
+                break
+            tail.insert(0, (segment, tokens))
+            total += tokens + 1
+        return tail, max(total - 1, 0)
+
+    def chunk_text(self, text: str) -> List[str]:
+        """Chunk plain text, treating each non-empty line as a block"""
+        return list(self.iter_chunks(block for block in text.split("\n") if block.strip()))
+
+    def chunk_html(self, html_pieces: Iterable[str]) -> Iterator[str]:
+        """Stream chunks straight from HTML pieces"""
+        return self.iter_chunks(iter_html_blocks(html_pieces))
+
+def extract_text(html: str, separator: str = "\n") -> str:
+    """Extract readable text from an HTML document"""
+    return separator.join(iter_html_blocks([html]))
+
+def chunk_file(path: str, encoding, chunk_size: int = 512, overlap: int = 64,
+               piece_size: int = 65536) -> Iterator[str]:
+    """Stream chunks from an HTML file without loading it whole"""
+    chunker = TextChunker(encoding, chunk_size, overlap)
+    return chunker.chunk_html(iter_file_pieces(path, piece_size))
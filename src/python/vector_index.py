@@ -0,0 +1,405 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from logging_config import get_logger
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+logger = get_logger("vector_index")
+
+CHUNK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    position INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_url ON chunks (url, active);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+class VectorIndex(abc.ABC):
+    """Common interface of the chunk vector index backends.
+
+    Rows use the page_chunks layout: url, chunk_index, content, embedding, metadata.
+    Search results mirror Supabase's match_page_chunks: the row fields plus similarity.
+    """
+
+    local = True
+
+    @abc.abstractmethod
+    def add(self, rows: Sequence[Dict[str, Any]]) -> int:
+        """Add chunk rows, replacing previously indexed chunks of the same URLs"""
+
+    @abc.abstractmethod
+    def search(self, query_embedding: Sequence[float], limit: int = 5,
+               threshold: float = 0.5) -> List[Dict[str, Any]]:
+        """Return up to limit chunks with cosine similarity above threshold"""
+
+    @abc.abstractmethod
+    def count(self) -> int:
+        """Return the number of searchable chunks"""
+
+    def close(self) -> None:
+        """Release resources"""
+
+class SupabaseVectorIndex(VectorIndex):
+    """Vector search through Supabase's page_chunks table and match_page_chunks RPC."""
+
+    local = False
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, rows: Sequence[Dict[str, Any]]) -> int:
+        """Insert chunk rows with a single request"""
+        self.client.table("page_chunks").insert(list(rows)).execute()
+        return len(rows)
+
+    def search(self, query_embedding: Sequence[float], limit: int = 5,
+               threshold: float = 0.5) -> List[Dict[str, Any]]:
+        """Search using Supabase's vector similarity"""
+        response = self.client.rpc(
+            'match_page_chunks',
+            {
+                'query_embedding': list(query_embedding),
+                'match_threshold': threshold,
+                'match_count': limit
+            }
+        ).execute()
+        return response.data
+
+    def count(self) -> int:
+        """Count rows in page_chunks"""
+        response = self.client.table("page_chunks").select("id", count="exact").limit(1).execute()
+        return response.count or 0
+
+class _LocalVectorIndex(VectorIndex):
+    """Shared chunk bookkeeping of the on-disk backends.
+
+    Chunk text and metadata live in SQLite; the row position doubles as the
+    vector id. Re-indexing a URL deactivates its old rows instead of rewriting
+    the vector file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(path, "chunks.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(CHUNK_SCHEMA)
+        self.conn.commit()
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim: Optional[int] = int(row[0]) if row else None
+        self.size = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        # Searchable rows; size also counts the deactivated ones
+        self.live = self.conn.execute("SELECT COUNT(*) FROM chunks WHERE active = 1").fetchone()[0]
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        """Scale vectors to unit length so inner product equals cosine similarity"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, rows: Sequence[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        vectors = self._normalize([row["embedding"] for row in rows])
+
+        with self.lock:
+            new_dim = self.dim is None
+            if new_dim:
+                self.dim = vectors.shape[1]
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+            urls = sorted({row["url"] for row in rows})
+            replaced = [
+                position for (position,) in self.conn.execute(
+                    f"SELECT position FROM chunks WHERE active = 1 AND url IN ({','.join('?' * len(urls))})", urls
+                )
+            ]
+            self.conn.executemany("UPDATE chunks SET active = 0 WHERE position = ?", [(p,) for p in replaced])
+
+            start = self.size
+            try:
+                self.conn.executemany(
+                    "INSERT INTO chunks (position, url, chunk_index, content, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (start + i, row["url"], row["chunk_index"], row["content"], json.dumps(row.get("metadata")))
+                        for i, row in enumerate(rows)
+                    ]
+                )
+                self._add_vectors(start, vectors, replaced)
+                self.conn.commit()
+            except BaseException:
+                # Vectors of rows that were never committed would shift every later position
+                self.conn.rollback()
+                self._discard_vectors(start, len(rows), replaced)
+                if new_dim:
+                    self.dim = None
+                raise
+            self.size += len(rows)
+            self.live += len(rows) - len(replaced)
+            self._committed()
+
+        logger.info("vector_index_updated", added=len(rows), replaced=len(replaced), size=self.size)
+        return len(rows)
+
+    @abc.abstractmethod
+    def _add_vectors(self, start: int, vectors: np.ndarray, replaced: List[int]) -> None:
+        """Persist vectors for positions start.. and drop the replaced positions (caller holds the lock)"""
+
+    @abc.abstractmethod
+    def _discard_vectors(self, start: int, count: int, replaced: List[int]) -> None:
+        """Undo _add_vectors after the rows failed to commit (caller holds the lock)"""
+
+    def _committed(self) -> None:
+        """Called after the rows of an add are committed (caller holds the lock)"""
+
+    def _fetch_rows(self, positions: List[int], scores: List[float]) -> List[Dict[str, Any]]:
+        """Load chunk rows for ranked positions"""
+        if not positions:
+            return []
+        with self.lock:
+            found = {
+                row[0]: row for row in self.conn.execute(
+                    "SELECT position, url, chunk_index, content, metadata FROM chunks "
+                    f"WHERE position IN ({','.join('?' * len(positions))})", positions
+                )
+            }
+        return [
+            {
+                "id": position,
+                "url": found[position][1],
+                "chunk_index": found[position][2],
+                "content": found[position][3],
+                "metadata": json.loads(found[position][4]) if found[position][4] else None,
+                "similarity": round(float(score), 6)
+            }
+            for position, score in zip(positions, scores)
+            if position in found
+        ]
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks WHERE active = 1").fetchone()[0]
+
+    def close(self) -> None:
+        self.conn.close()
+
+class NumpyVectorIndex(_LocalVectorIndex):
+    """Exact brute-force search over a memory-mapped float32 matrix.
+
+    Vectors are appended to vectors.f32 and scanned with one matrix-vector
+    product, which stays in the low milliseconds up to a few hundred thousand chunks.
+    The file is matched to the committed rows on open, so a crash between an
+    append and its commit cannot shift the vectors of later rows.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.vectors_file = os.path.join(path, "vectors.f32")
+        self._reconcile()
+        self.active = np.ones(self.size, dtype=bool)
+        for (position,) in self.conn.execute("SELECT position FROM chunks WHERE active = 0"):
+            self.active[position] = False
+        self._matrix: Optional[np.ndarray] = None
+
+    def _row_bytes(self) -> int:
+        """Size of one stored vector in vectors.f32"""
+        return (self.dim or 0) * np.dtype(np.float32).itemsize
+
+    def _reconcile(self) -> None:
+        """Cut vectors appended without committed rows; deactivate rows whose vector is missing"""
+        expected = self.size * self._row_bytes()
+        actual = os.path.getsize(self.vectors_file) if os.path.exists(self.vectors_file) else 0
+        if actual == expected:
+            return
+
+        if actual > expected:
+            os.truncate(self.vectors_file, expected)
+            logger.warning("vector_index_orphan_vectors_truncated", bytes=actual - expected, path=self.path)
+            return
+
+        # Zero-fill so positions still line up; the affected URLs need a recrawl
+        stored = actual // self._row_bytes()
+        with open(self.vectors_file, "ab"):
+            pass
+        os.truncate(self.vectors_file, expected)
+        lost = self.conn.execute("UPDATE chunks SET active = 0 WHERE active = 1 AND position >= ?",
+                                 (stored,)).rowcount
+        self.conn.commit()
+        self.live -= lost
+        logger.warning("vector_index_missing_vectors", dropped=lost, path=self.path)
+
+    def _add_vectors(self, start: int, vectors: np.ndarray, replaced: List[int]) -> None:
+        with open(self.vectors_file, "ab") as f:
+            f.write(vectors.tobytes())
+        self.active = np.concatenate([self.active, np.ones(len(vectors), dtype=bool)])
+        self.active[replaced] = False
+        self._matrix = None
+
+    def _discard_vectors(self, start: int, count: int, replaced: List[int]) -> None:
+        self._matrix = None
+        if os.path.exists(self.vectors_file) and os.path.getsize(self.vectors_file) > start * self._row_bytes():
+            os.truncate(self.vectors_file, start * self._row_bytes())
+        self.active = self.active[:start]
+        self.active[replaced] = True
+
+    def _get_matrix(self) -> Optional[np.ndarray]:
+        """Map the vector file, remapping after appends (caller holds the lock)"""
+        if self._matrix is None and self.size and self.dim:
+            self._matrix = np.memmap(self.vectors_file, dtype=np.float32, mode="r", shape=(self.size, self.dim))
+        return self._matrix
+
+    def search(self, query_embedding: Sequence[float], limit: int = 5,
+               threshold: float = 0.5) -> List[Dict[str, Any]]:
+        with self.lock:
+            matrix = self._get_matrix()
+            if matrix is None or limit <= 0:
+                return []
+            scores = matrix @ self._normalize(query_embedding)
+            scores[~self.active] = -np.inf
+
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = [int(position) for position in top if scores[position] >= threshold]
+        return self._fetch_rows(top, [scores[position] for position in top])
+
+class HnswVectorIndex(_LocalVectorIndex):
+    """Approximate nearest-neighbour search with an on-disk hnswlib graph, for large corpora.
+
+    The graph is saved every save_every adds and on close(). Rows added after the
+    last save are deactivated when the index is reopened (their URLs need a recrawl).
+    """
+
+    def __init__(self, path: str, ef_search: int = 64, m: int = 16, ef_construction: int = 200,
+                 save_every: int = 100):
+        if hnswlib is None:
+            raise ImportError("hnswlib is required for VECTOR_INDEX_BACKEND=hnsw (pip install hnswlib)")
+        super().__init__(path)
+        self.index_file = os.path.join(path, "hnsw.bin")
+        self.ef_search = ef_search
+        self.m = m
+        self.ef_construction = ef_construction
+        self.save_every = save_every
+        self.unsaved = 0
+        self.index = None
+        if self.dim is not None and os.path.exists(self.index_file):
+            self.index = hnswlib.Index(space="cosine", dim=self.dim)
+            self.index.load_index(self.index_file, max_elements=self.size, allow_replace_deleted=False)
+            self.index.set_ef(ef_search)
+            self._reconcile()
+
+    def _reconcile(self) -> None:
+        """Bring the SQLite rows in line with a graph saved before the last adds"""
+        saved = self.index.get_current_count()
+        # Labels past the committed rows belong to an add that failed before its commit
+        for position in range(self.size, saved):
+            try:
+                self.index.mark_deleted(position)
+            except RuntimeError:
+                pass
+        for (position,) in self.conn.execute("SELECT position FROM chunks WHERE active = 0 AND position < ?",
+                                             (saved,)):
+            try:
+                self.index.mark_deleted(position)
+            except RuntimeError:
+                # Already deleted when the graph was saved
+                pass
+        lost = self.conn.execute("UPDATE chunks SET active = 0 WHERE active = 1 AND position >= ?",
+                                 (saved,)).rowcount
+        self.conn.commit()
+        if lost:
+            self.live -= lost
+            logger.warning("vector_index_unsaved_rows_dropped", dropped=lost, path=self.path)
+
+    def _add_vectors(self, start: int, vectors: np.ndarray, replaced: List[int]) -> None:
+        if self.index is None:
+            self.index = hnswlib.Index(space="cosine", dim=self.dim)
+            self.index.init_index(max_elements=max(1024, len(vectors)), M=self.m,
+                                  ef_construction=self.ef_construction)
+            self.index.set_ef(self.ef_search)
+
+        needed = start + len(vectors)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, self.index.get_max_elements() * 2))
+        self.index.add_items(vectors, np.arange(start, needed))
+        for position in replaced:
+            self.index.mark_deleted(position)
+
+    def _discard_vectors(self, start: int, count: int, replaced: List[int]) -> None:
+        if self.index is None:
+            return
+        # The next add reuses these labels, which replaces and undeletes them
+        for position in range(start, start + count):
+            try:
+                self.index.mark_deleted(position)
+            except RuntimeError:
+                # Never added
+                pass
+        for position in replaced:
+            try:
+                self.index.unmark_deleted(position)
+            except RuntimeError:
+                pass
+
+    def _committed(self) -> None:
+        # Rewriting the whole graph on every add would dominate indexing time; saving only
+        # after the commit keeps uncommitted labels out of the saved graph
+        self.unsaved += 1
+        if self.unsaved >= self.save_every:
+            self._save()
+
+    def _save(self) -> None:
+        """Write the graph to disk (caller holds the lock)"""
+        self.index.save_index(self.index_file)
+        self.unsaved = 0
+
+    def search(self, query_embedding: Sequence[float], limit: int = 5,
+               threshold: float = 0.5) -> List[Dict[str, Any]]:
+        with self.lock:
+            # Deleted elements still count in the graph, so k is capped by the live rows
+            k = min(limit, self.live)
+            if self.index is None or k <= 0:
+                return []
+            labels, distances = self.index.knn_query(self._normalize(query_embedding), k=k)
+
+        # hnswlib reports cosine distance; convert back to similarity
+        ranked = [(int(label), 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+        ranked = [(position, score) for position, score in ranked if score >= threshold]
+        return self._fetch_rows([p for p, _ in ranked], [s for _, s in ranked])
+
+    def close(self) -> None:
+        with self.lock:
+            if self.index is not None and self.unsaved:
+                self._save()
+        super().close()
+
+def create_vector_index(backend: str, path: str = "cache/vector_index", supabase_client=None) -> VectorIndex:
+    """Create the vector index backend selected by VECTOR_INDEX_BACKEND"""
+    backend = backend.lower()
+    if backend == "supabase":
+        return SupabaseVectorIndex(supabase_client)
+    if backend == "numpy":
+        return NumpyVectorIndex(path)
+    if backend == "hnsw":
+        return HnswVectorIndex(path)
+    raise ValueError(f"Unknown vector index backend: {backend} (choose from supabase, numpy, hnsw)")
@@ -14,6 +14,12 @@ from datetime import datetime, timedelta
 import traceback
 import json
 
+from .metrics import WORKFLOW_SECONDS
+from .tracing import get_tracer
+from .model_router import get_router
+from .circuit_breaker import CircuitOpenError, get_breaker_stats
+from .token_budget import get_token_limiter
+
 logger = logging.getLogger("adaptive_processor")
 
 class AdaptiveProcessor:
@@ -59,6 +65,9 @@ class AdaptiveProcessor:
         self.last_checkpoint = time.time()
         self.running = False
         self.paused = False
+        # Set while an upstream circuit breaker is open (monotonic deadline and upstream name)
+        self.held_until = 0.0
+        self.hold_reason = None
         
         # Statistics
         self.stats = {
@@ -66,6 +75,7 @@ class AdaptiveProcessor:
             "urls_processed": 0,
             "urls_succeeded": 0,
             "urls_failed": 0,
+            "urls_requeued": 0,
             "avg_processing_time": 0,
             "concurrency_adjustments": [],
         }
@@ -120,6 +130,12 @@ class AdaptiveProcessor:
                 await asyncio.sleep(5)
                 continue
             
+            # Wait while an upstream is unavailable instead of taking URLs that would fail
+            hold = self.held_until - time.monotonic()
+            if hold > 0:
+                await asyncio.sleep(min(hold, 5))
+                continue
+            
             # Get next URL when ready
             url = await queue.get_next()
             if not url:
@@ -147,6 +163,7 @@ class AdaptiveProcessor:
                     # Record performance metrics
                     processing_time = time.time() - start_time
                     self.performance_metrics.append(processing_time)
+                    WORKFLOW_SECONDS.observe(processing_time)
                     
                     # Update average processing time
                     if self.stats["avg_processing_time"] == 0:
@@ -157,6 +174,11 @@ class AdaptiveProcessor:
                         )
                     
                     logger.info(f"Processed URL in {processing_time:.2f}s: {url}")
+            except CircuitOpenError as e:
+                # Not the URL's fault: give it back and hold all workers until the breaker probes again
+                self.stats["urls_requeued"] += 1
+                await queue.requeue(url)
+                self.hold(e.retry_after, e.upstream)
             except Exception as e:
                 self.stats["urls_failed"] += 1
                 error_msg = f"Error processing {url}: {str(e)}"
@@ -259,6 +281,20 @@ class AdaptiveProcessor:
             self.paused = False
             logger.info("Processing resumed")
     
+    def hold(self, seconds, reason=None):
+        """
+        Stop taking new URLs for a while, e.g. until an open circuit breaker allows a probe.
+        
+        Args:
+            seconds: Hold duration
+            reason: What processing waits for (shown in the stats)
+        """
+        held_until = time.monotonic() + seconds
+        if held_until > self.held_until:
+            self.held_until = held_until
+            self.hold_reason = reason
+            logger.warning(f"Holding new work for {seconds:.1f}s: {reason} unavailable")
+    
     def stop(self):
         """Stop processing."""
         self.running = False
@@ -292,7 +328,16 @@ class AdaptiveProcessor:
             "active_tasks": self.active_tasks,
             "paused": self.paused,
             "running": self.running,
+            "held_for": round(max(0.0, self.held_until - time.monotonic()), 1),
+            "hold_reason": self.hold_reason if self.held_until > time.monotonic() else None,
             "eta": eta,
+            # Per-stage latency percentiles (seconds) from the trace spans
+            "stage_latency": get_tracer().get_stats(),
+            # Attempts, success rate and latency per task/size class/model route
+            "model_routes": get_router().get_stats(),
+            "circuit_breakers": get_breaker_stats(),
+            # Tokens per minute, today's token and cost spend and the remaining daily budget
+            "llm_budget": get_token_limiter().get_stats(),
             "system": {
                 "cpu_usage": psutil.cpu_percent(),
                 "memory_usage": psutil.virtual_memory().percent,
@@ -0,0 +1,139 @@
+"""
+Batch Analysis
+
+This module packs several small workflows into one LLM analysis request and
+splits the response back into one analysis per workflow. The shared
+instructions are sent once per batch instead of once per workflow, which cuts
+request count and prompt overhead for catalogs of 3-10 node workflows.
+"""
+
+import logging
+import re
+
+from .prompt_builder import STICKY_NOTE_TYPE, compact_workflow, count_tokens, get_prompt_budget, minify
+
+logger = logging.getLogger("batch_analysis")
+
+# Completion tokens requested per workflow of a batch
+TOKENS_PER_WORKFLOW = 1000
+
+START_MARKER = re.compile(r"^[ \t*#`>_-]*<<<\s*ANALYSIS\s+(\d+)\s*(?::\s*([^>\n]*?))?\s*>>>[ \t*`_]*$",
+                          re.MULTILINE | re.IGNORECASE)
+END_MARKER = re.compile(r"^[ \t*#`>_-]*<<<\s*END\b[^>\n]*>>>[ \t*`_]*$", re.MULTILINE | re.IGNORECASE)
+
+def node_count(workflow_json):
+    """Count the nodes of a workflow, excluding sticky notes."""
+    return sum(1 for node in workflow_json.get("nodes") or []
+               if isinstance(node, dict) and node.get("type") != STICKY_NOTE_TYPE)
+
+def is_batchable(workflow_json, max_nodes=10):
+    """Check whether a workflow is small enough to share a request with others."""
+    return 0 < node_count(workflow_json) <= max_nodes
+
+def render_workflow(index, workflow_id, workflow_json):
+    """Render one delimited workflow of a batch prompt."""
+    return f"=== WORKFLOW {index}: {workflow_id} ===\n```json\n{minify(compact_workflow(workflow_json))}\n```"
+
+def build_batch_prompt(template, items):
+    """
+    Render a batch prompt.
+
+    Args:
+        template: Batch template with {{count}} and {{workflows}} placeholders
+        items: List of (workflow_id, workflow_json)
+
+    Returns:
+        str: Prompt
+    """
+    workflows = "\n\n".join(render_workflow(index, workflow_id, workflow_json)
+                            for index, (workflow_id, workflow_json) in enumerate(items, 1))
+    return template.replace("{{count}}", str(len(items))).replace("{{workflows}}", workflows)
+
+def pack_batches(items, template, model, batch_size=5):
+    """
+    Group workflows into batches that fit the model's prompt budget.
+
+    Args:
+        items: List of (workflow_id, workflow_json)
+        template: Batch template
+        model: OpenRouter model (for tokenizer and budget)
+        batch_size: Maximum workflows per batch
+
+    Returns:
+        list: Batches (lists of items)
+    """
+    budget = get_prompt_budget(model)
+    overhead = count_tokens(build_batch_prompt(template, []), model)
+    batches, current, current_tokens = [], [], overhead
+    for index, item in enumerate(items, 1):
+        tokens = count_tokens(render_workflow(index, *item), model)
+        if current and (len(current) >= batch_size or current_tokens + tokens > budget):
+            batches.append(current)
+            current, current_tokens = [], overhead
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def split_batch_response(text, workflow_ids):
+    """
+    Split a batch response into one analysis per workflow.
+
+    Markers are matched by their index first and by workflow ID otherwise;
+    decorations such as bold, headings or code fences around a marker are
+    tolerated, as are missing end markers.
+
+    Args:
+        text: LLM response
+        workflow_ids: IDs in the order they were sent
+
+    Returns:
+        dict: {workflow_id: analysis} for every workflow with a non-empty analysis
+    """
+    analyses = {}
+    matches = list(START_MARKER.finditer(text or ""))
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(text)
+        body = text[match.end():end]
+        end_match = END_MARKER.search(body)
+        if end_match:
+            body = body[:end_match.start()]
+        body = body.strip().strip("`").strip()
+
+        index = int(match.group(1))
+        label = (match.group(2) or "").strip().strip("*` ")
+        if 1 <= index <= len(workflow_ids) and (not label or label == workflow_ids[index - 1]):
+            workflow_id = workflow_ids[index - 1]
+        elif label in workflow_ids:
+            workflow_id = label
+        else:
+            logger.warning(f"Ignoring batch analysis with unknown marker {match.group(0).strip()}")
+            continue
+
+        if body and workflow_id not in analyses:
+            analyses[workflow_id] = body
+    return analyses
+
+def analyze_batch(items, template, model, call_llm):
+    """
+    Analyze a batch of workflows with one request.
+
+    Args:
+        items: List of (workflow_id, workflow_json)
+        template: Batch template
+        model: OpenRouter model
+        call_llm: Function (prompt, model, max_tokens) returning the response text
+
+    Returns:
+        dict: {workflow_id: analysis}; workflows missing from the response are left out
+    """
+    workflow_ids = [workflow_id for workflow_id, _ in items]
+    prompt = build_batch_prompt(template, items)
+    response = call_llm(prompt, model=model, max_tokens=TOKENS_PER_WORKFLOW * len(items))
+    analyses = split_batch_response(response, workflow_ids)
+
+    missing = [workflow_id for workflow_id in workflow_ids if workflow_id not in analyses]
+    if missing:
+        logger.warning(f"Batch response is missing {len(missing)} of {len(items)} analyses: {', '.join(missing)}")
+    return analyses
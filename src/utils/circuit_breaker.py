@@ -0,0 +1,232 @@
+"""
+Circuit Breaker
+
+This module guards calls to upstream services (OpenRouter models, n8n.io) with
+circuit breakers. A breaker opens when too many recent calls failed or were
+slow, rejects calls while open so workers stop spending slots on an upstream
+that is down, and after a cool-down lets a few probe calls through (half-open)
+to decide whether to close again or stay open.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .config import get_settings
+from .metrics import REGISTRY
+
+logger = logging.getLogger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+BREAKER_STATE = REGISTRY.gauge(
+    "circuit_breaker_state", "Circuit breaker state by upstream (0 closed, 1 half-open, 2 open)", ["upstream"]
+)
+BREAKER_REJECTIONS = REGISTRY.counter(
+    "circuit_breaker_rejections_total", "Calls rejected by an open circuit breaker", ["upstream"]
+)
+BREAKER_TRANSITIONS = REGISTRY.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes by upstream and new state",
+    ["upstream", "state"]
+)
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"Circuit breaker for {upstream} is open, retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Error-rate and latency based circuit breaker with half-open probing.
+    """
+
+    def __init__(self,
+                name,
+                failure_rate=0.5,
+                slow_call_rate=0.8,
+                slow_call_seconds=30.0,
+                window=20,
+                min_calls=10,
+                open_seconds=30.0,
+                half_open_probes=1):
+        """
+        Initialize the CircuitBreaker.
+
+        Args:
+            name: Upstream name, used in errors and metrics
+            failure_rate: Share of failed calls in the window that opens the breaker
+            slow_call_rate: Share of slow calls in the window that opens the breaker
+            slow_call_seconds: Duration above which a successful call counts as slow
+            window: Number of recent calls considered
+            min_calls: Calls needed in the window before the breaker can open
+            open_seconds: Cool-down before an open breaker lets probe calls through
+            half_open_probes: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        self.calls = deque(maxlen=window)
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, upstream=name)
+
+    def _transition(self, state):
+        """Change state (lock held)."""
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker for {self.name}: {self.state} -> {state}")
+        self.state = state
+        self.probes = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        else:
+            self.calls.clear()
+        BREAKER_STATE.set(STATE_VALUES[state], upstream=self.name)
+        BREAKER_TRANSITIONS.inc(upstream=self.name, state=state)
+
+    def retry_after(self):
+        """Seconds until an open breaker lets the next probe through (0 if calls are allowed)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def before_call(self):
+        """
+        Check that a call may proceed; follow it with record() or release().
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with all probes taken
+        """
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    BREAKER_REJECTIONS.inc(upstream=self.name)
+                    raise CircuitOpenError(self.name, remaining)
+                self._transition(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_probes:
+                    BREAKER_REJECTIONS.inc(upstream=self.name)
+                    # Probes usually answer within the slow-call threshold
+                    raise CircuitOpenError(self.name, min(self.open_seconds, self.slow_call_seconds))
+                self.probes += 1
+
+    def record(self, success, seconds=0.0):
+        """
+        Record the outcome of a call allowed by before_call().
+
+        Args:
+            success: Whether the upstream handled the call
+            seconds: Call duration
+        """
+        slow = success and seconds > self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes = max(0, self.probes - 1)
+                self._transition(CLOSED if success and not slow else OPEN)
+                return
+
+            self.calls.append((success, slow))
+            if self.state == CLOSED and len(self.calls) >= self.min_calls:
+                failures = sum(1 for ok, _ in self.calls if not ok) / len(self.calls)
+                slow_calls = sum(1 for _, is_slow in self.calls if is_slow) / len(self.calls)
+                if failures >= self.failure_rate or slow_calls >= self.slow_call_rate:
+                    self._transition(OPEN)
+
+    def release(self):
+        """End a call allowed by before_call() without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes = max(0, self.probes - 1)
+
+    @contextmanager
+    def guard(self, is_failure=None):
+        """
+        Run the enclosed call under the breaker.
+
+        Args:
+            is_failure: Function (exception) returning True if the exception counts against
+                        the upstream, False if it says nothing about its health (default: all count)
+
+        Raises:
+            CircuitOpenError: If the call is not allowed
+        """
+        self.before_call()
+        start_time = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                self.record(False, time.perf_counter() - start_time)
+            else:
+                self.release()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record(True, time.perf_counter() - start_time)
+
+    def get_stats(self):
+        """Get the state and recent failure and slow-call rates."""
+        with self._lock:
+            calls = list(self.calls)
+            state = self.state
+        return {
+            "state": state,
+            "retry_after": round(self.retry_after(), 1),
+            "recent_calls": len(calls),
+            "failure_rate": round(sum(1 for ok, _ in calls if not ok) / len(calls), 3) if calls else 0,
+            "slow_call_rate": round(sum(1 for _, slow in calls if slow) / len(calls), 3) if calls else 0,
+        }
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name, slow_call_seconds=None):
+    """
+    Return the process-wide breaker of an upstream, creating it from settings.
+
+    Args:
+        name: Upstream name, e.g. "n8n" or "openrouter/<model>"
+        slow_call_seconds: Slow-call threshold when the breaker is created
+
+    Returns:
+        CircuitBreaker
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            settings = get_settings()
+            breaker = CircuitBreaker(
+                name,
+                failure_rate=settings.breaker_failure_rate,
+                slow_call_seconds=slow_call_seconds or settings.breaker_slow_call_seconds,
+                min_calls=settings.breaker_min_calls,
+                open_seconds=settings.breaker_open_seconds,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+def get_breaker_stats():
+    """Get the stats of every breaker by upstream name."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.get_stats() for name, breaker in sorted(breakers.items())}
@@ -19,6 +19,7 @@ except ImportError:
 import traceback
 import html
 import re
+import time
 try:
     from .config import get_settings  # Import settings
 except ImportError:
@@ -31,24 +32,152 @@ except ImportError:
     def get_settings():
         return Settings()
 
+from .metrics import LLM_REQUESTS, LLM_REQUEST_SECONDS, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS
+from .tracing import get_tracer, stage
+from .single_flight import ThreadSingleFlight, hash_key
+from .model_router import get_router, parse_tiers
+from .hedging import RequestCancelled, get_latency_tracker, run_hedged
+from .llm_stream import StreamStalled, iter_sse_data
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .token_budget import get_token_limiter
+from .prompt_builder import count_tokens
+
 # Load environment variables
 load_dotenv()
 
 # OpenRouter API Configuration
 settings = get_settings()
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY") or settings.openrouter_api_key
+# Point at a local stub (python -m src.utils.openrouter_stub) for offline runs and benchmarks
+OPENROUTER_BASE_URL = (os.getenv("OPENROUTER_BASE_URL")
+                       or getattr(settings, "openrouter_base_url", "https://openrouter.ai/api/v1")).rstrip("/")
+
+# Identical prompts sent concurrently (e.g. the same workflow from two callers) share one request
+_llm_flight = ThreadSingleFlight("llm_request")
+
+def call_site_options(site):
+    """
+    Get the fallback and hedging options of an LLM call site from settings.
+    
+    Fallback models that are already tiers of the call site are dropped: the
+    router escalates to those itself, so repeating them would only pay for the
+    same model twice.
+    
+    Args:
+        site: Call site name, e.g. "analysis" or "repair"
+        
+    Returns:
+        dict: fallback_models and hedge keyword arguments for call_openrouter
+    """
+    tiers = set(parse_tiers(getattr(settings, f"{site}_model_tiers", "")))
+    return {
+        "fallback_models": [model for model in parse_tiers(getattr(settings, f"{site}_fallback_models", ""))
+                            if model not in tiers],
+        "hedge": getattr(settings, f"{site}_hedge", False),
+    }
 
-def call_openrouter(prompt, model="openai/gpt-3.5-turbo", temperature=0.1, max_tokens=1000):
-    """Call OpenRouter API for LLM-powered validation & suggestions."""
+def call_openrouter(prompt, model="openai/gpt-3.5-turbo", temperature=0.1, max_tokens=1000,
+                    fallback_models=None, hedge=False, sink=None):
+    """
+    Call OpenRouter API for LLM-powered validation & suggestions.
+    
+    Args:
+        prompt: Prompt text
+        model: Primary model
+        temperature: Sampling temperature
+        max_tokens: Maximum completion tokens
+        fallback_models: Models tried in order when the primary fails or is slow
+        hedge: Also ask the next fallback model once the primary is slower than its p95 latency
+        sink: TokenSink that receives the completion as it streams in (requires LLM_STREAM)
+        
+    Returns:
+        str: Completion text, or None if every model failed or there is no API key
+        
+    Raises:
+        CircuitOpenError: If the chain ended on a model whose circuit breaker is open,
+                          or BudgetExceededError once the daily LLM budget is spent
+    """
     if not OPENROUTER_API_KEY:
         print("❌ ERROR: OpenRouter API key not found. Please set OPENROUTER_API_KEY in your .env file.")
         return None
     
     # Check if requests is available
     if requests is None:
-        print("❌ ERROR: requests module not available. Using fallback response.")
-        return f"Analysis for {model} (FALLBACK - requests module not available)"
-        
+        print("❌ ERROR: requests module not available.")
+        return None
+    
+    models = [model] + [name for name in fallback_models or [] if name != model]
+    if not getattr(settings, "llm_stream", False):
+        sink = None
+    # A caller that joins an identical request gets its result, but not its streamed tokens
+    key = hash_key(models, hedge, temperature, max_tokens, prompt)
+    return _llm_flight.do(key, _complete, prompt, models, temperature, max_tokens, hedge, sink)
+
+def _complete(prompt, models, temperature, max_tokens, hedge, sink=None):
+    """Request a completion over the fallback chain of models (see call_openrouter)."""
+    if hedge and sink is not None:
+        # Once a stream is producing tokens there is nothing left to hedge against
+        hedge = lambda: sink.owner is None
+    try:
+        content, _ = run_hedged(
+            lambda model, cancel: _guarded_request(prompt, model, temperature, max_tokens, cancel, sink),
+            models,
+            hedge=hedge,
+            streamed=sink is not None
+        )
+        return content
+    except CircuitOpenError:
+        # The caller decides whether to wait for the upstream or fail
+        raise
+    except Exception as e:
+        print(f"❌ OpenRouter API error: {e}")
+        return None
+
+def is_upstream_failure(error):
+    """Check whether a request error counts against the upstream's health."""
+    if isinstance(error, RequestCancelled):
+        return False
+    # Rejected requests (bad payload, unknown model) say nothing about availability; rate limits do
+    response = getattr(error, "response", None)
+    if response is not None and 400 <= response.status_code < 500 and response.status_code != 429:
+        return False
+    return True
+
+def _guarded_request(prompt, model, temperature, max_tokens, cancel=None, sink=None):
+    """
+    Send a request through the token budget and the model's circuit breaker
+    (see _request_completion).
+    """
+    limiter = get_token_limiter()
+    # Tokenizing is only worth it when a limit depends on the estimate
+    prompt_tokens = count_tokens(prompt, model) if limiter.enabled else 0
+    reservation = limiter.reserve(model, prompt_tokens, max_tokens)
+    try:
+        with get_breaker(f"openrouter/{model}").guard(is_upstream_failure):
+            content, usage = _request_completion(prompt, model, temperature, max_tokens, cancel, sink)
+    except BaseException:
+        reservation.release()
+        raise
+    reservation.settle(usage)
+    return content
+
+def _request_completion(prompt, model, temperature, max_tokens, cancel=None, sink=None):
+    """
+    Send one chat completion request to OpenRouter.
+    
+    The response is read as a stream so a request that lost a hedge can be
+    dropped as soon as cancel is set, instead of holding its connection until
+    the completion is done. With a sink the completion itself is streamed
+    (server-sent events) and every delta is passed on as it arrives.
+    
+    Returns:
+        tuple: (completion text, usage dict reported by OpenRouter, empty if none)
+    
+    Raises:
+        RequestCancelled: If cancel was set, or another request owns the sink
+        StreamStalled: If a streamed completion stopped producing tokens
+        Exception: On HTTP, network or response format errors
+    """
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
@@ -60,26 +189,156 @@ def call_openrouter(prompt, model="openai/gpt-3.5-turbo", temperature=0.1, max_t
         "model": model,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": temperature,
-        "max_tokens": max_tokens
+        "max_tokens": max_tokens,
+        # Ask OpenRouter to report the cost of the request with its token usage
+        "usage": {"include": True}
     }
+    if sink is not None:
+        payload["stream"] = True
+    owner = object()
+    
+    with get_tracer().span("llm_request", model=model, prompt_chars=len(prompt), streamed=sink is not None) as span:
+        start_time = time.perf_counter()
+        try:
+            response = requests.post(f"{OPENROUTER_BASE_URL}/chat/completions", json=payload, headers=headers,
+                                     timeout=settings.llm_first_token_timeout if sink is not None else 30,
+                                     stream=True)
+            with response:
+                response.raise_for_status()
+                if sink is not None:
+                    content, response_data = _read_stream(response, model, cancel, sink, owner, start_time, span)
+                else:
+                    # OpenRouter sends keep-alive whitespace while it works, so cancellation is noticed early
+                    body = bytearray()
+                    for chunk in response.iter_content(chunk_size=None):
+                        if cancel is not None and cancel.is_set():
+                            raise RequestCancelled(f"Request to {model} cancelled")
+                        body.extend(chunk)
+                    response_data = json.loads(body)
+                    if "choices" in response_data:
+                        content = response_data["choices"][0]["message"]["content"]
+                    elif "content" in response_data:
+                        content = response_data["content"]
+                    else:
+                        raise ValueError("Unexpected API response format")
+                    get_latency_tracker().record(model, time.perf_counter() - start_time)
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start_time, model=model)
+            LLM_REQUESTS.inc(model=model, status="success")
+            usage = response_data.get("usage") or {}
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if usage.get(kind):
+                    LLM_TOKENS.inc(usage[kind], model=model, kind=kind.replace("_tokens", ""))
+                    span.set_attribute(kind, usage[kind])
+            span.set_attribute("response_chars", len(content or ""))
+            return content, usage
+        except RequestCancelled:
+            LLM_REQUESTS.inc(model=model, status="cancelled")
+            span.set_attribute("cancelled", True)
+            if sink is not None:
+                sink.release(owner)
+            raise
+        except Exception as e:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start_time, model=model)
+            LLM_REQUESTS.inc(model=model, status="stalled" if isinstance(e, StreamStalled) else "error")
+            if sink is not None:
+                sink.release(owner)
+            raise
+
+def _read_stream(response, model, cancel, sink, owner, start_time, span):
+    """
+    Read a streamed (server-sent events) completion, passing deltas to the sink.
+    
+    The first token must arrive within LLM_FIRST_TOKEN_TIMEOUT and later tokens
+    within LLM_INTER_TOKEN_TIMEOUT of each other; keep-alive comments do not
+    count as progress.
     
+    Returns:
+        tuple: (content, last event data with the usage field if reported)
+    """
+    parts = []
+    response_data = {}
+    first_token_at = None
+    last_token_at = start_time
+    for data in _iter_stream_lines(response, model):
+        now = time.perf_counter()
+        if cancel is not None and cancel.is_set():
+            raise RequestCancelled(f"Request to {model} cancelled")
+        limit = settings.llm_inter_token_timeout if first_token_at else settings.llm_first_token_timeout
+        if now - last_token_at > limit:
+            raise StreamStalled(f"No token from {model} for {now - last_token_at:.1f}s")
+        if not data:
+            continue
+        if data == "[DONE]":
+            break
+        
+        event = json.loads(data)
+        if event.get("error"):
+            raise ValueError(f"Stream error: {event['error'].get('message', event['error'])}")
+        if event.get("usage"):
+            response_data = event
+        delta = ((event.get("choices") or [{}])[0].get("delta") or {}).get("content")
+        if not delta:
+            continue
+        
+        if first_token_at is None:
+            first_token_at = now
+            if not sink.claim(owner):
+                raise RequestCancelled("Another request is already streaming this completion")
+            LLM_TIME_TO_FIRST_TOKEN.observe(now - start_time, model=model)
+            get_latency_tracker().record(model, now - start_time, streamed=True)
+            span.set_attribute("ttft_seconds", round(now - start_time, 3))
+            _set_read_timeout(response, settings.llm_inter_token_timeout)
+        last_token_at = now
+        parts.append(delta)
+        sink.write(owner, delta)
+    
+    if first_token_at is None:
+        raise ValueError(f"Stream from {model} ended without content")
+    return "".join(parts), response_data
+
+def _iter_stream_lines(response, model):
+    """Iterate the SSE data of a response, reporting socket read timeouts as stalls."""
     try:
-        response = requests.post("https://openrouter.ai/api/v1/chat/completions", json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        response_data = response.json()
-        if "choices" in response_data:
-            content = response_data["choices"][0]["message"]["content"]
-        elif "content" in response_data:
-            content = response_data["content"]
-        else:
-            raise ValueError("Unexpected API response format")
-        return content
-    except Exception as e:
-        print(f"❌ OpenRouter API error: {e}")
-        return f"Error calling OpenRouter API: {str(e)[:100]}... (FALLBACK RESPONSE)"
+        yield from iter_sse_data(response.iter_lines(chunk_size=None))
+    except requests.exceptions.RequestException as e:
+        if "timed out" in str(e).lower():
+            raise StreamStalled(f"Stream from {model} stalled: {e}") from e
+        raise
+
+def _set_read_timeout(response, seconds):
+    """Shorten the socket read timeout of a streaming response, so a silent stall is noticed."""
+    try:
+        response.raw.connection.sock.settimeout(seconds)
+    except AttributeError:
+        pass
+
+def strip_code_fences(text):
+    """Remove markdown code block formatting from an LLM response."""
+    return (text or "").replace("```json", "").replace("```", "").strip()
+
+def has_workflow_nodes(json_str):
+    """Check whether a string parses as workflow JSON with at least one node."""
+    try:
+        parsed = json.loads(json_str)
+    except (json.JSONDecodeError, TypeError):
+        return False
+    return isinstance(parsed, dict) and isinstance(parsed.get("nodes"), list) and len(parsed["nodes"]) > 0
+
+def fix_json_with_llm(json_str, model=None):
+    """
+    Fix malformed JSON using regex patterns for common issues.
+    
+    The LLM step is routed over the repair model tiers: it starts on the
+    cheapest tier suited to the input size (or on model, if given) and only
+    escalates when the output is not workflow JSON with nodes.
+    """
+    with stage("repair", input_bytes=len(json_str)) as span:
+        fixed = _fix_json(json_str, model)
+        span.set_attribute("output_bytes", len(fixed) if fixed else 0)
+        return fixed
 
-def fix_json_with_llm(json_str, model="openai/gpt-3.5-turbo"):
-    """Fix malformed JSON using regex patterns for common issues."""
+def _fix_json(json_str, model):
+    """Repair steps of fix_json_with_llm: parse, regex fixes, LLM, aggressive regex."""
     try:
         # Try to parse as-is first
         try:
@@ -133,24 +392,17 @@ IMPORTANT:
 
 Your task is to fix the JSON syntax while preserving ALL content, especially the nodes array.
 """
-            try:
-                fixed_json = call_openrouter(prompt, model=model)
-                if fixed_json:
-                    # Remove any markdown code block formatting if present
-                    fixed_json = fixed_json.replace("```json", "").replace("```", "").strip()
-                    
-                    # Verify the fixed JSON
-                    try:
-                        parsed_llm = json.loads(fixed_json)
-                        if "nodes" in parsed_llm and len(parsed_llm["nodes"]) > 0:
-                            print(f"✅ Successfully fixed JSON with OpenRouter - found {len(parsed_llm['nodes'])} nodes")
-                            return fixed_json
-                        else:
-                            print("❌ LLM-fixed JSON is missing nodes")
-                    except json.JSONDecodeError:
-                        print("❌ LLM-fixed JSON is still invalid")
-            except Exception as e:
-                print(f"❌ LLM JSON fixing failed: {e}")
+            fixed_json, routed_model = get_router().run(
+                "repair",
+                lambda name: strip_code_fences(call_openrouter(prompt, model=name, **call_site_options("repair"))),
+                has_workflow_nodes,
+                size=len(json_str),
+                model=model
+            )
+            if fixed_json:
+                print(f"✅ Successfully fixed JSON with {routed_model} - found {len(json.loads(fixed_json)['nodes'])} nodes")
+                return fixed_json
+            print("❌ LLM JSON fixing failed on every model tier")
         
         # If all else fails, try a more aggressive regex approach
         print("⚠️ Attempting aggressive regex fixing")
@@ -176,6 +428,10 @@ Your task is to fix the JSON syntax while preserving ALL content, especially the
         # If all else fails, return a minimal valid JSON structure
         print("⚠️ Using fallback minimal JSON structure")
         return '{"id":"unknown","name":"Unknown Workflow","nodes":[],"connections":{},"active":false,"settings":{}}'
+    except CircuitOpenError:
+        # The repair was not attempted (open breaker or spent daily budget); the caller requeues
+        # the workflow and holds new work until retry_after
+        raise
     except Exception as e:
         print(f"❌ JSON fixing failed: {e}")
         return '{"id":"unknown","name":"Unknown Workflow","nodes":[],"connections":{},"active":false,"settings":{}}'
@@ -211,7 +467,7 @@ def extract_and_clean_n8n_json(html_string):
             except json.JSONDecodeError as e:
                 print(f"❌ ERROR: Failed to parse fixed JSON: {e}")
                 # Try one more time with a more aggressive approach
-                fixed_json = fix_json_with_llm(raw_json, model="openai/gpt-4-turbo")
+                fixed_json = fix_json_with_llm(raw_json, model=get_router().strongest("repair"))
                 response_data = json.loads(fixed_json)
             
             # Check if the response has a cleaned_workflow field (from the LLM response format)
@@ -295,7 +551,7 @@ def extract_and_clean_n8n_json(html_string):
 
 def fetch_workflow_from_api(workflow_id, output_dir="."):
     """Fetch workflow from n8n.io website directly and save consolidated files."""
-    url = f"https://n8n.io/workflows/{workflow_id}"
+    url = f"{settings.n8n_base_url.rstrip('/')}/workflows/{workflow_id}"
     print(f"Fetching workflow from: {url}")
     
     try:
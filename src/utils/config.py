@@ -6,8 +6,43 @@ try:
     class Settings(BaseSettings):
         openrouter_api_key: str = None
         openrouter_base_url: str = "https://openrouter.ai/api/v1"
+        n8n_base_url: str = "https://n8n.io"
         default_model: str = "mistralai/ministral-8b"
         analysis_model: str = "mistralai/ministral-8b"
+        output_dir: str = "."
+        mirror_dir: str = "/root/ai_n8n_workflowmaker/n8n_workflows"
+        output_artifacts: str = "workflow,metadata,analysis,readme"
+        corpus_db: str = ""
+        corpus_index_db: str = "db/corpus_index.sqlite"
+        trace_file: str = ""
+        prompt_token_budget: int = 0
+        map_reduce_threshold_nodes: int = 40
+        map_reduce_part_nodes: int = 20
+        map_reduce_concurrency: int = 4
+        analysis_batch_size: int = 5
+        analysis_batch_max_nodes: int = 10
+        repair_model_tiers: str = "openai/gpt-3.5-turbo,openai/gpt-4o-mini,openai/gpt-4-turbo"
+        analysis_model_tiers: str = "mistralai/ministral-8b,openai/gpt-4o-mini,openai/gpt-4-turbo"
+        repair_large_chars: int = 20000
+        analysis_large_nodes: int = 25
+        analysis_fallback_models: str = ""
+        analysis_hedge: bool = False
+        repair_fallback_models: str = ""
+        repair_hedge: bool = False
+        hedge_default_delay: float = 20.0
+        hedge_min_delay: float = 2.0
+        llm_stream: bool = True
+        llm_first_token_timeout: float = 30.0
+        llm_inter_token_timeout: float = 10.0
+        breaker_failure_rate: float = 0.5
+        breaker_min_calls: int = 10
+        breaker_open_seconds: float = 30.0
+        breaker_slow_call_seconds: float = 90.0
+        n8n_slow_call_seconds: float = 15.0
+        llm_tokens_per_minute: int = 0
+        llm_daily_token_budget: int = 0
+        llm_daily_cost_budget: float = 0.0
+        llm_budget_file: str = "db/llm_budget.json"
         
         class Config:
             env_file = ".env"
@@ -18,8 +53,43 @@ except ImportError:
         def __init__(self):
             self.openrouter_api_key = None
             self.openrouter_base_url = "https://openrouter.ai/api/v1"
+            self.n8n_base_url = "https://n8n.io"
             self.default_model = "mistralai/ministral-8b"
             self.analysis_model = "mistralai/ministral-8b"
+            self.output_dir = "."
+            self.mirror_dir = "/root/ai_n8n_workflowmaker/n8n_workflows"
+            self.output_artifacts = "workflow,metadata,analysis,readme"
+            self.corpus_db = ""
+            self.corpus_index_db = "db/corpus_index.sqlite"
+            self.trace_file = ""
+            self.prompt_token_budget = 0
+            self.map_reduce_threshold_nodes = 40
+            self.map_reduce_part_nodes = 20
+            self.map_reduce_concurrency = 4
+            self.analysis_batch_size = 5
+            self.analysis_batch_max_nodes = 10
+            self.repair_model_tiers = "openai/gpt-3.5-turbo,openai/gpt-4o-mini,openai/gpt-4-turbo"
+            self.analysis_model_tiers = "mistralai/ministral-8b,openai/gpt-4o-mini,openai/gpt-4-turbo"
+            self.repair_large_chars = 20000
+            self.analysis_large_nodes = 25
+            self.analysis_fallback_models = ""
+            self.analysis_hedge = False
+            self.repair_fallback_models = ""
+            self.repair_hedge = False
+            self.hedge_default_delay = 20.0
+            self.hedge_min_delay = 2.0
+            self.llm_stream = True
+            self.llm_first_token_timeout = 30.0
+            self.llm_inter_token_timeout = 10.0
+            self.breaker_failure_rate = 0.5
+            self.breaker_min_calls = 10
+            self.breaker_open_seconds = 30.0
+            self.breaker_slow_call_seconds = 90.0
+            self.n8n_slow_call_seconds = 15.0
+            self.llm_tokens_per_minute = 0
+            self.llm_daily_token_budget = 0
+            self.llm_daily_cost_budget = 0.0
+            self.llm_budget_file = "db/llm_budget.json"
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Corpus Index
+
+This module maintains an inverted index over processed workflows (node
+type, integration and credential type -> workflow IDs) plus per-workflow
+connection-graph statistics. The index lives in SQLite and is updated
+incrementally as each workflow is processed, so corpus-wide questions are
+answered with indexed lookups instead of scanning workflow files.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+
+logger = logging.getLogger("corpus_index")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflow_node_types (
+    workflow_id TEXT NOT NULL,
+    node_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (workflow_id, node_type)
+);
+CREATE INDEX IF NOT EXISTS idx_node_types_type ON workflow_node_types (node_type);
+
+CREATE TABLE IF NOT EXISTS workflow_integrations (
+    workflow_id TEXT NOT NULL,
+    integration TEXT NOT NULL,
+    PRIMARY KEY (workflow_id, integration)
+);
+CREATE INDEX IF NOT EXISTS idx_integrations_name ON workflow_integrations (integration);
+
+CREATE TABLE IF NOT EXISTS workflow_credentials (
+    workflow_id TEXT NOT NULL,
+    credential_type TEXT NOT NULL,
+    PRIMARY KEY (workflow_id, credential_type)
+);
+CREATE INDEX IF NOT EXISTS idx_credentials_type ON workflow_credentials (credential_type);
+
+CREATE TABLE IF NOT EXISTS workflow_graph (
+    workflow_id TEXT PRIMARY KEY,
+    name TEXT,
+    node_count INTEGER NOT NULL,
+    edge_count INTEGER NOT NULL,
+    trigger_count INTEGER NOT NULL,
+    max_fan_out INTEGER NOT NULL,
+    max_depth INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+TABLES = ("workflow_node_types", "workflow_integrations", "workflow_credentials", "workflow_graph")
+
+# Node names (after prefix/suffix stripping) that are flow control or AI
+# plumbing rather than an external integration
+CORE_NODES = {
+    "agent", "aggregate", "chainllm", "chainretrievalqa", "chainsummarization", "chat",
+    "code", "cron", "datetime", "executeworkflow", "filter", "function", "functionitem",
+    "if", "interval", "itemlists", "limit", "manual", "memorybufferwindow", "merge",
+    "noop", "removeduplicates", "respondtowebhook", "schedule", "set", "sort",
+    "splitinbatches", "splitout", "start", "stickynote", "switch", "wait", "webhook",
+}
+
+INTEGRATION_PREFIXES = ("lmChat", "lm", "embeddings", "vectorStore")
+INTEGRATION_SUFFIXES = ("Trigger", "Tool")
+
+def integration_for_node_type(node_type):
+    """
+    Derive an integration name from an n8n node type.
+
+    "n8n-nodes-base.slackTrigger" -> "slack",
+    "@n8n/n8n-nodes-langchain.lmChatOpenAi" -> "openai".
+
+    Args:
+        node_type: Full n8n node type
+
+    Returns:
+        str: Integration name, or None for core/flow-control nodes
+    """
+    if not node_type:
+        return None
+
+    name = node_type.rsplit(".", 1)[-1]
+    for suffix in INTEGRATION_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            name = name[:-len(suffix)]
+    for prefix in INTEGRATION_PREFIXES:
+        if name.startswith(prefix) and len(name) > len(prefix) and name[len(prefix)].isupper():
+            name = name[len(prefix):]
+            break
+
+    name = name.lower()
+    if not name or name in CORE_NODES:
+        return None
+    return name
+
+def graph_stats(workflow_json):
+    """
+    Compute connection-graph statistics for a workflow.
+
+    Args:
+        workflow_json: Parsed workflow JSON
+
+    Returns:
+        dict: node_count, edge_count, trigger_count, max_fan_out, max_depth
+    """
+    nodes = workflow_json.get("nodes", [])
+    if not isinstance(nodes, list):
+        nodes = []
+    names = {node.get("name") for node in nodes}
+
+    edges = defaultdict(set)
+    in_degree = Counter()
+    edge_count = 0
+    connections = workflow_json.get("connections") or {}
+    if not isinstance(connections, dict):
+        connections = {}
+
+    for source, outputs in connections.items():
+        if not isinstance(outputs, dict):
+            continue
+        for branches in outputs.values():
+            for branch in branches or []:
+                for target in branch or []:
+                    target_name = target.get("node") if isinstance(target, dict) else None
+                    if target_name is None:
+                        continue
+                    edge_count += 1
+                    if target_name not in edges[source]:
+                        edges[source].add(target_name)
+                        in_degree[target_name] += 1
+
+    # Depth is the longest shortest-path distance from any source node
+    sources = [name for name in names if in_degree[name] == 0]
+    distance = {name: 0 for name in sources}
+    pending = deque(sources)
+    while pending:
+        current = pending.popleft()
+        for target in edges.get(current, ()):
+            if target not in distance:
+                distance[target] = distance[current] + 1
+                pending.append(target)
+
+    return {
+        "node_count": len(nodes),
+        "edge_count": edge_count,
+        "trigger_count": sum(1 for node in nodes if "trigger" in (node.get("type") or "").lower()),
+        "max_fan_out": max((len(targets) for targets in edges.values()), default=0),
+        "max_depth": max(distance.values(), default=0),
+    }
+
+def extract_index_entry(workflow_json):
+    """
+    Extract everything the index stores about a workflow.
+
+    Args:
+        workflow_json: Parsed workflow JSON
+
+    Returns:
+        dict: node_types Counter, integrations set, credentials set and graph stats
+    """
+    nodes = workflow_json.get("nodes", [])
+    if not isinstance(nodes, list):
+        nodes = []
+
+    node_types = Counter(node.get("type") for node in nodes if node.get("type"))
+    integrations = {integration_for_node_type(node_type) for node_type in node_types} - {None}
+    credentials = set()
+    for node in nodes:
+        if isinstance(node.get("credentials"), dict):
+            credentials.update(node["credentials"].keys())
+
+    return {
+        "name": workflow_json.get("name"),
+        "node_types": node_types,
+        "integrations": integrations,
+        "credentials": credentials,
+        "graph": graph_stats(workflow_json),
+    }
+
+class CorpusIndex:
+    """
+    An incrementally maintained inverted index over the workflow corpus.
+    """
+
+    def __init__(self, db_path="db/corpus_index.sqlite"):
+        """
+        Initialize the CorpusIndex.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+
+        # Ensure directories exist
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def update(self, workflow_id, workflow_json):
+        """
+        Replace the index entries of a single workflow.
+
+        Args:
+            workflow_id: Workflow ID
+            workflow_json: Parsed workflow JSON
+        """
+        entry = extract_index_entry(workflow_json)
+
+        with self.lock, self.conn:
+            self._delete(workflow_id)
+            self._insert(workflow_id, entry)
+
+    def _insert(self, workflow_id, entry):
+        """Insert the rows of a workflow (caller holds the lock and has deleted its old rows)."""
+        graph = entry["graph"]
+        self.conn.executemany(
+            "INSERT INTO workflow_node_types (workflow_id, node_type, count) VALUES (?, ?, ?)",
+            [(workflow_id, node_type, count) for node_type, count in entry["node_types"].items()]
+        )
+        self.conn.executemany(
+            "INSERT INTO workflow_integrations (workflow_id, integration) VALUES (?, ?)",
+            [(workflow_id, integration) for integration in sorted(entry["integrations"])]
+        )
+        self.conn.executemany(
+            "INSERT INTO workflow_credentials (workflow_id, credential_type) VALUES (?, ?)",
+            [(workflow_id, credential) for credential in sorted(entry["credentials"])]
+        )
+        self.conn.execute(
+            "INSERT INTO workflow_graph (workflow_id, name, node_count, edge_count, trigger_count, "
+            "max_fan_out, max_depth, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (workflow_id, entry["name"], graph["node_count"], graph["edge_count"],
+             graph["trigger_count"], graph["max_fan_out"], graph["max_depth"],
+             datetime.now().isoformat())
+        )
+
+    def remove(self, workflow_id):
+        """Remove a workflow from the index."""
+        with self.lock, self.conn:
+            self._delete(workflow_id)
+
+    def _delete(self, workflow_id=None):
+        """Delete all rows of a workflow, or of every workflow (caller holds the lock)."""
+        for table in TABLES:
+            if workflow_id is None:
+                self.conn.execute(f"DELETE FROM {table}")
+            else:
+                self.conn.execute(f"DELETE FROM {table} WHERE workflow_id = ?", (workflow_id,))
+
+    def _query(self, sql, params=()):
+        """Run a read query under the lock."""
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def workflows_with_node_type(self, node_type):
+        """Return IDs of workflows that use a node type."""
+        rows = self._query(
+            "SELECT workflow_id FROM workflow_node_types WHERE node_type = ? ORDER BY workflow_id", (node_type,)
+        )
+        return [row[0] for row in rows]
+
+    def workflows_with_integration(self, integration):
+        """Return IDs of workflows that use an integration."""
+        rows = self._query(
+            "SELECT workflow_id FROM workflow_integrations WHERE integration = ? ORDER BY workflow_id",
+            (integration.lower(),)
+        )
+        return [row[0] for row in rows]
+
+    def workflows_with_credential(self, credential_type):
+        """Return IDs of workflows that need a credential type."""
+        rows = self._query(
+            "SELECT workflow_id FROM workflow_credentials WHERE credential_type = ? ORDER BY workflow_id",
+            (credential_type,)
+        )
+        return [row[0] for row in rows]
+
+    def top(self, by="node_types", limit=20):
+        """
+        Return the most used node types, integrations or credential types.
+
+        Args:
+            by: "node_types", "integrations" or "credentials"
+            limit: Maximum number of entries
+
+        Returns:
+            list: Dicts with the key and the number of workflows using it
+        """
+        tables = {
+            "node_types": ("workflow_node_types", "node_type"),
+            "integrations": ("workflow_integrations", "integration"),
+            "credentials": ("workflow_credentials", "credential_type"),
+        }
+        if by not in tables:
+            raise ValueError(f"Unknown index '{by}' (choose from {', '.join(tables)})")
+
+        table, column = tables[by]
+        rows = self._query(
+            f"SELECT {column}, COUNT(*) AS workflows FROM {table} "
+            f"GROUP BY {column} ORDER BY workflows DESC, {column} LIMIT ?",
+            (limit,)
+        )
+        return [{column: row[0], "workflows": row[1]} for row in rows]
+
+    def get_graph_stats(self, workflow_id):
+        """Return the stored graph statistics of a workflow, or None."""
+        with self.lock:
+            cursor = self.conn.execute("SELECT * FROM workflow_graph WHERE workflow_id = ?", (workflow_id,))
+            row = cursor.fetchone()
+            columns = [description[0] for description in cursor.description]
+        return dict(zip(columns, row)) if row else None
+
+    def summary(self):
+        """
+        Return corpus-wide statistics.
+
+        Returns:
+            dict: Workflow, node and edge totals and graph-size aggregates
+        """
+        row = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(node_count), 0), COALESCE(SUM(edge_count), 0), "
+            "COALESCE(AVG(node_count), 0), COALESCE(MAX(node_count), 0), COALESCE(MAX(max_depth), 0) "
+            "FROM workflow_graph"
+        )[0]
+        return {
+            "workflows": row[0],
+            "nodes": row[1],
+            "edges": row[2],
+            "avg_nodes": round(row[3], 2),
+            "max_nodes": row[4],
+            "max_depth": row[5],
+            "distinct_node_types": self._query("SELECT COUNT(DISTINCT node_type) FROM workflow_node_types")[0][0],
+            "distinct_integrations": self._query("SELECT COUNT(DISTINCT integration) FROM workflow_integrations")[0][0],
+        }
+
+    def rebuild(self, workflows):
+        """
+        Rebuild the index from (workflow_id, workflow_json) pairs.
+
+        The old index is replaced in one transaction, so workflows missing from
+        the source and entries of changed workflows do not survive the rebuild.
+
+        Args:
+            workflows: Iterable of (workflow_id, workflow_json) tuples
+
+        Returns:
+            int: Number of indexed workflows
+        """
+        indexed = set()
+        with self.lock, self.conn:
+            self._delete()
+            for workflow_id, workflow_json in workflows:
+                # A workflow listed twice keeps its last version
+                if workflow_id in indexed:
+                    self._delete(workflow_id)
+                self._insert(workflow_id, extract_index_entry(workflow_json))
+                indexed.add(workflow_id)
+        return len(indexed)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+def iter_output_folders(output_dir="."):
+    """Yield (workflow_id, workflow_json) from per-workflow output folders."""
+    for workflow_id in sorted(os.listdir(output_dir)):
+        workflow_file = os.path.join(output_dir, workflow_id, f"{workflow_id}.json")
+        if os.path.isfile(workflow_file):
+            try:
+                with open(workflow_file, 'r', encoding='utf-8') as f:
+                    yield workflow_id, json.load(f)
+            except Exception as e:
+                logger.error(f"Error reading {workflow_file}: {e}")
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Corpus Index")
+    parser.add_argument("--db", default="db/corpus_index.sqlite", help="Path to the index database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (("node-type", "Workflows using a node type"),
+                               ("integration", "Workflows using an integration"),
+                               ("credential", "Workflows needing a credential type")):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("value")
+
+    top_parser = subparsers.add_parser("top", help="Most used node types, integrations or credentials")
+    top_parser.add_argument("--by", default="integrations", choices=["node_types", "integrations", "credentials"])
+    top_parser.add_argument("--limit", type=int, default=20)
+
+    stats_parser = subparsers.add_parser("stats", help="Corpus summary or graph stats of one workflow")
+    stats_parser.add_argument("workflow_id", nargs="?")
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild the index")
+    source = rebuild_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-store", help="Corpus store database to index")
+    source.add_argument("--from-dir", help="Directory containing workflow output folders")
+    args = parser.parse_args()
+
+    index = CorpusIndex(args.db)
+    try:
+        if args.command == "node-type":
+            result = index.workflows_with_node_type(args.value)
+        elif args.command == "integration":
+            result = index.workflows_with_integration(args.value)
+        elif args.command == "credential":
+            result = index.workflows_with_credential(args.value)
+        elif args.command == "top":
+            result = index.top(args.by, args.limit)
+        elif args.command == "stats":
+            result = index.get_graph_stats(args.workflow_id) if args.workflow_id else index.summary()
+            if result is None:
+                print(f"❌ Workflow not indexed: {args.workflow_id}")
+                sys.exit(1)
+        else:
+            if args.from_store:
+                from src.utils.corpus_store import CorpusStore
+                store = CorpusStore(args.from_store)
+                workflows = ((w["workflow_id"], w["workflow"]) for w in store.iter_workflows())
+            else:
+                workflows = iter_output_folders(args.from_dir)
+            result = {"indexed": index.rebuild(workflows)}
+
+        print(json.dumps(result, indent=2))
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Corpus Store
+
+This module provides a consolidated SQLite store for processed workflows.
+Each workflow is one row with compact JSON columns, giving random access by
+workflow ID and fast full scans without opening thousands of small files.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger("corpus_store")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    workflow_id TEXT PRIMARY KEY,
+    name TEXT,
+    node_count INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    workflow TEXT NOT NULL,
+    metadata TEXT,
+    analysis TEXT,
+    updated_at TEXT NOT NULL
+)
+"""
+
+def _compact(value):
+    """Serialize a value as compact JSON, or None."""
+    if value is None:
+        return None
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+class CorpusStore:
+    """
+    A single-file store of processed workflows backed by SQLite.
+    """
+
+    def __init__(self, db_path="db/corpus.sqlite"):
+        """
+        Initialize the CorpusStore.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+
+        # Ensure directories exist
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets readers scan while the batch processor keeps writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def put(self, workflow_id, workflow_json, metadata=None, analysis=None, content_hash=None):
+        """
+        Insert or replace a processed workflow.
+
+        Args:
+            workflow_id: Workflow ID
+            workflow_json: Parsed workflow JSON
+            metadata: Scraped metadata dict
+            analysis: LLM analysis text
+            content_hash: Canonical workflow hash from the manifest
+        """
+        nodes = workflow_json.get("nodes", [])
+        row = (
+            workflow_id,
+            workflow_json.get("name"),
+            len(nodes) if isinstance(nodes, list) else 0,
+            content_hash,
+            _compact(workflow_json),
+            _compact(metadata),
+            analysis,
+            datetime.now().isoformat(),
+        )
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO workflows "
+                "(workflow_id, name, node_count, content_hash, workflow, metadata, analysis, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+            self.conn.commit()
+
+    def get(self, workflow_id):
+        """
+        Get a stored workflow by ID.
+
+        Args:
+            workflow_id: Workflow ID
+
+        Returns:
+            dict: Stored workflow with parsed JSON columns, or None
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM workflows WHERE workflow_id = ?", (workflow_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def iter_workflows(self, include_metadata=False, include_analysis=False, batch_size=500):
+        """
+        Scan all stored workflows in ID order.
+
+        Args:
+            include_metadata: Also load the (large) metadata column
+            include_analysis: Also load the analysis text
+            batch_size: Number of rows fetched from SQLite at a time
+
+        Yields:
+            dict: Stored workflow with parsed JSON columns
+        """
+        columns = ["workflow_id", "name", "node_count", "content_hash", "workflow", "updated_at"]
+        if include_metadata:
+            columns.append("metadata")
+        if include_analysis:
+            columns.append("analysis")
+
+        # A separate read connection lets long scans run alongside writers
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(columns)} FROM workflows ORDER BY workflow_id")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_dict(row)
+        finally:
+            conn.close()
+
+    def ids(self):
+        """Return all stored workflow IDs."""
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT workflow_id FROM workflows ORDER BY workflow_id")]
+
+    def count(self):
+        """Return the number of stored workflows."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM workflows").fetchone()[0]
+
+    def delete(self, workflow_id):
+        """Delete a stored workflow."""
+        with self.lock:
+            self.conn.execute("DELETE FROM workflows WHERE workflow_id = ?", (workflow_id,))
+            self.conn.commit()
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    @staticmethod
+    def _row_to_dict(row):
+        """Convert a row to a dict, parsing JSON columns."""
+        result = dict(row)
+        for key in ("workflow", "metadata"):
+            if result.get(key) is not None:
+                result[key] = json.loads(result[key])
+        return result
+
+def import_output_folders(store, output_dir="."):
+    """
+    Import per-workflow output folders written by OutputManager.
+
+    Args:
+        store: CorpusStore instance
+        output_dir: Directory containing <workflow_id>/<workflow_id>.json folders
+
+    Returns:
+        int: Number of imported workflows
+    """
+    imported = 0
+    for workflow_id in sorted(os.listdir(output_dir)):
+        folder = os.path.join(output_dir, workflow_id)
+        workflow_file = os.path.join(folder, f"{workflow_id}.json")
+        if not os.path.isfile(workflow_file):
+            continue
+
+        try:
+            with open(workflow_file, 'r', encoding='utf-8') as f:
+                workflow_json = json.load(f)
+
+            metadata = None
+            metadata_file = os.path.join(folder, f"{workflow_id}_metadata.json")
+            if os.path.isfile(metadata_file):
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+
+            analysis = None
+            analysis_file = os.path.join(folder, f"{workflow_id}_analysis.txt")
+            if os.path.isfile(analysis_file):
+                with open(analysis_file, 'r', encoding='utf-8') as f:
+                    analysis = f.read()
+
+            store.put(workflow_id, workflow_json, metadata, analysis)
+            imported += 1
+        except Exception as e:
+            logger.error(f"Error importing {folder}: {e}")
+
+    return imported
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Corpus Store")
+    parser.add_argument("--db", default="db/corpus.sqlite", help="Path to the corpus database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import existing workflow output folders")
+    import_parser.add_argument("output_dir", help="Directory containing workflow folders")
+
+    get_parser = subparsers.add_parser("get", help="Print a stored workflow")
+    get_parser.add_argument("workflow_id", help="Workflow ID")
+
+    export_parser = subparsers.add_parser("export", help="Export all workflows as JSON lines")
+    export_parser.add_argument("output", help="Output file ('-' for stdout)")
+    export_parser.add_argument("--with-analysis", action="store_true", help="Include analysis text")
+
+    subparsers.add_parser("stats", help="Print corpus statistics")
+    args = parser.parse_args()
+
+    store = CorpusStore(args.db)
+    try:
+        if args.command == "import":
+            print(f"Imported {import_output_folders(store, args.output_dir)} workflows into {args.db}")
+        elif args.command == "get":
+            workflow = store.get(args.workflow_id)
+            if not workflow:
+                print(f"❌ Workflow not found: {args.workflow_id}")
+                sys.exit(1)
+            print(json.dumps(workflow, indent=2))
+        elif args.command == "export":
+            out = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+            try:
+                for workflow in store.iter_workflows(include_analysis=args.with_analysis):
+                    out.write(_compact(workflow) + "\n")
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        elif args.command == "stats":
+            node_types = Counter()
+            total_nodes = 0
+            for workflow in store.iter_workflows():
+                total_nodes += workflow["node_count"]
+                node_types.update(node.get("type") for node in workflow["workflow"].get("nodes", []))
+            print(f"Workflows: {store.count()}")
+            print(f"Nodes: {total_nodes}")
+            print("Top node types:")
+            for node_type, count in node_types.most_common(20):
+                print(f"  {count:6d}  {node_type}")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Hedged Requests
+
+This module runs an LLM call over a fallback chain of models and hedges slow
+requests. If the current request has not answered within the p95 latency of its
+model, a second request goes to the next model of the chain; the first valid
+answer wins and the other request is cancelled. A request that fails outright
+moves straight on to the next model, so one slow or failing provider no longer
+stalls a worker for the full timeout.
+"""
+
+import contextvars
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .config import get_settings
+from .metrics import REGISTRY
+from .tracing import percentile
+
+logger = logging.getLogger("hedging")
+
+HEDGED_REQUESTS = REGISTRY.counter(
+    "llm_hedged_requests_total", "LLM calls that started a hedge request, by which request won", ["winner"]
+)
+FALLBACK_REQUESTS = REGISTRY.counter(
+    "llm_fallback_requests_total", "LLM requests sent to a fallback model after a failure", ["model"]
+)
+
+# At most this many requests of one call are in flight at once
+MAX_IN_FLIGHT = 2
+
+# Latency samples needed before the p95 replaces the default hedge delay
+MIN_SAMPLES = 20
+
+class RequestCancelled(Exception):
+    """Raised by a request that was cancelled because another one answered first."""
+
+class LatencyTracker:
+    """
+    Keeps recent successful request latencies per model to derive hedge delays.
+
+    Streamed requests are tracked by their time to first token, since that is
+    when a streamed request shows it is answering.
+    """
+
+    def __init__(self, window=200):
+        """
+        Initialize the LatencyTracker.
+
+        Args:
+            window: Number of recent latencies kept per model
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies = {}
+
+    def record(self, model, seconds, streamed=False):
+        """Record the latency (or time to first token if streamed) of a successful request."""
+        with self._lock:
+            self._latencies.setdefault((model, streamed), deque(maxlen=self.window)).append(seconds)
+
+    def hedge_delay(self, model, streamed=False):
+        """
+        Get the delay after which a request to model is hedged.
+
+        Returns:
+            float: p95 latency of the model, or the default delay until enough samples exist,
+                   never below the configured minimum
+        """
+        settings = get_settings()
+        with self._lock:
+            values = sorted(self._latencies.get((model, streamed)) or [])
+        delay = percentile(values, 95) if len(values) >= MIN_SAMPLES else settings.hedge_default_delay
+        return max(delay, settings.hedge_min_delay)
+
+_tracker = LatencyTracker()
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+def get_latency_tracker():
+    """Return the process-wide LatencyTracker."""
+    return _tracker
+
+def run_hedged(attempt, models, hedge=True, validate=None, streamed=False):
+    """
+    Run a request over a fallback chain of models, hedging slow requests.
+
+    Args:
+        attempt: Function (model, cancel_event) returning the result or raising;
+                 it should stop early and raise RequestCancelled once cancel_event is set
+        models: Models to try in order; the first is the primary
+        hedge: Start the next model early when a request is slower than its p95;
+               a function returning False skips hedging at that moment
+        validate: Function (result) returning True if the result is usable (default: truthy)
+        streamed: Requests are streamed, so hedge delays come from time to first token
+
+    Returns:
+        tuple: (result, model) of the first valid result
+
+    Raises:
+        Exception: The last error if no model returned a valid result
+    """
+    validate = validate or bool
+    remaining = list(models)
+    pending = {}
+    last_error = None
+    hedged = False
+
+    def launch():
+        model = remaining.pop(0)
+        cancel = threading.Event()
+        # Copy the context so request spans stay children of the caller's span
+        future = _executor.submit(contextvars.copy_context().run, attempt, model, cancel)
+        pending[future] = (model, cancel)
+        return model
+
+    newest = launch()
+    while pending:
+        timeout = None
+        if hedge and remaining and len(pending) < MAX_IN_FLIGHT:
+            timeout = _tracker.hedge_delay(newest, streamed)
+
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done and callable(hedge) and not hedge():
+            # Not hedging right now (e.g. a stream is already answering); check again later
+            continue
+        if not done:
+            logger.info(f"No answer from {newest} after {timeout:.1f}s, hedging with {remaining[0]}")
+            hedged = True
+            newest = launch()
+            continue
+
+        for future in done:
+            model, _ = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                logger.warning(f"LLM request to {model} failed: {e}")
+                continue
+            if not validate(result):
+                last_error = ValueError(f"Invalid response from {model}")
+                continue
+
+            for _, cancel in pending.values():
+                cancel.set()
+            if hedged:
+                HEDGED_REQUESTS.inc(winner="primary" if model == models[0] else "hedge")
+            return result, model
+
+        # Every request in flight failed: fall back to the next model
+        if not pending and remaining:
+            newest = launch()
+            FALLBACK_REQUESTS.inc(model=newest)
+            logger.info(f"Falling back to {newest}")
+
+    raise last_error or RuntimeError("No models to call")
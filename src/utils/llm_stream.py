@@ -0,0 +1,243 @@
+"""
+LLM Streaming
+
+This module carries streamed completion text from the request that produces it
+to whoever is waiting for it. Server-sent event lines of a streamed completion
+are parsed into deltas, a TokenSink accepts the deltas of one request at a time
+(the winner of a hedge, or the next model after a failure), and a StreamHub
+fans them out to partial analysis files and live subscribers while the
+completion is still being generated.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+
+logger = logging.getLogger("llm_stream")
+
+class StreamStalled(TimeoutError):
+    """Raised when a streamed completion stops producing tokens."""
+
+def iter_sse_data(lines):
+    """
+    Parse server-sent event lines into data payloads.
+
+    Args:
+        lines: Iterable of decoded lines (str or bytes)
+
+    Yields:
+        str: The data of each event, or None for comments and other lines
+             (keep-alives), so callers can check timeouts between tokens
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        if line.startswith("data:"):
+            yield line[5:].strip()
+        else:
+            yield None
+
+class TokenSink:
+    """
+    Receives the streamed text of one completion.
+
+    Several requests may race for the same completion (hedging, fallbacks);
+    the first to produce a token owns the sink and the others are turned
+    away. When the owner fails, or its output is rejected, the sink is reset
+    so the next request starts from an empty text.
+    """
+
+    def __init__(self, listeners=()):
+        """
+        Initialize the TokenSink.
+
+        Args:
+            listeners: Functions (event, payload) called with ("token", text), ("reset", None)
+                       and ("close", error)
+        """
+        self.listeners = list(listeners)
+        self.owner = None
+        self.closed = False
+        self._parts = []
+        # Listeners run under the lock so every listener sees events in the same order
+        self._lock = threading.RLock()
+
+    @property
+    def text(self):
+        """Text received so far."""
+        with self._lock:
+            return "".join(self._parts)
+
+    def claim(self, owner):
+        """
+        Make owner the request whose tokens are accepted.
+
+        Returns:
+            bool: True if owner holds the sink, False if another request already does
+        """
+        with self._lock:
+            if self.owner is None:
+                self.owner = owner
+            return self.owner is owner
+
+    def write(self, owner, text):
+        """Append a delta of the owning request; deltas of other requests are ignored."""
+        with self._lock:
+            if self.owner is not owner or self.closed:
+                return
+            self._parts.append(text)
+            self._emit("token", text)
+
+    def release(self, owner):
+        """Give up the sink after the owning request failed."""
+        with self._lock:
+            if self.owner is owner:
+                self.reset()
+
+    def reset(self):
+        """Discard the received text, e.g. before retrying with another model."""
+        with self._lock:
+            had_text = bool(self._parts)
+            self.owner = None
+            self._parts = []
+            if had_text:
+                self._emit("reset", None)
+
+    def close(self, error=None):
+        """Finish the stream; no further tokens are accepted."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._emit("close", error)
+
+    def _emit(self, event, payload):
+        """Call every listener, logging listener errors instead of failing the request."""
+        for listener in self.listeners:
+            try:
+                listener(event, payload)
+            except Exception as e:
+                logger.warning(f"Stream listener failed on {event}: {e}")
+
+def partial_file_listener(path):
+    """
+    Build a listener that mirrors streamed text into a partial file.
+
+    The file grows as tokens arrive, is emptied on reset and removed when the
+    stream fails. On success it is left for the final (atomic) write to replace.
+
+    Args:
+        path: Partial file path
+
+    Returns:
+        function: Listener for TokenSink
+    """
+    lock = threading.Lock()
+
+    def listener(event, payload):
+        with lock:
+            if event == "token":
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(payload)
+            elif event == "reset":
+                open(path, "w").close()
+            elif event == "close" and payload and os.path.exists(path):
+                os.remove(path)
+
+    open(path, "w").close()
+    return listener
+
+class StreamHub:
+    """
+    Registry of live completion streams by key (e.g. workflow ID) with
+    asyncio subscribers.
+    """
+
+    def __init__(self):
+        """Initialize the StreamHub."""
+        self._lock = threading.Lock()
+        self._sinks = {}
+        self._subscribers = {}
+
+    def open(self, key, listeners=()):
+        """
+        Start a stream that subscribers can follow.
+
+        Args:
+            key: Stream key
+            listeners: Additional TokenSink listeners
+
+        Returns:
+            TokenSink: Sink to pass to call_openrouter
+        """
+        sink = TokenSink(list(listeners) + [lambda event, payload: self._publish(key, event, payload)])
+        with self._lock:
+            self._sinks[key] = sink
+        return sink
+
+    def is_active(self, key):
+        """Check whether a stream is running for key."""
+        with self._lock:
+            return key in self._sinks
+
+    def _publish(self, key, event, payload):
+        """Deliver an event to the subscribers of a stream (thread-safe)."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+            if event == "close":
+                self._sinks.pop(key, None)
+        entry = {"event": "done" if event == "close" else event}
+        if event == "token":
+            entry["text"] = payload
+        elif event == "close":
+            entry["error"] = str(payload) if payload else None
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, entry)
+
+    async def subscribe(self, key):
+        """
+        Yield the events of a stream until it is done.
+
+        The text received before subscribing is replayed as one token event.
+
+        Yields:
+            dict: {"event": "token", "text": ...}, {"event": "reset"} or {"event": "done", "error": ...}
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        subscriber = (loop, queue)
+        with self._lock:
+            sink = self._sinks.get(key)
+        if sink is None:
+            return
+
+        # Holding the sink lock means no token is both replayed and delivered live
+        with sink._lock:
+            backlog = "".join(sink._parts)
+            finished = sink.closed
+            if not finished:
+                with self._lock:
+                    self._subscribers.setdefault(key, set()).add(subscriber)
+
+        try:
+            if backlog:
+                yield {"event": "token", "text": backlog}
+            if finished:
+                yield {"event": "done", "error": None}
+                return
+            while True:
+                entry = await queue.get()
+                yield entry
+                if entry["event"] == "done":
+                    return
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+# Streams of the workflow analyses currently being generated, by workflow ID
+ANALYSIS_STREAMS = StreamHub()
@@ -0,0 +1,260 @@
+"""
+Metrics
+
+This module provides a small, dependency-free metrics registry (counters,
+gauges and histograms) rendered in the Prometheus text exposition format,
+together with the metrics shared by the workflow pipeline.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from fast parses up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _format_value(value):
+    """Format a sample value the way Prometheus expects."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value):
+    """Escape a label value (backslash, double quote and newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    """Format a label set as {name="value",...}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+class _Metric:
+    """Base class of a metric family with a fixed set of label names."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels every sample must provide
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        """Validate labels and turn them into a sorted key."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def render(self):
+        """Render the metric family as exposition text lines."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.values.items(), key=lambda item: tuple(str(v) for _, v in item[0]))
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """A monotonically increasing value."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        """Increase the counter."""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """Return the current value."""
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        """Set the gauge."""
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        """Increase the gauge."""
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        """Decrease the gauge."""
+        self.inc(-amount, **labels)
+
+    def get(self, **labels):
+        """Return the current value."""
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def clear(self):
+        """Drop all label sets (e.g. before re-populating from a snapshot)."""
+        with self.lock:
+            self.values.clear()
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        """Record an observation."""
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the enclosed block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get(self, **labels):
+        """Return a copy of the bucket counts, sum and count."""
+        with self.lock:
+            state = self.values.get(self._key(labels))
+            return {"counts": list(state["counts"]), "sum": state["sum"], "count": state["count"]} if state else None
+
+    def _samples(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["counts"]):
+            cumulative += count
+            labels = key + (("le", _format_value(bound)),)
+            lines.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(key)} {state['count']}")
+        return lines
+
+class MetricsRegistry:
+    """
+    A collection of metric families rendered together on /metrics.
+    """
+
+    def __init__(self):
+        """Initialize the MetricsRegistry."""
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        """Return the registered metric, creating it on first use."""
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Get or create a gauge."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry used by the batch processor and the API server
+REGISTRY = MetricsRegistry()
+
+# Pipeline metrics shared by the processors
+STAGE_SECONDS = REGISTRY.histogram(
+    "workflow_stage_seconds",
+    "Time spent per workflow pipeline stage (fetch, extract, repair, analyze, write)",
+    ["stage"]
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "workflow_stage_errors_total", "Workflow pipeline stage failures", ["stage"]
+)
+WORKFLOWS_PROCESSED = REGISTRY.counter(
+    "workflows_processed_total", "Workflows processed by result (success, skipped, failed)", ["result"]
+)
+WORKFLOW_SECONDS = REGISTRY.histogram(
+    "workflow_processing_seconds", "End-to-end processing time per workflow URL"
+)
+LLM_REQUESTS = REGISTRY.counter(
+    "llm_requests_total", "LLM API requests by model and outcome", ["model", "status"]
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_seconds", "LLM API request latency", ["model"]
+)
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds", "Time from sending a streamed LLM request to its first token", ["model"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "LLM tokens reported by the API usage field", ["model", "kind"]
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit, miss)", ["cache", "result"]
+)
+
+@contextmanager
+def stage_timer(stage):
+    """Time a pipeline stage, counting it as an error if the block raises."""
+    with STAGE_SECONDS.time(stage=stage):
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.inc(stage=stage)
+            raise
@@ -0,0 +1,211 @@
+"""
+Model Router
+
+This module picks the model for each LLM task from a ladder of cost tiers
+(see docs/MODEL_COST_GUIDE.md). A request starts on the cheapest tier that is
+likely to succeed for its task and input size, its output is validated, and it
+only escalates to the next tier when validation fails. Per-route attempt,
+success and latency stats make it visible which tiers earn their keep.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from .circuit_breaker import CircuitOpenError
+from .config import get_settings
+from .metrics import REGISTRY
+from .tracing import current_span, percentile
+
+logger = logging.getLogger("model_router")
+
+ROUTE_ATTEMPTS = REGISTRY.counter(
+    "model_route_attempts_total", "Routed LLM attempts by task, model and validation result",
+    ["task", "model", "result"]
+)
+ROUTE_ESCALATIONS = REGISTRY.counter(
+    "model_route_escalations_total", "Routed requests that moved to a higher model tier", ["task"]
+)
+
+# Tiers are skipped once they have failed this often on a task and size class
+MIN_ATTEMPTS = 5
+MIN_SUCCESS_RATE = 0.5
+
+def parse_tiers(value):
+    """Parse a comma-separated model list into a list of model names."""
+    return [model.strip() for model in (value or "").split(",") if model.strip()]
+
+def default_routes():
+    """
+    Build the task routes from settings.
+
+    Returns:
+        dict: {task: {"tiers": [models cheapest first], "large_size": size that starts one tier up}}
+    """
+    settings = get_settings()
+    return {
+        # Repair size is the raw JSON length in characters
+        "repair": {"tiers": parse_tiers(settings.repair_model_tiers),
+                   "large_size": settings.repair_large_chars},
+        # Analysis size is the workflow's node count
+        "analysis": {"tiers": parse_tiers(settings.analysis_model_tiers),
+                     "large_size": settings.analysis_large_nodes},
+    }
+
+class ModelRouter:
+    """
+    Routes LLM tasks over cost tiers, escalating on validation failure.
+    """
+
+    def __init__(self, routes=None, window=200):
+        """
+        Initialize the ModelRouter.
+
+        Args:
+            routes: {task: {"tiers": [...], "large_size": int}} (default from settings)
+            window: Number of recent latencies kept per route for percentiles
+        """
+        self.routes = routes or default_routes()
+        self.window = window
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def size_class(self, task, size):
+        """Classify an input as small or large for a task."""
+        large_size = self.routes.get(task, {}).get("large_size") or 0
+        return "large" if large_size and size > large_size else "small"
+
+    def candidates(self, task, size=0, model=None):
+        """
+        List the models to try, in order, for a task and input size.
+
+        Large inputs start one tier up. An explicit model sets the lowest tier
+        tried; a model outside the ladder is tried first and escalates into it.
+        Tiers with a poor track record for this size class are skipped, but the
+        top tier is always kept.
+
+        Args:
+            task: Task name (e.g. "repair", "analysis")
+            size: Input size in the task's unit
+            model: Model requested by the caller
+
+        Returns:
+            list: Model names
+        """
+        tiers = list(self.routes.get(task, {}).get("tiers") or [])
+        if not tiers:
+            return [model] if model else []
+
+        size_class = self.size_class(task, size)
+        start = min(1, len(tiers) - 1) if size_class == "large" else 0
+        if model in tiers:
+            start = max(start, tiers.index(model))
+        models = tiers[start:]
+        if model and model not in tiers:
+            models = [model] + models
+
+        # Skip cheap tiers that keep failing on inputs like this one
+        kept = []
+        for index, name in enumerate(models):
+            route = self._stats.get((task, size_class, name))
+            is_last = index == len(models) - 1
+            if (not is_last and route and route["attempts"] >= MIN_ATTEMPTS
+                    and route["successes"] / route["attempts"] < MIN_SUCCESS_RATE):
+                continue
+            kept.append(name)
+        return kept
+
+    def strongest(self, task):
+        """Return the top tier of a task, or None if the task has no tiers."""
+        tiers = self.routes.get(task, {}).get("tiers")
+        return tiers[-1] if tiers else None
+
+    def run(self, task, call, validate, size=0, model=None):
+        """
+        Run a task on the cheapest suitable model, escalating on failure.
+
+        Args:
+            task: Task name
+            call: Function (model) returning the raw LLM output
+            validate: Function (output) returning True if the output is usable
+            size: Input size in the task's unit
+            model: Model requested by the caller
+
+        Returns:
+            tuple: (output, model) of the first valid result, or (None, None)
+
+        Raises:
+            CircuitOpenError: If no tier succeeded and at least one was skipped because its
+                              upstream is unavailable, so the caller can retry later
+        """
+        size_class = self.size_class(task, size)
+        models = self.candidates(task, size, model)
+        circuit_error = None
+        for attempt, name in enumerate(models):
+            if attempt:
+                ROUTE_ESCALATIONS.inc(task=task)
+                logger.info(f"Escalating {task} to {name}")
+
+            start_time = time.perf_counter()
+            try:
+                output = call(name)
+                valid = bool(output) and validate(output)
+            except CircuitOpenError as e:
+                # Nothing was sent, so this says nothing about the tier's quality
+                logger.info(f"Skipping {name} for {task}: {e}")
+                circuit_error = e
+                continue
+            except Exception as e:
+                logger.warning(f"{task} on {name} failed: {e}")
+                output, valid = None, False
+            self._record(task, size_class, name, valid, time.perf_counter() - start_time)
+
+            if valid:
+                span = current_span()
+                if span:
+                    span.set_attribute("routed_model", name)
+                    span.set_attribute("route_attempts", attempt + 1)
+                return output, name
+
+        if circuit_error:
+            raise circuit_error
+        logger.warning(f"{task} failed on every tier ({', '.join(models)})")
+        return None, None
+
+    def _record(self, task, size_class, model, success, seconds):
+        """Update the stats of one route."""
+        ROUTE_ATTEMPTS.inc(task=task, model=model, result="success" if success else "invalid")
+        with self._lock:
+            route = self._stats.setdefault((task, size_class, model), {
+                "attempts": 0, "successes": 0, "latencies": deque(maxlen=self.window)
+            })
+            route["attempts"] += 1
+            route["successes"] += int(success)
+            route["latencies"].append(seconds)
+
+    def get_stats(self):
+        """
+        Get attempts, success rate and latency percentiles per route.
+
+        Returns:
+            dict: {"task/size class/model": {...}}
+        """
+        stats = {}
+        with self._lock:
+            routes = {key: (route["attempts"], route["successes"], sorted(route["latencies"]))
+                      for key, route in self._stats.items()}
+        for (task, size_class, model), (attempts, successes, latencies) in sorted(routes.items()):
+            stats[f"{task}/{size_class}/{model}"] = {
+                "attempts": attempts,
+                "success_rate": round(successes / attempts, 3) if attempts else 0,
+                "p50": round(percentile(latencies, 50), 3),
+                "p95": round(percentile(latencies, 95), 3),
+            }
+        return stats
+
+_router = ModelRouter()
+
+def get_router():
+    """Return the process-wide ModelRouter."""
+    return _router
@@ -15,6 +15,7 @@ load_dotenv()
 
 # OpenRouter API Configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
 
 def call_openrouter(prompt, model="openai/gpt-3.5-turbo", temperature=0.1, max_tokens=1000):
     """
@@ -47,7 +48,7 @@ def call_openrouter(prompt, model="openai/gpt-3.5-turbo", temperature=0.1, max_t
     }
     
     try:
-        response = requests.post("https://openrouter.ai/api/v1/chat/completions", json=payload, headers=headers)
+        response = requests.post(f"{OPENROUTER_BASE_URL}/chat/completions", json=payload, headers=headers)
         response.raise_for_status()
         return response.json()["choices"][0]["message"]["content"]
     except requests.exceptions.RequestException as e:
@@ -0,0 +1,303 @@
+"""
+OpenRouter Stub Server
+
+This module serves an OpenRouter-compatible chat completions API locally, so
+the processors can be benchmarked and load-tested without network access or
+API spend. Responses are canned: an analysis, a batch of analyses, a part
+analysis or repaired workflow JSON, depending on the prompt. Per-model
+profiles set the latency distribution, streaming token delay, error and
+rate-limit rates, so hedging, fallbacks, circuit breakers and the token budget
+can be exercised on purpose.
+
+Usage:
+    python -m src.utils.openrouter_stub --port 8089 --latency lognormal:0.8,0.5 --error-rate 0.02
+    OPENROUTER_BASE_URL=http://127.0.0.1:8089/api/v1 OPENROUTER_API_KEY=stub python -m ...
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from .token_budget import estimate_cost
+
+logger = logging.getLogger("openrouter_stub")
+
+DEFAULT_PROFILE = {
+    # Time until the response (or the first streamed token) is sent, see parse_latency
+    "latency": "0.2",
+    # Seconds between streamed chunks
+    "token_delay": 0.0,
+    # Characters per streamed chunk and per token in the reported usage
+    "chunk_chars": 16,
+    "chars_per_token": 4,
+    # Share of requests answered with error_status, or with 429 and Retry-After
+    "error_rate": 0.0,
+    "error_status": 500,
+    "rate_limit_rate": 0.0,
+    "retry_after": 1,
+    # Canned outputs tried before the built-in ones: [{"match": regex, "text": ... or "file": path}]
+    "outputs": [],
+}
+
+ANALYSIS_SECTIONS = [
+    ("Node Analysis", "Each node is configured for its step of the flow: the trigger starts an execution, "
+                      "the processing nodes transform the item data and the final node delivers the result."),
+    ("Flow Analysis", "Data flows from the trigger through the transformation nodes to the output node. "
+                      "There are no parallel branches, so a failing node stops the execution."),
+    ("Business Vertical", "1. E-commerce: order notifications. 2. Marketing: lead routing. "
+                          "3. Operations: report distribution."),
+    ("Use Cases", "Automates a recurring hand-off between two systems for operations teams and can be "
+                  "adapted to other sources by replacing the trigger."),
+    ("Technical Details", "Uses REST endpoints with JSON payloads, credentials stored in n8n and no "
+                          "database writes."),
+    ("Vector Database Enrichment", "automation, workflow, n8n, webhook, trigger, api, json, integration, "
+                                   "notification, etl, transformation, scheduling, http, rest, low-code"),
+]
+
+REPAIRED_WORKFLOW = {
+    "name": "Repaired workflow",
+    "nodes": [{"name": "Start", "type": "n8n-nodes-base.manualTrigger", "parameters": {}}],
+    "connections": {},
+}
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution into a sampling function.
+
+    Args:
+        spec: Seconds as "0.5" or "fixed:0.5", "uniform:low,high", "normal:mean,stddev"
+              or "lognormal:median,sigma"
+
+    Returns:
+        function: () -> seconds (never negative)
+    """
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    values = [float(value) for value in args.split(",")]
+    samplers = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: random.uniform(values[0], values[1]),
+        "normal": lambda: random.gauss(values[0], values[1]),
+        "lognormal": lambda: values[0] * random.lognormvariate(0, values[1]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+def analysis_text(name="Workflow"):
+    """Build a canned analysis with the sections of the default template."""
+    sections = "\n\n".join(f"### {index}. {title}\n{body}"
+                           for index, (title, body) in enumerate(ANALYSIS_SECTIONS, 1))
+    return f"# Comprehensive Workflow Analysis for \"{name}\"\n\n{sections}\n"
+
+def builtin_response(prompt):
+    """Pick a canned response that passes the processors' validation for the kind of prompt."""
+    batch = re.findall(r"^=== WORKFLOW (\d+): (.+?) ===$", prompt, re.MULTILINE)
+    if batch:
+        return "\n\n".join(f"<<<ANALYSIS {index}: {workflow_id}>>>\n{analysis_text(workflow_id)}<<<END {index}>>>"
+                           for index, workflow_id in batch)
+
+    if "JSON repair expert" in prompt:
+        match = re.search(r"```json\n(.*?)\n```", prompt, re.DOTALL)
+        try:
+            workflow = json.loads(match.group(1)) if match else None
+        except json.JSONDecodeError:
+            workflow = None
+        if not isinstance(workflow, dict) or not workflow.get("nodes"):
+            workflow = REPAIRED_WORKFLOW
+        return json.dumps(workflow)
+
+    if "Part Summary" in prompt:
+        return (f"#### Nodes\n{ANALYSIS_SECTIONS[0][1]}\n\n"
+                f"#### Part Summary\n{ANALYSIS_SECTIONS[1][1]}\n")
+
+    name = re.search(r'"name"\s*:\s*"([^"]+)"', prompt)
+    return analysis_text(name.group(1) if name else "Workflow")
+
+class StubServer:
+    """
+    Chat completions endpoint with per-model behaviour profiles.
+    """
+
+    def __init__(self, profiles=None, seed=None):
+        """
+        Initialize the StubServer.
+
+        Args:
+            profiles: {"default": {...}, "models": {model: {...}}}, each overriding DEFAULT_PROFILE
+            seed: Random seed for reproducible latencies and error sequences
+        """
+        profiles = profiles or {}
+        self.default = dict(DEFAULT_PROFILE, **profiles.get("default", {}))
+        self.models = {model: dict(self.default, **profile)
+                       for model, profile in profiles.get("models", {}).items()}
+        self._latency = {}
+        self.stats = Counter()
+        if seed is not None:
+            random.seed(seed)
+
+    def profile(self, model):
+        """Get the behaviour profile of a model."""
+        return self.models.get(model, self.default)
+
+    def sample_latency(self, profile):
+        """Sample the response latency of a profile."""
+        spec = profile["latency"]
+        if spec not in self._latency:
+            self._latency[spec] = parse_latency(spec)
+        return self._latency[spec]()
+
+    def respond(self, prompt, profile):
+        """Get the completion text for a prompt."""
+        for output in profile["outputs"]:
+            if re.search(output.get("match", ""), prompt):
+                if "file" in output:
+                    with open(output["file"], "r", encoding="utf-8") as f:
+                        return f.read()
+                return output.get("text", "")
+        return builtin_response(prompt)
+
+    def create_app(self):
+        """Create the aiohttp application."""
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        for prefix in ("/api/v1", "/v1", ""):
+            app.router.add_post(f"{prefix}/chat/completions", self.chat_completions)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+    async def get_stats(self, request):
+        """Get request counts by model and outcome."""
+        stats = {}
+        for (model, outcome), count in sorted(self.stats.items()):
+            stats.setdefault(model, {})[outcome] = count
+        return web.json_response(stats)
+
+    async def chat_completions(self, request):
+        """Answer a chat completion request, streamed if asked to."""
+        payload = await request.json()
+        model = payload.get("model", "unknown")
+        profile = self.profile(model)
+        prompt = "\n".join(str(message.get("content", "")) for message in payload.get("messages", []))
+
+        roll = random.random()
+        if roll < profile["rate_limit_rate"]:
+            self.stats[model, "rate_limited"] += 1
+            return web.json_response({"error": {"message": "Rate limit exceeded", "code": 429}}, status=429,
+                                     headers={"Retry-After": str(profile["retry_after"])})
+        if roll < profile["rate_limit_rate"] + profile["error_rate"]:
+            self.stats[model, "error"] += 1
+            await asyncio.sleep(self.sample_latency(profile))
+            return web.json_response({"error": {"message": "Stub upstream error", "code": profile["error_status"]}},
+                                     status=profile["error_status"])
+
+        chars_per_token = profile["chars_per_token"]
+        text = self.respond(prompt, profile)
+        max_tokens = payload.get("max_tokens")
+        if max_tokens:
+            text = text[:max_tokens * chars_per_token]
+        prompt_tokens = -(-len(prompt) // chars_per_token)
+        completion_tokens = -(-len(text) // chars_per_token)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cost": estimate_cost(model, prompt_tokens, completion_tokens),
+        }
+        completion_id = f"gen-stub-{time.time_ns()}"
+        self.stats[model, "success"] += 1
+
+        if not payload.get("stream"):
+            await asyncio.sleep(self.sample_latency(profile))
+            return web.json_response({
+                "id": completion_id,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        # OpenRouter sends comments while the model has not started answering
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+        await asyncio.sleep(self.sample_latency(profile))
+        chunk_chars = profile["chunk_chars"]
+        for start in range(0, len(text), chunk_chars):
+            if start and profile["token_delay"]:
+                await asyncio.sleep(profile["token_delay"])
+            event = {"id": completion_id, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": text[start:start + chunk_chars]}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        final = {"id": completion_id, "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+        await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        await response.write_eof()
+        return response
+
+async def start_stub_server(host="127.0.0.1", port=8089, profiles=None, seed=None):
+    """
+    Start the stub server in the running event loop.
+
+    Args:
+        host: Host to bind
+        port: Port to bind (0 for any free port)
+        profiles: Behaviour profiles (see StubServer)
+        seed: Random seed
+
+    Returns:
+        tuple: (AppRunner to clean up, base URL for OPENROUTER_BASE_URL, StubServer)
+    """
+    server = StubServer(profiles, seed)
+    runner = web.AppRunner(server.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    base_url = f"http://{host}:{port}/api/v1"
+    logger.info(f"OpenRouter stub serving at {base_url}")
+    return runner, base_url, server
+
+async def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="OpenRouter-compatible stub server for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind")
+    parser.add_argument("--port", type=int, default=8089, help="Port to bind")
+    parser.add_argument("--config", help="JSON file with {\"default\": {...}, \"models\": {model: {...}}} profiles")
+    parser.add_argument("--latency", help="Latency distribution, e.g. 0.5, uniform:0.2,2 or lognormal:0.8,0.5")
+    parser.add_argument("--token-delay", type=float, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, help="Share of requests answered with a server error")
+    parser.add_argument("--rate-limit-rate", type=float, help="Share of requests answered with 429")
+    parser.add_argument("--seed", type=int, help="Random seed")
+    args = parser.parse_args()
+
+    profiles = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+    overrides = {"latency": args.latency, "token_delay": args.token_delay,
+                 "error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate}
+    profiles["default"] = dict(profiles.get("default", {}),
+                               **{key: value for key, value in overrides.items() if value is not None})
+
+    runner, base_url, _ = await start_stub_server(args.host, args.port, profiles, args.seed)
+    print(f"OPENROUTER_BASE_URL={base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
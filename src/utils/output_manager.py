@@ -0,0 +1,179 @@
+"""
+Output Manager
+
+This module writes the artifacts of a processed workflow in a single pass:
+every artifact is serialized in memory, written once with an atomic rename,
+and mirrored into the target directory with hardlinks instead of copies.
+"""
+
+import json
+import logging
+import os
+import shutil
+
+logger = logging.getLogger("output_manager")
+
+# File name of each artifact inside the workflow folder
+ARTIFACT_FILENAMES = {
+    "workflow": "{workflow_id}.json",
+    "metadata": "{workflow_id}_metadata.json",
+    "analysis": "{workflow_id}_analysis.txt",
+    "consolidated": "{workflow_id}_consolidated.json",
+    "readme": "README.md",
+}
+
+# Result keys reported back to callers of process_workflow
+ARTIFACT_RESULT_KEYS = {
+    "workflow": "workflow_file",
+    "metadata": "metadata_file",
+    "analysis": "analysis_file",
+    "consolidated": "consolidated_file",
+    "readme": "readme_file",
+}
+
+DEFAULT_ARTIFACTS = ("workflow", "metadata", "analysis", "readme")
+DEFAULT_MIRROR_ARTIFACTS = ("workflow", "readme")
+
+def parse_artifacts(value):
+    """
+    Parse a comma-separated artifact list, validating the names.
+
+    Args:
+        value: Comma-separated string or iterable of artifact names
+
+    Returns:
+        tuple: Artifact names
+    """
+    if isinstance(value, str):
+        value = [name.strip() for name in value.split(",")]
+    names = tuple(name for name in value if name)
+
+    unknown = [name for name in names if name not in ARTIFACT_FILENAMES]
+    if unknown:
+        raise ValueError(f"Unknown output artifacts: {', '.join(unknown)} "
+                         f"(choose from {', '.join(ARTIFACT_FILENAMES)})")
+    return names
+
+class OutputManager:
+    """
+    Writes per-workflow artifacts exactly once into <output_dir>/<workflow_id>/
+    and optionally mirrors a subset into <mirror_dir>/<workflow_id>/.
+    """
+
+    def __init__(self,
+                output_dir=".",
+                mirror_dir=None,
+                artifacts=DEFAULT_ARTIFACTS,
+                mirror_artifacts=DEFAULT_MIRROR_ARTIFACTS):
+        """
+        Initialize the OutputManager.
+
+        Args:
+            output_dir: Directory in which workflow folders are created
+            mirror_dir: Directory that receives linked copies (None to disable)
+            artifacts: Names of the artifacts to emit
+            mirror_artifacts: Names of the emitted artifacts to mirror
+        """
+        self.output_dir = output_dir
+        self.mirror_dir = mirror_dir or None
+        self.artifacts = parse_artifacts(artifacts)
+        self.mirror_artifacts = parse_artifacts(mirror_artifacts)
+
+    def write(self, workflow_id, contents):
+        """
+        Write the configured artifacts for a workflow.
+
+        Args:
+            workflow_id: Workflow ID, used as folder name
+            contents: Mapping of artifact name to str, dict or list content
+
+        Returns:
+            dict: Output folder and the path of every written artifact
+        """
+        folder = os.path.join(self.output_dir, workflow_id)
+        os.makedirs(folder, exist_ok=True)
+
+        result = {"output_folder": folder}
+        written = {}
+
+        for name in self.artifacts:
+            if contents.get(name) is None:
+                continue
+
+            path = os.path.join(folder, ARTIFACT_FILENAMES[name].format(workflow_id=workflow_id))
+            self._atomic_write(path, self._serialize(contents[name]))
+            # The complete artifact supersedes any partial copy written while it was generated
+            if os.path.exists(f"{path}.partial"):
+                os.remove(f"{path}.partial")
+            written[name] = path
+            result[ARTIFACT_RESULT_KEYS[name]] = path
+
+        if self.mirror_dir:
+            mirror_folder = os.path.join(self.mirror_dir, workflow_id)
+            os.makedirs(mirror_folder, exist_ok=True)
+
+            for name in self.mirror_artifacts:
+                if name in written:
+                    target = os.path.join(mirror_folder, os.path.basename(written[name]))
+                    self._link_or_copy(written[name], target)
+            result["mirror_folder"] = mirror_folder
+
+        logger.info(f"Wrote {len(written)} artifacts for {workflow_id} to {folder}")
+        return result
+
+    def partial_path(self, workflow_id, name):
+        """
+        Get the path an artifact is streamed to while it is being generated.
+
+        Args:
+            workflow_id: Workflow ID, used as folder name
+            name: Artifact name
+
+        Returns:
+            str: Path next to the final artifact with a .partial suffix, or None if
+                 the artifact is not emitted
+        """
+        if name not in self.artifacts:
+            return None
+        folder = os.path.join(self.output_dir, workflow_id)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, ARTIFACT_FILENAMES[name].format(workflow_id=workflow_id) + ".partial")
+
+    @staticmethod
+    def _serialize(content):
+        """Serialize artifact content to text."""
+        if isinstance(content, str):
+            return content
+        return json.dumps(content, indent=2)
+
+    @staticmethod
+    def _atomic_write(path, text):
+        """Write text to a temporary file and rename it over the target."""
+        temp_file = f"{path}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_file, path)
+        except BaseException:
+            # Leave the previous artifact, if any, and no half-written temp file
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+
+    @staticmethod
+    def _link_or_copy(source, target):
+        """
+        Atomically place source at target, hardlinking when possible.
+
+        A fresh hardlink is created on every write because the atomic rename
+        of the source replaces its inode, leaving old links on the old data.
+        """
+        temp_file = f"{target}.tmp"
+        if os.path.lexists(temp_file):
+            os.remove(temp_file)
+        try:
+            os.link(source, temp_file)
+        except OSError:
+            # Different filesystem or links unsupported
+            shutil.copy2(source, temp_file)
+        os.replace(temp_file, target)
@@ -0,0 +1,287 @@
+"""
+Prompt Builder
+
+This module builds workflow analysis prompts from a compact projection of the
+workflow: layout data (positions, sizes), generated IDs, pinned test data,
+webhook IDs and credential IDs are dropped, connections become one edge per
+line and the JSON is minified. Prompts are measured with the tokenizer of the
+target model and reduced step by step until they fit the model's token budget.
+"""
+
+import json
+import logging
+import re
+from functools import lru_cache
+
+from .config import get_settings
+
+logger = logging.getLogger("prompt_builder")
+
+# Rough characters per token, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Prompt token budgets per model (context window minus completion and safety margin,
+# capped to keep analysis cost predictable)
+DEFAULT_PROMPT_BUDGET = 8000
+MODEL_PROMPT_BUDGETS = {
+    "mistralai/ministral-8b": 12000,
+    "mistralai/mistral-7b-instruct": 6000,
+    "openai/gpt-3.5-turbo": 12000,
+    "openai/gpt-4-turbo": 24000,
+    "openai/gpt-4o": 24000,
+    "openai/gpt-4o-mini": 24000,
+    "anthropic/claude-3-haiku": 24000,
+    "anthropic/claude-3.5-sonnet": 24000,
+}
+
+# Workflow fields that never matter for the analysis
+DROP_WORKFLOW_KEYS = {"id", "pinData", "meta", "versionId", "active", "staticData", "triggerCount", "shared"}
+DROP_NODE_KEYS = {"id", "position", "webhookId", "typeVersion", "notesInFlow"}
+DROP_PARAMETER_KEYS = {"width", "height", "color"}
+
+# Node types without behaviour; their text is documentation only
+STICKY_NOTE_TYPE = "n8n-nodes-base.stickyNote"
+
+# String parameter lengths tried in turn while the prompt exceeds its budget
+TRUNCATION_STEPS = (2000, 800, 300, 120)
+
+SECTION = re.compile(r"\{\{#(\w+)\}\}\n?(.*?)\{\{/\1\}\}\n?", re.DOTALL)
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+@lru_cache(maxsize=None)
+def _get_encoding(model):
+    """Return the tiktoken encoding of a model, or None if tiktoken cannot provide one."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model.split("/")[-1])
+        except KeyError:
+            # Non-OpenAI models: cl100k_base is a close enough approximation for budgeting
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Tokenizer unavailable for {model}, estimating tokens from length: {e}")
+        return None
+
+def count_tokens(text, model=None):
+    """
+    Count the tokens of a text with the tokenizer of a model.
+
+    Args:
+        text: Text to measure
+        model: OpenRouter model name (default from settings)
+
+    Returns:
+        int: Token count (estimated as characters / 4 without a tokenizer)
+    """
+    encoding = _get_encoding(model or get_settings().default_model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def get_prompt_budget(model):
+    """
+    Return the prompt token budget of a model.
+
+    The prompt_token_budget setting (PROMPT_TOKEN_BUDGET) overrides the per-model table.
+    """
+    override = getattr(get_settings(), "prompt_token_budget", 0)
+    if override:
+        return override
+    return MODEL_PROMPT_BUDGETS.get(model, DEFAULT_PROMPT_BUDGET)
+
+def _prune(value, max_string_chars=None):
+    """Drop empty values recursively, collapse resource locators and shorten long strings."""
+    if isinstance(value, dict):
+        # Resource locators ({"__rl": true, "mode": "list", "value": ...}) reduce to their value
+        if value.get("__rl") and "value" in value:
+            return _prune(value.get("cachedResultName") or value["value"], max_string_chars)
+        pruned = {}
+        for key, item in value.items():
+            item = _prune(item, max_string_chars)
+            if item not in (None, "", {}, []):
+                pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        return [item for item in (_prune(item, max_string_chars) for item in value)
+                if item not in (None, "", {}, [])]
+    if isinstance(value, str) and max_string_chars and len(value) > max_string_chars:
+        return value[:max_string_chars] + f"…[+{len(value) - max_string_chars} chars]"
+    return value
+
+def compact_edges(connections):
+    """
+    Flatten n8n connections into one "Source -> Target" string per edge.
+
+    Non-main connection types and non-zero output indexes are kept in the
+    arrow, e.g. "Chat Model -ai_languageModel-> AI Agent" or "IF[1] -> Notify".
+
+    Args:
+        connections: n8n connections object
+
+    Returns:
+        list: Edge strings
+    """
+    edges = []
+    if not isinstance(connections, dict):
+        return edges
+    for source, outputs in connections.items():
+        if not isinstance(outputs, dict):
+            continue
+        for connection_type, branches in outputs.items():
+            for output_index, targets in enumerate(branches or []):
+                for target in targets or []:
+                    if not isinstance(target, dict) or "node" not in target:
+                        continue
+                    edges.append(format_edge(source, target["node"], connection_type, output_index))
+    return edges
+
+def format_edge(source, target, connection_type="main", output_index=0):
+    """Format one connection as "Source -> Target" (see compact_edges)."""
+    label = source if output_index == 0 else f"{source}[{output_index}]"
+    arrow = "->" if connection_type == "main" else f"-{connection_type}->"
+    return f"{label} {arrow} {target}"
+
+def compact_workflow(workflow_json, max_string_chars=None, include_notes=True):
+    """
+    Project a workflow onto the fields that matter for analysis.
+
+    Args:
+        workflow_json: n8n workflow JSON
+        max_string_chars: Shorten string parameters (e.g. Code node bodies) to this length
+        include_notes: Keep sticky note text
+
+    Returns:
+        dict: Compact workflow with name, nodes, edges and notes
+    """
+    compact = {key: value for key, value in workflow_json.items()
+               if key not in DROP_WORKFLOW_KEYS and key not in ("nodes", "connections")}
+
+    nodes, notes = [], []
+    for node in workflow_json.get("nodes") or []:
+        if not isinstance(node, dict):
+            continue
+        if node.get("type") == STICKY_NOTE_TYPE:
+            content = (node.get("parameters") or {}).get("content")
+            if include_notes and content:
+                notes.append(content)
+            continue
+
+        item = {key: value for key, value in node.items() if key not in DROP_NODE_KEYS}
+        if isinstance(item.get("parameters"), dict):
+            item["parameters"] = {key: value for key, value in item["parameters"].items()
+                                  if key not in DROP_PARAMETER_KEYS}
+        # Only the credential type matters, not which stored credential is used
+        if isinstance(item.get("credentials"), dict):
+            item["credentials"] = sorted(item["credentials"])
+        nodes.append(item)
+
+    compact["nodes"] = nodes
+    compact["edges"] = compact_edges(workflow_json.get("connections"))
+    if notes:
+        compact["notes"] = notes
+    return _prune(compact, max_string_chars)
+
+def minify(value):
+    """Serialize JSON without whitespace."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def render_sections(template, items, compact=True):
+    """
+    Render {{#name}}...{{/name}} sections of a template.
+
+    Sections are expanded once per item. In compact mode only the first line
+    of a section (e.g. "- **{{name}}** ({{type}}):") is repeated per item and
+    the remaining lines are emitted once as a checklist for every item.
+
+    Args:
+        template: Template text
+        items: {section name: list of dicts}
+        compact: Emit the per-item checklist once instead of per item
+
+    Returns:
+        str: Template with sections rendered
+    """
+    def fill(text, values):
+        for key, value in values.items():
+            text = text.replace(f"{{{{{key}}}}}", str(value))
+        return text
+
+    def expand(match):
+        rows = items.get(match.group(1)) or []
+        body = match.group(2)
+        if not compact:
+            return "".join(fill(body, row) for row in rows)
+
+        head, _, checklist = body.partition("\n")
+        lines = [fill(head, row).rstrip(":") for row in rows]
+        if checklist.strip():
+            lines.append("For each node above cover:")
+            lines.append(PLACEHOLDER.sub(r"its \1", checklist.rstrip()))
+        return "\n".join(lines) + "\n"
+
+    return SECTION.sub(expand, template)
+
+class PromptBuilder:
+    """
+    Builds token-budgeted workflow analysis prompts for one model.
+    """
+
+    def __init__(self, template, model=None, budget=None):
+        """
+        Initialize the PromptBuilder.
+
+        Args:
+            template: Analysis template with {{workflow_name}}, {{workflow_json}} and optional {{#nodes}} sections
+            model: OpenRouter model the prompt is sent to (default from settings)
+            budget: Prompt token budget (default: get_prompt_budget(model))
+        """
+        self.template = template
+        self.model = model or get_settings().default_model
+        self.budget = budget or get_prompt_budget(self.model)
+
+    def render(self, workflow_json, max_string_chars=None, include_notes=True, extra=None):
+        """Render the prompt for a workflow with the given reductions."""
+        compact = compact_workflow(workflow_json, max_string_chars, include_notes)
+        nodes = [{"name": node.get("name", "Unnamed Node"), "type": node.get("type", "Unknown Type")}
+                 for node in compact["nodes"]]
+        prompt = render_sections(self.template, {"nodes": nodes})
+        for key, value in (extra or {}).items():
+            prompt = prompt.replace(f"{{{{{key}}}}}", value)
+        return (prompt
+                .replace("{{workflow_name}}", str(workflow_json.get("name", "Unknown Workflow")))
+                .replace("{{workflow_json}}", minify(compact)))
+
+    def build(self, workflow_json, **extra):
+        """
+        Build the prompt, shortening long parameters and dropping notes until it fits the budget.
+
+        Args:
+            workflow_json: n8n workflow JSON
+            **extra: Text for further {{placeholders}} of the template
+
+        Returns:
+            dict: prompt, tokens, budget, fits (within budget) and reductions applied
+        """
+        steps = [(None, True, [])]
+        steps += [(limit, True, [f"strings<={limit}"]) for limit in TRUNCATION_STEPS]
+        steps.append((TRUNCATION_STEPS[-1], False, [f"strings<={TRUNCATION_STEPS[-1]}", "no_notes"]))
+
+        for max_string_chars, include_notes, reductions in steps:
+            prompt = self.render(workflow_json, max_string_chars, include_notes, extra)
+            tokens = count_tokens(prompt, self.model)
+            if tokens <= self.budget:
+                break
+
+        if tokens > self.budget:
+            logger.warning(f"Prompt for {workflow_json.get('name', 'workflow')} has {tokens} tokens, "
+                           f"over the {self.budget} token budget of {self.model}")
+        return {
+            "prompt": prompt,
+            "tokens": tokens,
+            "budget": self.budget,
+            "fits": tokens <= self.budget,
+            "reductions": reductions,
+        }
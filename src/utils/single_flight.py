@@ -0,0 +1,169 @@
+"""
+Single Flight
+
+This module coalesces concurrent duplicate operations: while an operation for
+a key is in flight, further callers with the same key wait for it and share its
+result (or exception) instead of starting their own. Nothing is cached once the
+operation finishes; the next call starts a new one.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger("single_flight")
+
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+    "single_flight_calls_total",
+    "Coalesced operations by group and role (leader runs the operation, shared waits for it)",
+    ["group", "role"]
+)
+
+def hash_key(*parts):
+    """
+    Build a compact key from JSON-serializable parts (e.g. model and prompt).
+
+    Returns:
+        str: SHA-256 hex digest of the parts
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls of coroutine functions by key within one event loop.
+    """
+
+    def __init__(self, name):
+        """
+        Initialize the SingleFlight.
+
+        Args:
+            name: Group name used in metrics and logs
+        """
+        self.name = name
+        self.calls = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) unless a call with the same key is in flight.
+
+        The shared operation keeps running if a waiting caller is cancelled.
+
+        Args:
+            key: Hashable key identifying duplicate operations
+            func: Coroutine function
+
+        Returns:
+            Result of the (possibly shared) call
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self.calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.executions += 1
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, role="leader")
+        else:
+            self.shared += 1
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, role="shared")
+            logger.info(f"Joining in-flight {self.name} operation for {key}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        """Drop a finished operation so the next call starts a new one."""
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        # Mark the exception retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self):
+        """
+        Get statistics about coalesced calls.
+
+        Returns:
+            dict: In-flight keys, executed and shared calls
+        """
+        return {"in_flight": len(self.calls), "executions": self.executions, "shared": self.shared}
+
+class _Call:
+    """An in-flight call of ThreadSingleFlight."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class ThreadSingleFlight:
+    """
+    Coalesces concurrent calls of blocking functions by key across threads.
+    """
+
+    def __init__(self, name):
+        """
+        Initialize the ThreadSingleFlight.
+
+        Args:
+            name: Group name used in metrics and logs
+        """
+        self.name = name
+        self.calls = {}
+        self.executions = 0
+        self.shared = 0
+        self.lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) unless a call with the same key is in flight.
+
+        Args:
+            key: Hashable key identifying duplicate operations
+            func: Blocking function
+
+        Returns:
+            Result of the (possibly shared) call
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, role="shared")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        SINGLE_FLIGHT_CALLS.inc(group=self.name, role="leader")
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+    def get_stats(self):
+        """
+        Get statistics about coalesced calls.
+
+        Returns:
+            dict: In-flight keys, executed and shared calls
+        """
+        with self.lock:
+            return {"in_flight": len(self.calls), "executions": self.executions, "shared": self.shared}
@@ -0,0 +1,264 @@
+"""
+Streaming Sitemap Parser
+
+This module provides an incremental sitemap parser that follows sitemap
+indexes, handles gzip-compressed sitemaps and yields URLs in batches
+without holding whole documents in memory.
+"""
+
+import asyncio
+import logging
+import zlib
+import xml.etree.ElementTree as ET
+from collections import deque
+from urllib.parse import urlparse
+
+logger = logging.getLogger("sitemap")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+def is_workflow_url(url):
+    """Return True if the URL points at an n8n workflow page."""
+    return '/workflows/' in urlparse(url).path
+
+class SitemapParser:
+    """
+    Incremental parser for a single sitemap or sitemap index document.
+
+    Bytes are fed in as they arrive from the network; completed <loc>
+    entries are returned from each feed() call and their elements are
+    released immediately so memory stays flat regardless of document size.
+    """
+
+    def __init__(self):
+        """Initialize the SitemapParser."""
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._decompressor = None
+        self._pending = b""
+        self._sniffed = False
+        self._root = None
+        self.is_index = False
+
+    def feed(self, chunk):
+        """
+        Feed a chunk of raw (possibly gzip-compressed) sitemap bytes.
+
+        Args:
+            chunk: Bytes received from the sitemap response
+
+        Returns:
+            list: (kind, loc) tuples where kind is "sitemap" or "url"
+        """
+        if not self._sniffed:
+            # Wait for enough bytes to detect the gzip magic number
+            self._pending += chunk
+            if len(self._pending) < len(GZIP_MAGIC):
+                return []
+            chunk, self._pending = self._pending, b""
+            if chunk.startswith(GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._sniffed = True
+
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self):
+        """
+        Finish parsing and return any remaining entries.
+
+        Returns:
+            list: (kind, loc) tuples that were still buffered
+        """
+        if not self._sniffed and self._pending:
+            self._parser.feed(self._pending)
+            self._pending = b""
+        if self._decompressor is not None:
+            self._parser.feed(self._decompressor.flush())
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self):
+        """Collect <loc> entries from parser events and free parsed elements."""
+        entries = []
+        for event, elem in self._parser.read_events():
+            tag = elem.tag.rsplit("}", 1)[-1]
+
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                    self.is_index = tag == "sitemapindex"
+                continue
+
+            if tag == "loc" and elem.text and elem.text.strip():
+                kind = "sitemap" if self.is_index else "url"
+                entries.append((kind, elem.text.strip()))
+            elif tag in ("url", "sitemap") and self._root is not None:
+                # Drop finished entries so the tree never grows
+                self._root.clear()
+
+        return entries
+
+async def iter_sitemap_urls(sitemap_url,
+                            session=None,
+                            batch_size=500,
+                            url_filter=None,
+                            max_depth=3,
+                            chunk_size=64 * 1024):
+    """
+    Stream page URLs from a sitemap, following nested sitemap indexes.
+
+    Args:
+        sitemap_url: URL of the sitemap or sitemap index
+        session: Optional aiohttp.ClientSession to reuse
+        batch_size: Number of URLs per yielded batch
+        url_filter: Optional callable returning True for URLs to keep
+        max_depth: Maximum sitemap index nesting to follow
+        chunk_size: Number of bytes read from the response at a time
+
+    Yields:
+        list: Batches of page URLs
+    """
+    import aiohttp
+
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession()
+
+    pending = deque([(sitemap_url, 0)])
+    seen = set()
+    batch = []
+
+    try:
+        while pending:
+            current_url, depth = pending.popleft()
+            if current_url in seen:
+                continue
+            seen.add(current_url)
+
+            try:
+                async with session.get(current_url) as response:
+                    if response.status != 200:
+                        raise Exception(f"Failed to fetch sitemap: {response.status}")
+
+                    parser = SitemapParser()
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        for kind, loc in parser.feed(chunk):
+                            if kind == "sitemap":
+                                if depth < max_depth:
+                                    pending.append((loc, depth + 1))
+                            elif url_filter is None or url_filter(loc):
+                                batch.append(loc)
+
+                        while len(batch) >= batch_size:
+                            yield batch[:batch_size]
+                            batch = batch[batch_size:]
+
+                    for kind, loc in parser.close():
+                        if kind == "sitemap":
+                            if depth < max_depth:
+                                pending.append((loc, depth + 1))
+                        elif url_filter is None or url_filter(loc):
+                            batch.append(loc)
+            except Exception as e:
+                if current_url == sitemap_url:
+                    raise
+                # A broken nested sitemap should not abort the whole index
+                logger.error(f"Error parsing nested sitemap {current_url}: {e}")
+                continue
+
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
+
+        if batch:
+            yield batch
+    finally:
+        if owns_session:
+            await session.close()
+
+def _parse_chunks(parser, chunks):
+    """Feed chunks through a parser, yielding entries as they complete."""
+    for chunk in chunks:
+        yield parser.feed(chunk)
+    yield parser.close()
+
+def iter_sitemap_urls_sync(sitemap_url,
+                           batch_size=500,
+                           url_filter=None,
+                           max_depth=3,
+                           chunk_size=64 * 1024,
+                           timeout=30):
+    """
+    Blocking counterpart of iter_sitemap_urls for scripts using requests.
+
+    Args:
+        sitemap_url: URL of the sitemap or sitemap index
+        batch_size: Number of URLs per yielded batch
+        url_filter: Optional callable returning True for URLs to keep
+        max_depth: Maximum sitemap index nesting to follow
+        chunk_size: Number of bytes read from the response at a time
+        timeout: Request timeout in seconds
+
+    Yields:
+        list: Batches of page URLs
+    """
+    import requests
+
+    pending = deque([(sitemap_url, 0)])
+    seen = set()
+    batch = []
+
+    while pending:
+        current_url, depth = pending.popleft()
+        if current_url in seen:
+            continue
+        seen.add(current_url)
+
+        try:
+            with requests.get(current_url, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+
+                chunks = response.iter_content(chunk_size=chunk_size)
+                for entries in _parse_chunks(SitemapParser(), chunks):
+                    for kind, loc in entries:
+                        if kind == "sitemap":
+                            if depth < max_depth:
+                                pending.append((loc, depth + 1))
+                        elif url_filter is None or url_filter(loc):
+                            batch.append(loc)
+
+                    while len(batch) >= batch_size:
+                        yield batch[:batch_size]
+                        batch = batch[batch_size:]
+        except Exception as e:
+            if current_url == sitemap_url:
+                raise
+            logger.error(f"Error parsing nested sitemap {current_url}: {e}")
+
+    if batch:
+        yield batch
+
+async def enqueue_sitemap_urls(queue, sitemap_url, batch_size=500, **kwargs):
+    """
+    Stream URLs from a sitemap straight into a SmartQueue.
+
+    Args:
+        queue: SmartQueue instance
+        sitemap_url: URL of the sitemap or sitemap index
+        batch_size: Number of URLs added to the queue at a time
+        **kwargs: Extra arguments passed to iter_sitemap_urls
+
+    Returns:
+        int: Number of new URLs added to the queue
+    """
+    added = 0
+    async for batch in iter_sitemap_urls(sitemap_url, batch_size=batch_size, **kwargs):
+        added += await queue.add_jobs(batch)
+        # Let workers pick up the new batch before parsing the next one
+        await asyncio.sleep(0)
+
+    logger.info(f"Added {added} URLs from sitemap {sitemap_url}")
+    return added
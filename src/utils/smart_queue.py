@@ -107,10 +107,14 @@ class SmartQueue:
         """
         async with self.lock:
             # Filter out URLs that are already in the queue or completed
-            new_urls = [url for url in urls 
-                       if url not in self.queue 
-                       and url not in self.completed
-                       and url not in self.in_progress]
+            # (a set keeps large sitemap batches from going quadratic)
+            queued = set(self.queue)
+            new_urls = []
+            for url in urls:
+                if url in queued or url in self.completed or url in self.in_progress:
+                    continue
+                queued.add(url)
+                new_urls.append(url)
             
             # Add new URLs to the queue
             self.queue.extend(new_urls)
@@ -212,6 +216,20 @@ class SmartQueue:
             # Save changes
             self._save_queue()
     
+    async def requeue(self, url):
+        """
+        Return an in-progress URL to the queue without counting a failed attempt.
+        
+        Used when the URL could not be processed for reasons unrelated to it,
+        e.g. an upstream circuit breaker is open.
+        
+        Args:
+            url: URL to requeue
+        """
+        async with self.lock:
+            self.in_progress.discard(url)
+            logger.info(f"Requeued URL: {url}")
+    
     async def get_stats(self):
         """
         Get statistics about the queue.
@@ -0,0 +1,318 @@
+"""
+LLM Token Budget
+
+This module rate-limits LLM calls by tokens and cost instead of request count.
+Every request reserves its estimated prompt tokens plus max_tokens before it
+is sent, waiting while the tokens-per-minute limit is used up, and is reconciled
+with the usage OpenRouter reports once it completes. Tokens and cost spent per
+UTC day are capped and kept in a small state file, so the cap survives restarts.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from .circuit_breaker import CircuitOpenError
+from .config import get_settings
+from .metrics import REGISTRY
+
+logger = logging.getLogger("token_budget")
+
+LLM_BUDGET_WAIT = REGISTRY.histogram(
+    "llm_budget_wait_seconds", "Time LLM requests waited for tokens-per-minute capacity"
+)
+LLM_COST = REGISTRY.counter("llm_cost_usd_total", "Reported or estimated LLM cost in USD", ["model"])
+LLM_BUDGET_REMAINING = REGISTRY.gauge(
+    "llm_budget_remaining", "Daily LLM budget left, by kind (tokens or cost in USD)", ["kind"]
+)
+
+# USD per million (prompt, completion) tokens, used to estimate the cost of a reservation
+# and of responses without a reported cost
+MODEL_PRICES = {
+    "mistralai/ministral-8b": (0.10, 0.10),
+    "mistralai/mistral-7b-instruct": (0.03, 0.055),
+    "openai/gpt-3.5-turbo": (0.50, 1.50),
+    "openai/gpt-4o-mini": (0.15, 0.60),
+    "openai/gpt-4-turbo": (10.0, 30.0),
+    "anthropic/claude-3-sonnet": (3.0, 15.0),
+    "anthropic/claude-3-opus": (15.0, 75.0),
+}
+# Unknown models are priced like the most expensive tier, so the budget errs on the safe side
+DEFAULT_PRICE = (10.0, 30.0)
+
+WINDOW_SECONDS = 60
+
+class BudgetExceededError(CircuitOpenError):
+    """
+    Raised instead of calling OpenRouter once the daily LLM budget is spent.
+
+    Processors handle it like an open circuit breaker: the work is requeued and
+    held until the budget resets.
+    """
+
+    def __init__(self, reason, retry_after):
+        Exception.__init__(self, f"Daily LLM {reason} budget spent, resets in {retry_after:.0f}s")
+        self.upstream = "llm_budget"
+        self.retry_after = retry_after
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimate the USD cost of a request from the model's token prices."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, DEFAULT_PRICE)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+def seconds_until_reset():
+    """Seconds until the next UTC midnight, when the daily budget resets."""
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+class Reservation:
+    """Tokens and cost held for one request until it is settled or released."""
+
+    def __init__(self, limiter, model, tokens, cost):
+        self.limiter = limiter
+        self.model = model
+        self.tokens = tokens
+        self.cost = cost
+        self.entry = None
+        self.done = False
+
+    def settle(self, usage=None):
+        """
+        Replace the estimate with the usage reported by the response.
+
+        Args:
+            usage: OpenRouter usage dict (prompt_tokens, completion_tokens, optional cost);
+                   without it the estimate is kept as spent
+        """
+        self.limiter._settle(self, usage)
+
+    def release(self):
+        """Return the reserved tokens after a failed request."""
+        self.limiter._settle(self, None, failed=True)
+
+class TokenLimiter:
+    """
+    Tokens-per-minute limit plus daily token and cost caps for LLM requests.
+    """
+
+    def __init__(self, tokens_per_minute=0, daily_tokens=0, daily_cost=0.0, state_file=None):
+        """
+        Initialize the TokenLimiter.
+
+        Args:
+            tokens_per_minute: Tokens that may be reserved per rolling minute (0 for no limit)
+            daily_tokens: Tokens that may be spent per UTC day (0 for no cap)
+            daily_cost: USD that may be spent per UTC day (0 for no cap)
+            state_file: JSON file keeping today's spend across restarts (None to keep it in memory)
+        """
+        self.tokens_per_minute = tokens_per_minute
+        self.daily_tokens = daily_tokens
+        self.daily_cost = daily_cost
+        self.state_file = state_file
+
+        self._cond = threading.Condition()
+        # [reserved_at, tokens] of the requests of the last minute, in flight or settled
+        self._window = deque()
+        self.day = self._today()
+        self.spent_tokens = 0
+        self.spent_cost = 0.0
+        self.reserved_tokens = 0
+        self.reserved_cost = 0.0
+        self._load_state()
+
+    @property
+    def enabled(self):
+        """Whether any limit or cap is configured."""
+        return bool(self.tokens_per_minute or self.daily_tokens or self.daily_cost)
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def _load_state(self):
+        """Load today's spend from the state file."""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("day") == self.day:
+                self.spent_tokens = state.get("tokens", 0)
+                self.spent_cost = state.get("cost", 0.0)
+        except Exception as e:
+            logger.warning(f"Could not load LLM budget state from {self.state_file}: {e}")
+
+    def _save_state(self):
+        """Write today's spend to the state file (lock held)."""
+        if not self.state_file:
+            return
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({"day": self.day, "tokens": self.spent_tokens, "cost": self.spent_cost}, f)
+            os.replace(temp_file, self.state_file)
+        except Exception as e:
+            logger.warning(f"Could not save LLM budget state to {self.state_file}: {e}")
+
+    def _roll_day(self):
+        """Start a new day's budget after UTC midnight (lock held)."""
+        today = self._today()
+        if today != self.day:
+            logger.info(f"LLM budget reset for {today}")
+            self.day = today
+            self.spent_tokens = 0
+            self.spent_cost = 0.0
+
+    def _window_tokens(self, now):
+        """Tokens reserved within the last minute (lock held)."""
+        while self._window and self._window[0][0] <= now - WINDOW_SECONDS:
+            self._window.popleft()
+        return sum(tokens for _, tokens in self._window)
+
+    def _wait_time(self, tokens, cost):
+        """
+        Seconds to wait before a reservation fits, or None if it fits now (lock held).
+
+        Raises:
+            BudgetExceededError: If the daily cap is reached and no request in flight can give tokens back
+        """
+        over = None
+        if self.daily_tokens and self.spent_tokens + self.reserved_tokens + tokens > self.daily_tokens:
+            over = "token"
+        elif self.daily_cost and self.spent_cost + self.reserved_cost + cost > self.daily_cost:
+            over = "cost"
+        if over:
+            if not self.reserved_tokens:
+                raise BudgetExceededError(over, seconds_until_reset())
+            # Requests in flight usually settle below their reservation
+            return 1.0
+
+        now = time.monotonic()
+        # An oversized request still goes through once the window is empty
+        if self.tokens_per_minute and self._window and self._window_tokens(now) + tokens > self.tokens_per_minute:
+            return max(0.01, self._window[0][0] + WINDOW_SECONDS - now)
+        return None
+
+    def reserve(self, model, prompt_tokens, max_tokens):
+        """
+        Reserve the tokens of a request, waiting for tokens-per-minute capacity.
+
+        Args:
+            model: Model the request goes to
+            prompt_tokens: Estimated prompt tokens
+            max_tokens: Maximum completion tokens
+
+        Returns:
+            Reservation: Settle it with the response usage, or release it if the request failed
+
+        Raises:
+            BudgetExceededError: If the daily token or cost cap is reached
+        """
+        tokens = prompt_tokens + max_tokens
+        reservation = Reservation(self, model, tokens, estimate_cost(model, prompt_tokens, max_tokens))
+        start_time = time.perf_counter()
+        with self._cond:
+            while True:
+                self._roll_day()
+                wait = self._wait_time(tokens, reservation.cost)
+                if wait is None:
+                    break
+                self._cond.wait(wait)
+
+            reservation.entry = [time.monotonic(), tokens]
+            self._window.append(reservation.entry)
+            self.reserved_tokens += tokens
+            self.reserved_cost += reservation.cost
+        waited = time.perf_counter() - start_time
+        if waited > 0.01:
+            logger.info(f"Waited {waited:.1f}s for {tokens} tokens of LLM capacity ({model})")
+        LLM_BUDGET_WAIT.observe(waited)
+        return reservation
+
+    def _settle(self, reservation, usage, failed=False):
+        """Turn a reservation into spend (see Reservation.settle and Reservation.release)."""
+        usage = usage or {}
+        if failed:
+            tokens, cost = 0, 0.0
+        elif usage.get("prompt_tokens") is not None or usage.get("completion_tokens") is not None:
+            prompt_tokens = usage.get("prompt_tokens") or 0
+            completion_tokens = usage.get("completion_tokens") or 0
+            tokens = prompt_tokens + completion_tokens
+            cost = usage.get("cost")
+            if cost is None:
+                cost = estimate_cost(reservation.model, prompt_tokens, completion_tokens)
+        else:
+            tokens, cost = reservation.tokens, reservation.cost
+
+        with self._cond:
+            if reservation.done:
+                return
+            reservation.done = True
+            reservation.entry[1] = tokens
+            self.reserved_tokens -= reservation.tokens
+            self.reserved_cost -= reservation.cost
+            if tokens or cost:
+                self._roll_day()
+                self.spent_tokens += tokens
+                self.spent_cost += cost
+                self._save_state()
+            self._update_gauges()
+            self._cond.notify_all()
+        if cost:
+            LLM_COST.inc(cost, model=reservation.model)
+
+    def _update_gauges(self):
+        """Refresh the remaining budget gauges (lock held)."""
+        if self.daily_tokens:
+            LLM_BUDGET_REMAINING.set(max(0, self.daily_tokens - self.spent_tokens), kind="tokens")
+        if self.daily_cost:
+            LLM_BUDGET_REMAINING.set(max(0.0, self.daily_cost - self.spent_cost), kind="cost")
+
+    def get_stats(self):
+        """
+        Get the limits, today's spend and the remaining budget.
+
+        Returns:
+            dict: Budget statistics; remaining values are None without a cap
+        """
+        with self._cond:
+            self._roll_day()
+            window_tokens = self._window_tokens(time.monotonic())
+            return {
+                "tokens_per_minute": self.tokens_per_minute or None,
+                "tokens_last_minute": window_tokens,
+                "in_flight_tokens": self.reserved_tokens,
+                "day": self.day,
+                "tokens_today": self.spent_tokens,
+                "cost_today": round(self.spent_cost, 4),
+                "tokens_remaining": (max(0, self.daily_tokens - self.spent_tokens - self.reserved_tokens)
+                                     if self.daily_tokens else None),
+                "cost_remaining": (round(max(0.0, self.daily_cost - self.spent_cost - self.reserved_cost), 4)
+                                   if self.daily_cost else None),
+                "resets_in": round(seconds_until_reset()),
+            }
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_token_limiter():
+    """Return the process-wide TokenLimiter, creating it from settings."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            settings = get_settings()
+            _limiter = TokenLimiter(
+                tokens_per_minute=settings.llm_tokens_per_minute,
+                daily_tokens=settings.llm_daily_token_budget,
+                daily_cost=settings.llm_daily_cost_budget,
+                state_file=settings.llm_budget_file or None,
+            )
+        return _limiter
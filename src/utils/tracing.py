@@ -0,0 +1,241 @@
+"""
+Tracing
+
+This module records structured spans (name, duration, parent, attributes such
+as payload sizes) for the workflow pipeline. Finished spans feed per-stage
+latency percentiles and can be exported to a local file as OpenTelemetry
+(OTLP/JSON) lines that the OpenTelemetry Collector file receiver and most
+trace viewers can import.
+"""
+
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .metrics import stage_timer
+
+logger = logging.getLogger("tracing")
+
+PERCENTILES = (50, 90, 95, 99)
+
+_current_span = ContextVar("current_span", default=None)
+
+def _otlp_value(value):
+    """Convert an attribute value to an OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def percentile(sorted_values, pct):
+    """
+    Return the nearest-rank percentile of sorted values.
+
+    Args:
+        sorted_values: Values in ascending order
+        pct: Percentile between 0 and 100
+
+    Returns:
+        float: Percentile value, or None for no values
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+class Span:
+    """
+    A timed operation within a trace.
+    """
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._start = time.perf_counter()
+        self.duration = None
+
+    def set_attribute(self, key, value):
+        """Attach an attribute (e.g. a payload size) to the span."""
+        if value is not None:
+            self.attributes[key] = value
+
+    def finish(self, error=None):
+        """End the span."""
+        self.duration = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self):
+        """Convert the span to an OTLP/JSON span object."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+class Tracer:
+    """
+    Creates spans, keeps recent durations per span name and optionally
+    exports finished spans to a JSON lines file.
+    """
+
+    def __init__(self, service_name="creepy-crawler", trace_file=None, window=1000):
+        """
+        Initialize the Tracer.
+
+        Args:
+            service_name: service.name resource attribute of exported spans
+            trace_file: OTLP/JSON lines file to append finished spans to (None to disable)
+            window: Number of recent durations kept per span name for percentiles
+        """
+        self.service_name = service_name
+        self.trace_file = trace_file or None
+        self.window = window
+        self.durations = {}
+        self.counts = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+        # Separate lock so file writes never block duration recording or get_stats
+        self.export_lock = threading.Lock()
+
+        if self.trace_file:
+            os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Record a span around the enclosed block, nested under the current span.
+
+        Yields:
+            Span: The active span, for adding attributes
+        """
+        parent = _current_span.get()
+        span = Span(name, parent.trace_id if parent else secrets.token_hex(16),
+                    parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.finish(error=e)
+            raise
+        else:
+            span.finish()
+        finally:
+            _current_span.reset(token)
+            self._record(span)
+
+    def _record(self, span):
+        """Store the span duration and export it."""
+        with self.lock:
+            durations = self.durations.get(span.name)
+            if durations is None:
+                durations = self.durations[span.name] = deque(maxlen=self.window)
+            durations.append(span.duration)
+            self.counts[span.name] = self.counts.get(span.name, 0) + 1
+            if span.error:
+                self.errors[span.name] = self.errors.get(span.name, 0) + 1
+
+        if self.trace_file:
+            self._export(span)
+
+    def _export(self, span):
+        """Append the span as one OTLP/JSON line."""
+        record = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "src.utils.tracing"}, "spans": [span.to_otlp()]}],
+            }]
+        }
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        try:
+            with self.export_lock, open(self.trace_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError as e:
+            logger.error(f"Error writing trace file {self.trace_file}: {e}")
+
+    def get_stats(self):
+        """
+        Get duration percentiles per span name over the recent window.
+
+        Returns:
+            dict: {name: {count, errors, mean, p50, p90, p95, p99}} in seconds
+        """
+        with self.lock:
+            snapshot = {name: sorted(values) for name, values in self.durations.items()}
+            counts = dict(self.counts)
+            errors = dict(self.errors)
+
+        stats = {}
+        for name, values in snapshot.items():
+            entry = {
+                "count": counts.get(name, 0),
+                "errors": errors.get(name, 0),
+                "mean": round(sum(values) / len(values), 4) if values else None,
+            }
+            for pct in PERCENTILES:
+                value = percentile(values, pct)
+                entry[f"p{pct}"] = round(value, 4) if value is not None else None
+            stats[name] = entry
+        return stats
+
+_tracer = Tracer()
+
+def get_tracer():
+    """Return the process-wide tracer."""
+    return _tracer
+
+def current_span():
+    """Return the innermost active span, or None outside any span."""
+    return _current_span.get()
+
+def configure_tracing(trace_file=None, service_name="creepy-crawler"):
+    """
+    Replace the process-wide tracer, e.g. to enable file export.
+
+    Args:
+        trace_file: OTLP/JSON lines file (None or empty to disable export)
+        service_name: service.name of exported spans
+
+    Returns:
+        Tracer: The new tracer
+    """
+    global _tracer
+    _tracer = Tracer(service_name=service_name, trace_file=trace_file)
+    if trace_file:
+        logger.info(f"Exporting trace spans to {trace_file}")
+    return _tracer
+
+@contextmanager
+def stage(name, **attributes):
+    """
+    Trace a pipeline stage and record it in the stage latency histogram.
+
+    Yields:
+        Span: The stage span, for adding payload sizes
+    """
+    with stage_timer(name), get_tracer().span(name, **attributes) as span:
+        yield span
@@ -1,8 +1,9 @@
 import aiohttp
 import json
-from bs4 import BeautifulSoup
 import redis
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
+
+from .sitemap import iter_sitemap_urls
 
 class URLManager:
     def __init__(self, redis_client: redis.Redis):
@@ -11,16 +12,18 @@ class URLManager:
 
     async def parse_sitemap(self, sitemap_url: str = "https://n8n.io/sitemap-workflows.xml") -> List[str]:
         """Parse sitemap.xml and extract workflow URLs from 'loc' parameter"""
+        urls = []
+        async for batch in self.stream_sitemap(sitemap_url):
+            urls.extend(batch)
+        return urls
+
+    async def stream_sitemap(self, sitemap_url: str = "https://n8n.io/sitemap-workflows.xml",
+                             batch_size: int = 500) -> AsyncIterator[List[str]]:
+        """Stream workflow URLs in batches, following nested sitemap indexes"""
         try:
             async with aiohttp.ClientSession() as session:
-                async with session.get(sitemap_url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        soup = BeautifulSoup(content, 'xml')
-                        urls = [loc.text for loc in soup.find_all('loc')]
-                        return urls
-                    else:
-                        raise Exception(f"Failed to fetch sitemap: {response.status}")
+                async for batch in iter_sitemap_urls(sitemap_url, session=session, batch_size=batch_size):
+                    yield batch
         except Exception as e:
             raise Exception(f"Error parsing sitemap: {str(e)}")
 
@@ -0,0 +1,188 @@
+"""
+Workflow Manifest
+
+This module records a canonical content hash of every processed workflow,
+together with the model and analysis template used, so that unchanged
+workflows can be skipped instead of being reanalyzed and rewritten. The hash
+is taken from the workflow as published on the page, before any LLM repair,
+so it is the same on every run.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger("workflow_manifest")
+
+DEFAULT_TEMPLATE_PATH = os.path.join("cline_docs", "prompt_templates", "combined_analysis.md")
+
+def canonical_workflow_hash(workflow_json):
+    """
+    Hash a workflow independently of key order and whitespace.
+
+    Args:
+        workflow_json: Parsed workflow JSON, or the raw workflow attribute of the
+                       page (hashed as text if it is not valid JSON)
+
+    Returns:
+        str: Hex-encoded SHA-256 digest
+    """
+    if isinstance(workflow_json, str):
+        try:
+            workflow_json = json.loads(workflow_json)
+        except json.JSONDecodeError:
+            return hashlib.sha256(workflow_json.strip().encode("utf-8")).hexdigest()
+    canonical = json.dumps(workflow_json, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def template_fingerprint(template_path=None):
+    """
+    Hash the analysis template so template edits invalidate the manifest.
+
+    Args:
+        template_path: Path to the analysis template (None for the default)
+
+    Returns:
+        str: Hex-encoded SHA-256 digest, or "fallback" if the file is missing
+    """
+    path = template_path or DEFAULT_TEMPLATE_PATH
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        # load_analysis_template falls back to a built-in template
+        return "fallback"
+
+class WorkflowManifest:
+    """
+    A persistent map of workflow IDs to the fingerprint of their last
+    successful processing run.
+
+    Records are written in batches: the file is rewritten after flush_every
+    records or flush_interval seconds, and on flush() or interpreter exit.
+    A crash loses at most the unflushed records, which are then reprocessed.
+    """
+
+    def __init__(self, manifest_file="db/workflow_manifest.json", flush_every=50, flush_interval=5.0):
+        """
+        Initialize the WorkflowManifest.
+
+        Args:
+            manifest_file: Path to the file storing the manifest
+            flush_every: Records buffered before the file is rewritten
+            flush_interval: Seconds after which buffered records are written anyway
+        """
+        self.manifest_file = manifest_file
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.entries = {}
+        self.lock = threading.Lock()
+        self._pending = 0
+        self._last_save = time.monotonic()
+
+        # Ensure directories exist
+        os.makedirs(os.path.dirname(manifest_file) or ".", exist_ok=True)
+
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        """Load the manifest from file."""
+        try:
+            if os.path.exists(self.manifest_file):
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+                logger.info(f"Loaded {len(self.entries)} manifest entries")
+        except Exception as e:
+            logger.error(f"Error loading manifest: {e}")
+            self.entries = {}
+
+    def _save(self):
+        """Save the manifest to file (lock held)."""
+        try:
+            # Create a temporary file and then rename to avoid corruption
+            temp_file = f"{self.manifest_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.replace(temp_file, self.manifest_file)
+            self._pending = 0
+            self._last_save = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error saving manifest: {e}")
+
+    def flush(self):
+        """Write records that are still buffered."""
+        with self.lock:
+            if self._pending:
+                self._save()
+
+    @staticmethod
+    def fingerprint(workflow_json, model, template_path=None):
+        """
+        Build the fingerprint that decides whether a workflow must be reprocessed.
+
+        Args:
+            workflow_json: Raw workflow attribute of the page (or parsed workflow JSON)
+            model: Model used for the analysis
+            template_path: Path to the analysis template
+
+        Returns:
+            dict: Workflow hash, model and template hash
+        """
+        return {
+            "workflow_hash": canonical_workflow_hash(workflow_json),
+            "model": model,
+            "template_hash": template_fingerprint(template_path),
+        }
+
+    def is_unchanged(self, workflow_id, fingerprint):
+        """
+        Check whether a workflow was already processed with the same inputs.
+
+        Args:
+            workflow_id: Workflow ID
+            fingerprint: Fingerprint returned by fingerprint()
+
+        Returns:
+            bool: True if the previous outputs are still valid
+        """
+        with self.lock:
+            entry = self.entries.get(workflow_id)
+        if not entry:
+            return False
+
+        if any(entry.get(key) != value for key, value in fingerprint.items()):
+            return False
+
+        # Outputs deleted since the last run have to be regenerated
+        output_folder = entry.get("outputs", {}).get("output_folder")
+        return bool(output_folder) and os.path.isdir(output_folder)
+
+    def get_outputs(self, workflow_id):
+        """Return the recorded output paths for a workflow."""
+        with self.lock:
+            return dict(self.entries.get(workflow_id, {}).get("outputs", {}))
+
+    def record(self, workflow_id, fingerprint, outputs):
+        """
+        Record a successful processing run.
+
+        Args:
+            workflow_id: Workflow ID
+            fingerprint: Fingerprint returned by fingerprint()
+            outputs: Output paths produced by the run
+        """
+        with self.lock:
+            self.entries[workflow_id] = {
+                **fingerprint,
+                "outputs": outputs,
+                "processed_at": datetime.now().isoformat(),
+            }
+            self._pending += 1
+            if self._pending >= self.flush_every or time.monotonic() - self._last_save >= self.flush_interval:
+                self._save()
@@ -0,0 +1,129 @@
+"""
+Workflow Splitter
+
+This module splits large n8n workflows into parts for map-reduce analysis.
+Parts follow the connection graph: connected subgraphs stay together where they
+fit, oversized subgraphs are cut along a breadth-first walk so each part is
+still mostly connected, and small subgraphs are packed together to avoid many
+tiny requests.
+"""
+
+import logging
+from collections import deque
+
+from .prompt_builder import STICKY_NOTE_TYPE, format_edge
+
+logger = logging.getLogger("workflow_splitter")
+
+def _edges(connections):
+    """Yield (source, target, connection type, output index) for every connection."""
+    if not isinstance(connections, dict):
+        return
+    for source, outputs in connections.items():
+        if not isinstance(outputs, dict):
+            continue
+        for connection_type, branches in outputs.items():
+            for output_index, targets in enumerate(branches or []):
+                for target in targets or []:
+                    if isinstance(target, dict) and "node" in target:
+                        yield source, target["node"], connection_type, output_index
+
+def connected_components(workflow_json):
+    """
+    Group node names into connected subgraphs (ignoring connection direction).
+
+    Sticky notes have no connections and are left out.
+
+    Args:
+        workflow_json: n8n workflow JSON
+
+    Returns:
+        list: Lists of node names in breadth-first order, starting from nodes without inputs
+    """
+    names = [node.get("name") for node in workflow_json.get("nodes") or []
+             if isinstance(node, dict) and node.get("type") != STICKY_NOTE_TYPE]
+    known = set(names)
+    neighbours = {name: [] for name in names}
+    has_input = set()
+    for source, target, _, _ in _edges(workflow_json.get("connections")):
+        if source in known and target in known:
+            neighbours[source].append(target)
+            neighbours[target].append(source)
+            has_input.add(target)
+
+    # Start walks at triggers (no inputs) so parts read in execution order
+    order = [name for name in names if name not in has_input] + [name for name in names if name in has_input]
+    seen, components = set(), []
+    for start in order:
+        if start in seen:
+            continue
+        seen.add(start)
+        component, queue = [], deque([start])
+        while queue:
+            name = queue.popleft()
+            component.append(name)
+            for neighbour in neighbours[name]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        components.append(component)
+    return components
+
+def split_workflow(workflow_json, max_nodes=25):
+    """
+    Split a workflow into parts of at most max_nodes nodes.
+
+    Args:
+        workflow_json: n8n workflow JSON
+        max_nodes: Maximum nodes per part
+
+    Returns:
+        list: Parts as dicts with name, nodes, connections (within the part)
+              and external_edges (edges to or from other parts)
+    """
+    groups = []
+    for component in connected_components(workflow_json):
+        groups.extend(component[i:i + max_nodes] for i in range(0, len(component), max_nodes))
+
+    # Pack small groups together, largest first
+    bins = []
+    for group in sorted(groups, key=len, reverse=True):
+        for members in bins:
+            if len(members) + len(group) <= max_nodes:
+                members.extend(group)
+                break
+        else:
+            bins.append(list(group))
+
+    nodes_by_name = {node.get("name"): node for node in workflow_json.get("nodes") or [] if isinstance(node, dict)}
+    connections = workflow_json.get("connections") or {}
+    name = workflow_json.get("name", "Workflow")
+
+    parts = []
+    for index, members in enumerate(bins, 1):
+        member_set = set(members)
+        part_connections = {}
+        for source, outputs in connections.items():
+            if source not in member_set or not isinstance(outputs, dict):
+                continue
+            part_connections[source] = {
+                connection_type: [
+                    [target for target in targets or [] if isinstance(target, dict) and target.get("node") in member_set]
+                    for targets in branches or []
+                ]
+                for connection_type, branches in outputs.items()
+            }
+        external = [
+            format_edge(source, target, connection_type, output_index)
+            for source, target, connection_type, output_index in _edges(connections)
+            if (source in member_set) != (target in member_set)
+        ]
+        parts.append({
+            "name": f"{name} (part {index}/{len(bins)})",
+            "nodes": [nodes_by_name[member] for member in members if member in nodes_by_name],
+            "connections": part_connections,
+            "external_edges": external,
+        })
+
+    logger.info(f"Split {name} into {len(parts)} parts of up to {max_nodes} nodes")
+    return parts
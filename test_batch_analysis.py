@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Test script for batched analysis of small workflows
+"""
+
+from src.utils.batch_analysis import is_batchable, pack_batches, split_batch_response
+
+def small_workflow(size):
+    """Build a workflow with the given number of nodes."""
+    return {"name": "Small", "nodes": [{"name": f"N{i}", "type": "n8n-nodes-base.set"} for i in range(size)],
+            "connections": {}}
+
+def test_split_batch_response():
+    """Decorated markers, missing end markers and out-of-order IDs are all recovered."""
+    response = (
+        "**<<<ANALYSIS 1: 101>>>**\n### Overview\nFirst\n<<<END 1>>>\n\n"
+        "<<<ANALYSIS 7: 303>>>\nThird\n<<<END 7>>>\n"
+        "## <<<ANALYSIS 2>>>\nSecond, no end marker\n"
+    )
+    analyses = split_batch_response(response, ["101", "202", "303"])
+    assert analyses == {
+        "101": "### Overview\nFirst",
+        "202": "Second, no end marker",
+        "303": "Third",
+    }
+    assert split_batch_response("no markers at all", ["101"]) == {}
+
+def test_pack_batches():
+    """Only small workflows are batchable and batches respect the batch size."""
+    assert is_batchable(small_workflow(3))
+    assert not is_batchable(small_workflow(12))
+    assert not is_batchable(small_workflow(0))
+
+    items = [(str(i), small_workflow(3)) for i in range(7)]
+    batches = pack_batches(items, "{{count}} workflows\n{{workflows}}", "openai/gpt-4o-mini", batch_size=3)
+    assert [len(batch) for batch in batches] == [3, 3, 1]
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for the upstream circuit breakers
+"""
+
+import time
+
+import pytest
+
+from src.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+def test_opens_on_failure_rate():
+    """The breaker stays closed below min_calls and opens once the failure rate is reached."""
+    breaker = CircuitBreaker("test-failures", failure_rate=0.5, window=10, min_calls=4, open_seconds=60)
+    for success in (False, False, True):
+        breaker.before_call()
+        breaker.record(success)
+    assert breaker.state == CLOSED
+
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert 0 < error.value.retry_after <= 60
+
+def test_half_open_probe_closes_or_reopens():
+    """After the cool-down one probe is allowed; its outcome closes or reopens the breaker."""
+    breaker = CircuitBreaker("test-probe", min_calls=1, open_seconds=0.05)
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
+
+def test_slow_calls_and_ignored_errors():
+    """Slow successes open the breaker; errors that say nothing about the upstream do not count."""
+    breaker = CircuitBreaker("test-slow", slow_call_rate=0.5, slow_call_seconds=1, min_calls=2)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            with breaker.guard(is_failure=lambda e: not isinstance(e, ValueError)):
+                raise ValueError("bad request")
+    assert breaker.state == CLOSED and not breaker.calls
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(True, seconds=5)
+    assert breaker.state == OPEN
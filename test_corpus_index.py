@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for the corpus-level workflow index
+"""
+
+import json
+import os
+
+from src.utils.corpus_index import CorpusIndex, graph_stats, integration_for_node_type
+
+WORKFLOW_FILE = os.path.join("workflows", "2859-chat-with-postgresql-database_workflow.json")
+
+def load_workflow():
+    """Load the sample PostgreSQL chat workflow."""
+    with open(WORKFLOW_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def test_integration_names():
+    """Node types map to integration names; core nodes are skipped."""
+    assert integration_for_node_type("n8n-nodes-base.slackTrigger") == "slack"
+    assert integration_for_node_type("n8n-nodes-base.postgresTool") == "postgres"
+    assert integration_for_node_type("@n8n/n8n-nodes-langchain.lmChatOpenAi") == "openai"
+    assert integration_for_node_type("n8n-nodes-base.if") is None
+    assert integration_for_node_type("@n8n/n8n-nodes-langchain.chatTrigger") is None
+
+def test_graph_stats():
+    """All six sub-nodes feed the AI agent."""
+    stats = graph_stats(load_workflow())
+    assert stats["node_count"] == 7
+    assert stats["edge_count"] == 6
+    assert stats["max_fan_out"] == 1
+    assert stats["max_depth"] == 1
+
+def test_incremental_updates(tmp_path):
+    """Updating a workflow replaces its previous index entries."""
+    index = CorpusIndex(str(tmp_path / "index.sqlite"))
+    workflow = load_workflow()
+
+    index.update("2859", workflow)
+    index.update("1", {"name": "Slack", "nodes": [{"name": "S", "type": "n8n-nodes-base.slack",
+                                                    "credentials": {"slackApi": {"id": "1"}}}]})
+    assert index.workflows_with_node_type("n8n-nodes-base.postgresTool") == ["2859"]
+    assert index.workflows_with_integration("slack") == ["1"]
+    assert index.workflows_with_credential("slackApi") == ["1"]
+    assert index.top("integrations", 1) == [{"integration": "openai", "workflows": 1}]
+
+    workflow["nodes"] = [node for node in workflow["nodes"] if node["type"] != "n8n-nodes-base.postgresTool"]
+    index.update("2859", workflow)
+    assert index.workflows_with_node_type("n8n-nodes-base.postgresTool") == []
+    assert index.summary()["workflows"] == 2
+    index.close()
+
+def test_rebuild_replaces_stale_entries(tmp_path):
+    """A rebuild drops workflows and node types that are no longer in the source."""
+    index = CorpusIndex(str(tmp_path / "index.sqlite"))
+    slack = {"name": "Slack", "nodes": [{"name": "S", "type": "n8n-nodes-base.slack"}]}
+    index.update("1", slack)
+    index.update("2", {"name": "Gone", "nodes": [{"name": "G", "type": "n8n-nodes-base.github"}]})
+
+    changed = {"name": "Slack", "nodes": [{"name": "T", "type": "n8n-nodes-base.telegram"}]}
+    assert index.rebuild([("1", slack), ("1", changed)]) == 1
+    assert index.workflows_with_integration("slack") == []
+    assert index.workflows_with_integration("github") == []
+    assert index.top("integrations") == [{"integration": "telegram", "workflows": 1}]
+    assert index.get_graph_stats("2") is None
+    index.close()
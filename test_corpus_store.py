@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the consolidated SQLite corpus store
+"""
+
+from src.utils.corpus_store import CorpusStore, import_output_folders
+from src.utils.output_manager import OutputManager
+
+WORKFLOW = {"name": "Test Workflow", "nodes": [{"name": "Start", "type": "n8n-nodes-base.start"},
+                                               {"name": "Mail", "type": "n8n-nodes-base.gmail"}]}
+
+def test_put_get_round_trip_and_replace(tmp_path):
+    """Stored workflows come back with parsed JSON columns; a second put replaces the row."""
+    store = CorpusStore(str(tmp_path / "db" / "corpus.sqlite"))
+    store.put("1234", WORKFLOW, {"title": "Test"}, "# Analysis", content_hash="abc")
+
+    stored = store.get("1234")
+    assert stored["workflow"] == WORKFLOW and stored["metadata"] == {"title": "Test"}
+    assert (stored["name"], stored["node_count"], stored["analysis"], stored["content_hash"]) == (
+        "Test Workflow", 2, "# Analysis", "abc")
+    assert store.get("missing") is None
+
+    store.put("1234", {"name": "Renamed", "nodes": "invalid"})
+    stored = store.get("1234")
+    assert (stored["name"], stored["node_count"], stored["metadata"], stored["analysis"]) == ("Renamed", 0, None, None)
+    assert store.count() == 1
+    store.close()
+
+def test_iter_workflows_columns_count_and_delete(tmp_path):
+    """Scans yield rows in ID order with the optional columns only when asked for."""
+    store = CorpusStore(str(tmp_path / "corpus.sqlite"))
+    for workflow_id in ("3", "1", "2"):
+        store.put(workflow_id, {**WORKFLOW, "name": f"Workflow {workflow_id}"}, {"id": workflow_id}, "text")
+
+    rows = list(store.iter_workflows(batch_size=2))
+    assert [row["workflow_id"] for row in rows] == ["1", "2", "3"]
+    assert set(rows[0]) == {"workflow_id", "name", "node_count", "content_hash", "workflow", "updated_at"}
+    assert rows[0]["workflow"]["name"] == "Workflow 1"
+
+    row = next(store.iter_workflows(include_metadata=True, include_analysis=True))
+    assert row["metadata"] == {"id": "1"} and row["analysis"] == "text"
+
+    assert store.count() == 3 and store.ids() == ["1", "2", "3"]
+    store.delete("2")
+    store.delete("missing")
+    assert store.count() == 2 and store.ids() == ["1", "3"]
+    store.close()
+
+def test_import_output_folders(tmp_path):
+    """Folders written by OutputManager are imported; folders without a valid workflow file are skipped."""
+    output_dir = tmp_path / "output"
+    manager = OutputManager(output_dir=str(output_dir))
+    manager.write("1234", {"workflow": WORKFLOW, "metadata": {"title": "Test"}, "analysis": "# Analysis"})
+    manager.write("5678", {"workflow": {"name": "Bare", "nodes": []}})
+    (output_dir / "9999").mkdir()
+    (output_dir / "9999" / "9999.json").write_text("{not json", encoding="utf-8")
+    (output_dir / "logs").mkdir()
+    (output_dir / "notes.txt").write_text("not a folder", encoding="utf-8")
+
+    store = CorpusStore(str(tmp_path / "corpus.sqlite"))
+    assert import_output_folders(store, str(output_dir)) == 2
+    assert store.ids() == ["1234", "5678"]
+
+    imported = store.get("1234")
+    assert imported["workflow"] == WORKFLOW and imported["metadata"] == {"title": "Test"}
+    assert imported["analysis"] == "# Analysis"
+    bare = store.get("5678")
+    assert bare["metadata"] is None and bare["analysis"] is None and bare["node_count"] == 0
+    store.close()
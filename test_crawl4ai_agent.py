@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test script for Crawl4AIAgent embedding batches, bulk inserts, the embedding cache
+and the process_urls worker pool
+"""
+
+import asyncio
+import math
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "python"))
+
+import n8n_integration
+from embedding_cache import EmbeddingCache
+from n8n_integration import Crawl4AIAgent
+
+class WordEncoding:
+    """Offline stand-in for a tiktoken encoding: one token per word."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+class FakeEmbeddings:
+    """Embeddings client recording the inputs of every create() call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input):
+        self.calls.append(list(input))
+        # Reversed to check that results are put back in input order
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+class FakeSupabase:
+    """Supabase client recording the rows of every insert request."""
+
+    def __init__(self):
+        self.inserts = []
+
+    def table(self, name):
+        assert name == "page_chunks"
+        return self
+
+    def insert(self, rows):
+        self.inserts.append(rows)
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[])
+
+class FakeCrawler:
+    """Crawler that serves prepared HTML files."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.crawled = []
+        self.cursor = self
+
+    async def crawl(self, url):
+        self.crawled.append(url)
+
+    def execute(self, sql, params):
+        url = params[0]
+        return [(self.pages[url],)] if url in self.pages else []
+
+    def close(self):
+        pass
+
+def write_page(path, paragraphs=40):
+    """Write an HTML page with distinct paragraphs of a dozen words each."""
+    body = "".join(f"<p>Paragraph {i} explains step {i} of the workflow in a dozen plain words.</p>"
+                   for i in range(paragraphs))
+    path.write_text(f"<html><body>{body}</body></html>", encoding="utf-8")
+    return str(path)
+
+def make_agent(monkeypatch, pages, **kwargs):
+    """Build an agent with fake clients, no network and no default embedding cache."""
+    monkeypatch.setattr(n8n_integration.tiktoken, "get_encoding", lambda name: WordEncoding())
+    monkeypatch.setattr(n8n_integration, "EMBEDDING_CACHE_MAX_ENTRIES", 0)
+    monkeypatch.setattr(n8n_integration, "VECTOR_INDEX_BACKEND", "supabase")
+    agent = Crawl4AIAgent(supabase_client=FakeSupabase(), embeddings_client=FakeEmbeddings(),
+                          crawler=FakeCrawler(pages), **kwargs)
+    agent.chunker = n8n_integration.TextChunker(agent.encoding, 40, 8)
+    return agent
+
+def test_process_url_batches_embeddings_and_inserts(monkeypatch, tmp_path):
+    """N chunks take ceil(N / embedding_batch_size) embedding calls and ceil(N / insert_batch_size) inserts."""
+    url = "https://example.com/page"
+    agent = make_agent(monkeypatch, {url: write_page(tmp_path / "page.html")},
+                       embedding_batch_size=4, insert_batch_size=3)
+
+    result = asyncio.run(agent.process_url(url, {"source": "test"}))
+    chunks = result["chunks_processed"]
+    assert result["status"] == "success" and chunks > 4
+
+    calls = agent.embeddings_client.calls
+    assert len(calls) == math.ceil(chunks / 4)
+    assert all(len(batch) <= 4 for batch in calls)
+
+    inserts = agent.supabase.inserts
+    assert len(inserts) == math.ceil(chunks / 3)
+    rows = sorted((row for batch in inserts for row in batch), key=lambda row: row["chunk_index"])
+    assert [row["chunk_index"] for row in rows] == list(range(chunks))
+    # Each row carries the embedding of its own chunk
+    assert all(row["embedding"] == [float(len(row["content"])), 1.0] for row in rows)
+    assert rows[0]["metadata"]["source"] == "test" and rows[0]["metadata"]["chunk_count"] == chunks
+
+def test_repeated_chunks_hit_the_cache(monkeypatch, tmp_path):
+    """A recrawl embeds nothing new, and cache I/O runs off the event loop thread."""
+    url = "https://example.com/page"
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    agent = make_agent(monkeypatch, {url: write_page(tmp_path / "page.html")}, embedding_cache=cache)
+
+    cache_threads = set()
+    for name in ("get_many", "put_many"):
+        method = getattr(cache, name)
+        def recorded(*args, method=method):
+            cache_threads.add(threading.current_thread())
+            return method(*args)
+        monkeypatch.setattr(cache, name, recorded)
+
+    first = asyncio.run(agent.process_url(url))
+    calls = len(agent.embeddings_client.calls)
+    assert calls >= 1
+
+    second = asyncio.run(agent.process_url(url))
+    assert second["chunks_processed"] == first["chunks_processed"]
+    assert len(agent.embeddings_client.calls) == calls
+    assert agent.get_cache_stats()["hits"] == first["chunks_processed"]
+    assert threading.main_thread() not in cache_threads
+    cache.close()
+
+def test_worker_pool_bounds_concurrency_and_streams_in_completion_order(monkeypatch):
+    """At most `concurrency` URLs are in flight and results stream as they finish."""
+    agent = make_agent(monkeypatch, {})
+    delays = {f"https://example.com/{i}": delay for i, delay in enumerate([0.1, 0.01, 0.05, 0.02, 0.05, 0.01])}
+    in_flight = 0
+    max_in_flight = 0
+
+    async def slow_process_url(url, metadata=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            await asyncio.sleep(delays[url])
+            if url.endswith("/5"):
+                raise RuntimeError("boom")
+            return {"status": "success", "url": url}
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(agent, "process_url", slow_process_url)
+    urls = list(delays)
+
+    async def collect():
+        return [result async for result in agent.iter_process_urls(urls, concurrency=2)]
+
+    streamed = asyncio.run(collect())
+    assert max_in_flight == 2
+    # Two workers: 1, 2 and 3 pass through the second worker while 0 (0.1s) runs on the first
+    assert [result["url"] for result in streamed] == [urls[1], urls[2], urls[3], urls[0], urls[5], urls[4]]
+    assert streamed[4]["status"] == "error" and streamed[4]["message"] == "boom"
+
+    max_in_flight = 0
+    ordered = asyncio.run(agent.process_urls(urls, concurrency=3))
+    assert max_in_flight == 3
+    assert [result["url"] for result in ordered] == urls
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged and fallback LLM requests
+"""
+
+import time
+
+import pytest
+
+from src.utils.config import get_settings
+from src.utils.hedging import RequestCancelled, run_hedged
+
+def test_slow_primary_is_hedged_and_cancelled(monkeypatch):
+    """A slow primary gets a hedge request; the first answer wins and the loser is cancelled."""
+    monkeypatch.setattr(get_settings(), "hedge_default_delay", 0.05)
+    monkeypatch.setattr(get_settings(), "hedge_min_delay", 0.01)
+    cancelled = []
+
+    def attempt(model, cancel):
+        if model == "slow":
+            if cancel.wait(2):
+                cancelled.append(model)
+                raise RequestCancelled(model)
+            return "late"
+        return f"answer from {model}"
+
+    start = time.perf_counter()
+    assert run_hedged(attempt, ["slow", "fast"]) == ("answer from fast", "fast")
+    assert time.perf_counter() - start < 1
+    time.sleep(0.05)
+    assert cancelled == ["slow"]
+
+def test_fallback_chain():
+    """Failing or invalid answers fall back to the next model; the last error is raised at the end."""
+    def attempt(model, cancel):
+        if model == "down":
+            raise ConnectionError(model)
+        return "" if model == "empty" else f"answer from {model}"
+
+    assert run_hedged(attempt, ["down", "empty", "ok"], hedge=False) == ("answer from ok", "ok")
+    with pytest.raises(ValueError):
+        run_hedged(attempt, ["down", "empty"], hedge=False)
+
+def test_call_site_options_skip_tier_models(monkeypatch):
+    """Fallbacks already in the call site's router tiers are dropped; hedging is off by default."""
+    from src.utils.common import call_site_options
+    settings = get_settings()
+    assert call_site_options("analysis") == {"fallback_models": [], "hedge": False}
+
+    monkeypatch.setattr(settings, "analysis_model_tiers", "cheap/model,openai/gpt-4o-mini")
+    monkeypatch.setattr(settings, "analysis_fallback_models", "openai/gpt-4o-mini, other/provider")
+    monkeypatch.setattr(settings, "analysis_hedge", True)
+    assert call_site_options("analysis") == {"fallback_models": ["other/provider"], "hedge": True}
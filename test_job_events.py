@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for the job event bus and the job event streaming endpoints
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "python"))
+
+from fastapi.testclient import TestClient
+
+import api_server
+from job_events import JobEventBus
+
+def collect(bus, job_id, last_event_id=None):
+    """Subscribe to a finished job and return the replayed events."""
+    async def run():
+        return [entry async for entry in bus.subscribe(job_id, last_event_id)]
+    return asyncio.run(run())
+
+def parse_sse(body):
+    """Split an SSE response body into (id, event, data) tuples, skipping comments."""
+    messages = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            messages.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return messages
+
+def test_history_is_trimmed_but_keeps_the_first_event():
+    """Only history_limit events are kept, the oldest being the job's first event."""
+    bus = JobEventBus(history_limit=3)
+    bus.publish("job", "queued")
+    for i in range(5):
+        bus.publish("job", "progress", {"completed": i})
+    bus.publish("job", "completed")
+
+    history = bus.history["job"]
+    assert [entry["id"] for entry in history] == [1, 6, 7]
+    assert [entry["event"] for entry in history] == ["queued", "progress", "completed"]
+    assert bus.is_finished("job")
+
+def test_replay_resumes_after_last_event_id():
+    """Subscribers replay the history after last_event_id and stop at the terminal event."""
+    bus = JobEventBus()
+    for event in ("queued", "running", "progress", "completed"):
+        bus.publish("job", event)
+
+    assert [entry["id"] for entry in collect(bus, "job")] == [1, 2, 3, 4]
+    assert [entry["event"] for entry in collect(bus, "job", last_event_id=2)] == ["progress", "completed"]
+    assert collect(bus, "job", last_event_id=4) == []
+    assert "job" not in bus.subscribers
+
+def test_live_subscriber_receives_events_until_terminal():
+    """Live events reach the subscriber and the stream ends after the terminal event."""
+    bus = JobEventBus()
+    bus.publish("job", "queued")
+
+    async def run():
+        async def publish_later():
+            for event in ("running", "failed", "progress"):
+                await asyncio.sleep(0.01)
+                bus.publish("job", event)
+        task = asyncio.create_task(publish_later())
+        entries = [entry async for entry in bus.subscribe("job", heartbeat=0.005)]
+        await task
+        return entries
+
+    events = [entry["event"] if entry else None for entry in asyncio.run(run())]
+    # Heartbeats (None) are interleaved while waiting; nothing follows the terminal event
+    assert [event for event in events if event] == ["queued", "running", "failed"]
+    assert None in events
+
+def fake_submit_batch(items, process_func):
+    """Publish a batch job's events from a background task instead of scraping."""
+    job_id = "batch_test"
+    api_server.job_events.publish(job_id, "queued", {"total": len(items)})
+
+    async def run():
+        for i, item in enumerate(items):
+            await asyncio.sleep(0.02)
+            api_server.job_events.publish(job_id, "progress", {"completed": i + 1, "url": item})
+        api_server.job_events.publish(job_id, "completed", {"completed": len(items)})
+    asyncio.get_running_loop().create_task(run())
+    return job_id
+
+def test_jobs_endpoints_stream_and_replay_events(monkeypatch):
+    """POST /jobs, then SSE and WebSocket streams close on the terminal event; Last-Event-ID resumes."""
+    monkeypatch.setattr(api_server, "job_events", JobEventBus(history_limit=3))
+    monkeypatch.setattr(api_server.batch_processor, "submit_batch", fake_submit_batch)
+    urls = [f"https://n8n.io/workflows/{i}" for i in range(4)]
+
+    with TestClient(api_server.app) as client:
+        response = client.post("/jobs", json={"urls": urls})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["job_id"] == "batch_test" and job["events_url"] == "/jobs/batch_test/events"
+
+        # Live stream: returns once "completed" is sent
+        with client.stream("GET", job["events_url"]) as stream:
+            assert stream.headers["content-type"].startswith("text/event-stream")
+            messages = parse_sse(stream.read().decode())
+        assert [event for _, event, _ in messages] == ["queued"] + ["progress"] * 4 + ["completed"]
+        assert [message_id for message_id, _, _ in messages] == list(range(1, 7))
+        assert messages[-1][2]["data"] == {"completed": 4}
+
+        # Reconnect: the trimmed history holds events 1, 5 and 6; only those after 4 are replayed
+        response = client.get(job["events_url"], headers={"Last-Event-ID": "4"})
+        assert [(message_id, event) for message_id, event, _ in parse_sse(response.text)] == [
+            (5, "progress"), (6, "completed")]
+
+        with client.websocket_connect(job["websocket_url"]) as websocket:
+            entries = [websocket.receive_json() for _ in range(3)]
+        assert [entry["id"] for entry in entries] == [1, 5, 6]
+
+        assert client.get("/jobs/unknown/events").status_code == 404
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed LLM completions
+"""
+
+import asyncio
+
+from src.utils.llm_stream import StreamHub, TokenSink, iter_sse_data, partial_file_listener
+
+def test_iter_sse_data():
+    """Data lines are returned, comments and blank lines become None."""
+    lines = [b": OPENROUTER PROCESSING", b"", b'data: {"a": 1}', "data: [DONE]"]
+    assert list(iter_sse_data(lines)) == [None, None, '{"a": 1}', "[DONE]"]
+
+def test_sink_ownership_and_partial_file(tmp_path):
+    """Only the owning request writes; a release empties the partial file for the next request."""
+    path = tmp_path / "analysis.txt.partial"
+    sink = TokenSink([partial_file_listener(str(path))])
+    first, second = object(), object()
+
+    assert sink.claim(first) and not sink.claim(second)
+    sink.write(first, "Hello ")
+    sink.write(second, "ignored")
+    assert path.read_text() == "Hello "
+
+    sink.release(first)
+    assert path.read_text() == "" and sink.claim(second)
+    sink.write(second, "World")
+    sink.close()
+    assert sink.text == "World" and path.read_text() == "World"
+
+def test_hub_replays_and_streams():
+    """A late subscriber gets the text so far, then live tokens until done."""
+    hub = StreamHub()
+
+    async def run():
+        sink = hub.open("42")
+        owner = object()
+        sink.claim(owner)
+        sink.write(owner, "a")
+
+        async def follow():
+            return [entry async for entry in hub.subscribe("42")]
+
+        task = asyncio.create_task(follow())
+        await asyncio.sleep(0)
+        sink.write(owner, "b")
+        sink.close()
+        return await task
+
+    assert asyncio.run(run()) == [
+        {"event": "token", "text": "a"},
+        {"event": "token", "text": "b"},
+        {"event": "done", "error": None},
+    ]
+    assert not hub.is_active("42")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test script for the Prometheus-style metrics registry
+"""
+
+from src.utils.metrics import MetricsRegistry
+
+def test_render_exposition_format():
+    """Counters, gauges and cumulative histogram buckets render in text format."""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    depth = registry.gauge("queue_depth", "Queue depth")
+    latency = registry.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1))
+
+    requests.inc(route="/status")
+    requests.inc(2, route="/status")
+    depth.set(7)
+    latency.observe(0.05, stage="fetch")
+    latency.observe(0.5, stage="fetch")
+    latency.observe(3, stage="fetch")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/status"} 3' in lines
+    assert "queue_depth 7" in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="fetch"} 3' in lines
+
+def test_label_validation():
+    """Samples must provide exactly the declared labels."""
+    registry = MetricsRegistry()
+    counter = registry.counter("errors_total", "Errors", ["stage"])
+    try:
+        counter.inc(route="/x")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for unknown label")
+    assert registry.counter("errors_total", "Errors", ["stage"]) is counter
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Test script for tiered model routing
+"""
+
+from src.utils.model_router import ModelRouter
+
+ROUTES = {"repair": {"tiers": ["cheap", "mid", "top"], "large_size": 100}}
+
+def test_candidates_by_size_and_model():
+    """Large inputs start a tier up; an explicit model is the lowest tier tried."""
+    router = ModelRouter(ROUTES)
+    assert router.candidates("repair", 10) == ["cheap", "mid", "top"]
+    assert router.candidates("repair", 500) == ["mid", "top"]
+    assert router.candidates("repair", 10, model="top") == ["top"]
+    assert router.candidates("repair", 10, model="other") == ["other", "cheap", "mid", "top"]
+    assert router.candidates("unknown", 10, model="other") == ["other"]
+
+def test_escalates_on_invalid_output_and_skips_failing_tiers():
+    """Invalid outputs escalate; a tier that keeps failing is skipped for that size class."""
+    router = ModelRouter(ROUTES)
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        return "ok" if model == "mid" else "bad"
+
+    for _ in range(5):
+        assert router.run("repair", call, lambda output: output == "ok", size=10) == ("ok", "mid")
+    assert calls == ["cheap", "mid"] * 5
+
+    stats = router.get_stats()
+    assert stats["repair/small/cheap"]["success_rate"] == 0
+    assert stats["repair/small/mid"]["attempts"] == 5
+    assert router.candidates("repair", 10) == ["mid", "top"]
+
+    assert router.run("repair", lambda model: "bad", lambda output: output == "ok") == (None, None)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for the OpenRouter stub server
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.utils import common, token_budget
+from src.utils.llm_stream import TokenSink
+from src.utils.openrouter_stub import builtin_response, parse_latency, start_stub_server
+from src.utils.batch_analysis import split_batch_response
+
+def test_parse_latency():
+    """Latency specs become samplers that never return negative delays."""
+    assert parse_latency("0.5")() == 0.5
+    assert 1 <= parse_latency("uniform:1,2")() <= 2
+    assert parse_latency("normal:0,0.001")() >= 0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1,2")
+
+def test_builtin_responses_pass_validation():
+    """Canned responses fit the prompt kind: batches split, repairs parse as workflows."""
+    prompt = "=== WORKFLOW 1: 101 ===\n```json\n{}\n```\n\n=== WORKFLOW 2: 102 ===\n```json\n{}\n```"
+    assert set(split_batch_response(builtin_response(prompt), ["101", "102"])) == {"101", "102"}
+
+    repaired = json.loads(builtin_response("You are a JSON repair expert.\n```json\n{\"nodes\": [\n```"))
+    assert repaired["nodes"]
+    assert builtin_response('{"name":"Mailer"}').startswith('# Comprehensive Workflow Analysis for "Mailer"')
+
+def test_call_openrouter_against_stub(monkeypatch):
+    """call_openrouter reaches the stub through the base URL, streamed and not, and falls back on errors."""
+    monkeypatch.setattr(common, "OPENROUTER_API_KEY", "stub")
+    monkeypatch.setattr(token_budget, "_limiter", token_budget.TokenLimiter())
+
+    async def run():
+        profiles = {"default": {"latency": "0.01"},
+                    "models": {"stub/down": {"error_rate": 1.0, "latency": "0"}}}
+        runner, base_url, server = await start_stub_server(port=0, profiles=profiles)
+        monkeypatch.setattr(common, "OPENROUTER_BASE_URL", base_url)
+        try:
+            plain = await asyncio.to_thread(common.call_openrouter, '{"name":"Plain"}', model="stub/ok")
+            sink = TokenSink()
+            streamed = await asyncio.to_thread(common.call_openrouter, '{"name":"Streamed"}', model="stub/down",
+                                               fallback_models=["stub/ok"], sink=sink)
+            return plain, streamed, sink.text, dict(server.stats)
+        finally:
+            await runner.cleanup()
+
+    plain, streamed, sink_text, stats = asyncio.run(run())
+    assert plain.startswith('# Comprehensive Workflow Analysis for "Plain"')
+    assert streamed == sink_text and '"Streamed"' in streamed
+    assert stats == {("stub/ok", "success"): 2, ("stub/down", "error"): 1}
+    assert token_budget.get_token_limiter().get_stats()["tokens_today"] > 0
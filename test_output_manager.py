@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-pass workflow artifact writer
+"""
+
+import json
+import os
+
+import pytest
+
+from src.utils import output_manager
+from src.utils.output_manager import OutputManager, parse_artifacts
+
+CONTENTS = {
+    "workflow": {"name": "Test Workflow", "nodes": []},
+    "metadata": {"title": "Test Workflow"},
+    "analysis": "# Analysis",
+    "consolidated": {"workflow": {}, "analysis": "# Analysis"},
+    "readme": "# Test Workflow",
+}
+
+def test_atomic_write_leaves_no_partial_or_temp_files(tmp_path, monkeypatch):
+    """The final artifact replaces the streamed .partial; a failed write keeps the previous artifact."""
+    manager = OutputManager(output_dir=str(tmp_path))
+    partial = manager.partial_path("1234", "analysis")
+    with open(partial, "w", encoding="utf-8") as f:
+        f.write("# Analy")
+
+    result = manager.write("1234", CONTENTS)
+    folder = tmp_path / "1234"
+    assert sorted(os.listdir(folder)) == ["1234.json", "1234_analysis.txt", "1234_metadata.json", "README.md"]
+    assert json.loads((folder / "1234.json").read_text(encoding="utf-8")) == CONTENTS["workflow"]
+    assert result["analysis_file"] == str(folder / "1234_analysis.txt")
+
+    def failing_replace(source, target):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(output_manager.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        manager.write("1234", {**CONTENTS, "workflow": {"name": "Changed"}})
+    assert sorted(os.listdir(folder)) == ["1234.json", "1234_analysis.txt", "1234_metadata.json", "README.md"]
+    assert json.loads((folder / "1234.json").read_text(encoding="utf-8")) == CONTENTS["workflow"]
+
+def test_only_configured_artifacts_are_written(tmp_path):
+    """Artifacts outside the configured subset, or without content, are not written."""
+    manager = OutputManager(output_dir=str(tmp_path), artifacts="workflow,consolidated,analysis")
+    result = manager.write("1234", {**CONTENTS, "analysis": None})
+
+    assert sorted(os.listdir(tmp_path / "1234")) == ["1234.json", "1234_consolidated.json"]
+    assert set(result) == {"output_folder", "workflow_file", "consolidated_file"}
+    assert manager.partial_path("1234", "readme") is None
+
+def test_parse_artifacts():
+    """Names are split and trimmed; unknown names are rejected."""
+    assert parse_artifacts(" workflow, readme ,") == ("workflow", "readme")
+    assert parse_artifacts(["analysis"]) == ("analysis",)
+    with pytest.raises(ValueError, match="screenshot"):
+        parse_artifacts("workflow,screenshot")
+    with pytest.raises(ValueError):
+        OutputManager(mirror_artifacts="html")
+
+def test_mirror_hardlinks_and_falls_back_to_copy(tmp_path, monkeypatch):
+    """Mirrored artifacts are hardlinks of the written files, or copies where links fail."""
+    manager = OutputManager(output_dir=str(tmp_path / "out"), mirror_dir=str(tmp_path / "mirror"))
+    result = manager.write("1234", CONTENTS)
+
+    assert result["mirror_folder"] == str(tmp_path / "mirror" / "1234")
+    assert sorted(os.listdir(tmp_path / "mirror" / "1234")) == ["1234.json", "README.md"]
+    source = tmp_path / "out" / "1234" / "README.md"
+    mirrored = tmp_path / "mirror" / "1234" / "README.md"
+    assert os.path.samefile(source, mirrored)
+
+    def failing_link(source, target):
+        raise OSError("cross-device link")
+
+    monkeypatch.setattr(output_manager.os, "link", failing_link)
+    manager.write("1234", {**CONTENTS, "readme": "# Updated"})
+    assert not os.path.samefile(source, mirrored)
+    assert mirrored.read_text(encoding="utf-8") == "# Updated"
+    assert sorted(os.listdir(tmp_path / "mirror" / "1234")) == ["1234.json", "README.md"]
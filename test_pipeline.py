@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script for the staged workflow pipeline against local fixture pages and the OpenRouter stub
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+
+import benchmark_pipeline
+from src.processors import n8n_workflow_processor
+from src.processors.pipeline import WorkflowPipeline
+from src.utils import common, token_budget
+from src.utils.adaptive_processor import AdaptiveProcessor
+from src.utils.circuit_breaker import get_breaker
+from src.utils.config import get_settings
+from src.utils.model_router import parse_tiers
+from src.utils.openrouter_stub import start_stub_server
+from src.utils.output_manager import OutputManager
+from src.utils.smart_queue import SmartQueue
+from src.utils.workflow_manifest import WorkflowManifest
+
+WORKFLOWS = 4
+
+@pytest.fixture
+def workdir(monkeypatch, tmp_path):
+    """Run in a scratch directory with fresh manifest, budget, breakers and tracer."""
+    # Processors keep state in and load prompt templates from the working directory
+    monkeypatch.chdir(tmp_path)
+    os.symlink(os.path.join(REPO_ROOT, "cline_docs"), tmp_path / "cline_docs")
+    settings = get_settings()
+    monkeypatch.setattr(settings, "llm_budget_file", "")
+    monkeypatch.setattr(settings, "mirror_dir", "")
+    monkeypatch.setattr(token_budget, "_limiter", None)
+    monkeypatch.setattr(n8n_workflow_processor, "_manifest", WorkflowManifest(str(tmp_path / "manifest.json")))
+    yield tmp_path
+    benchmark_pipeline.reset_process_state()
+
+@contextlib.asynccontextmanager
+async def serve(monkeypatch, pages):
+    """Serve workflow pages and the OpenRouter stub; yields the stub."""
+    fixture_runner, n8n_base_url = await benchmark_pipeline.start_fixture_server(pages)
+    stub_runner, base_url, stub = await start_stub_server(port=0, profiles={"default": {"latency": "0.01"}})
+    monkeypatch.setattr(get_settings(), "n8n_base_url", n8n_base_url)
+    monkeypatch.setattr(common, "OPENROUTER_BASE_URL", base_url)
+    monkeypatch.setattr(common, "OPENROUTER_API_KEY", "stub")
+    try:
+        yield stub
+    finally:
+        await stub_runner.cleanup()
+        await fixture_runner.cleanup()
+
+async def drain(pipeline, workflow_ids, work_dir):
+    """Queue the workflows and run the pipeline until the queue is empty."""
+    queue = SmartQueue(queue_file=os.path.join(work_dir, "queue.json"),
+                       completed_file=os.path.join(work_dir, "completed.json"))
+    await queue.add_jobs([f"https://n8n.io/workflows/{workflow_id}" for workflow_id in workflow_ids])
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.wait_for(pipeline.process_queue(queue, drain=True), timeout=60)
+
+@pytest.mark.parametrize("analysis_batch_size", [1, 4])
+def test_drain_processes_and_then_skips_unchanged_workflows(monkeypatch, workdir, analysis_batch_size):
+    """Every workflow is repaired, analyzed and written; a second run skips them without LLM calls."""
+    fixtures = benchmark_pipeline.load_fixtures(os.path.join(REPO_ROOT, "workflows"))[:WORKFLOWS]
+    pages = {str(100000 + i): benchmark_pipeline.render_page(100000 + i, *fixture)
+             for i, fixture in enumerate(fixtures)}
+    manifest = n8n_workflow_processor.get_manifest()
+    tracer = benchmark_pipeline.reset_process_state()
+
+    async def run():
+        async with serve(monkeypatch, pages) as stub:
+            runs = []
+            for run_index in range(2):
+                work_dir = workdir / f"run-{run_index}"
+                work_dir.mkdir()
+                pipeline = WorkflowPipeline(fetchers=2, parsers=2, llm_workers=2, writers=1, poll_interval=0.05,
+                                            analysis_batch_size=analysis_batch_size,
+                                            output_manager=OutputManager(output_dir=str(work_dir / "output")))
+                await drain(pipeline, list(pages), str(work_dir))
+                runs.append((pipeline, sum(stub.stats.values())))
+                stub.stats.clear()
+            return runs
+
+    (first, first_requests), (second, second_requests) = asyncio.run(run())
+
+    assert first.stats["urls_succeeded"] == WORKFLOWS and first.stats["urls_failed"] == 0
+    assert first.stage_stats["llm"]["processed"] == WORKFLOWS
+    assert first.stage_stats["write"]["processed"] == WORKFLOWS
+    assert first_requests >= 1
+    # JSON repair ran on the LLM stage of this process, not in the parse worker processes
+    assert tracer.get_stats()["repair"]["count"] == WORKFLOWS
+    assert first.active_tasks == 0 and not first.running
+    for workflow_id in pages:
+        assert manifest.get_outputs(workflow_id)
+    assert any((workdir / "run-0" / "output").rglob("*"))
+
+    assert second.stats["urls_skipped"] == WORKFLOWS and second.stats["urls_succeeded"] == 0
+    assert second.stage_stats["llm"]["processed"] == 0
+    assert second_requests == 0
+
+# Truncated workflow JSON that only an LLM repair could fix
+BROKEN_WORKFLOW = '{"name": "Broken", "nodes": [{"name": "Start", "type": "n8n-nodes-base.start"} {"name": "Next"'
+
+def open_repair_breakers():
+    """Trip the circuit breakers of every repair tier model."""
+    for model in parse_tiers(get_settings().repair_model_tiers):
+        breaker = get_breaker(f"openrouter/{model}")
+        for _ in range(breaker.min_calls):
+            breaker.before_call()
+            breaker.record(False)
+
+@pytest.mark.parametrize("processor_class", [AdaptiveProcessor, WorkflowPipeline])
+def test_open_repair_breaker_requeues_instead_of_failing(monkeypatch, workdir, processor_class):
+    """A workflow whose repair hits an open breaker goes back to the queue and processing is held."""
+    # The batch processor module opens its log file under logs/ on import
+    (workdir / "logs").mkdir()
+    from src.processors.batch_workflow_processor import process_workflow_url
+
+    url = "https://n8n.io/workflows/100000"
+    pages = {"100000": benchmark_pipeline.render_page(100000, "Broken", "json", BROKEN_WORKFLOW)}
+    open_repair_breakers()
+
+    async def run():
+        async with serve(monkeypatch, pages) as stub:
+            queue = SmartQueue(queue_file=str(workdir / "queue.json"), completed_file=str(workdir / "completed.json"))
+            await queue.add_jobs([url])
+            if processor_class is WorkflowPipeline:
+                processor = WorkflowPipeline(fetchers=1, parsers=1, llm_workers=1, writers=1, parse_processes=False,
+                                             poll_interval=0.05)
+                task = asyncio.create_task(processor.process_queue(queue))
+            else:
+                processor = AdaptiveProcessor(initial_concurrency=1, max_concurrency=1)
+                task = asyncio.create_task(processor.process_queue(
+                    queue, lambda next_url: process_workflow_url(next_url, force=True)))
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(200):
+                    if processor.stats["urls_requeued"]:
+                        break
+                    await asyncio.sleep(0.05)
+            processor.stop()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return processor, queue, sum(stub.stats.values())
+
+    processor, queue, requests = asyncio.run(run())
+    assert processor.stats["urls_requeued"] == 1
+    assert processor.stats["urls_failed"] == 0 and processor.stats["urls_succeeded"] == 0
+    assert url not in queue.completed and url not in queue.failed and url not in queue.in_progress
+    assert processor.hold_reason.startswith("openrouter/") and processor.held_until > 0
+    assert requests == 0
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for the token-budgeted prompt builder
+"""
+
+from src.utils.prompt_builder import PromptBuilder, compact_workflow, render_sections
+
+WORKFLOW = {
+    "id": "42",
+    "name": "Sync",
+    "pinData": {"Trigger": [{"json": {"a": 1}}]},
+    "meta": {"instanceId": "abc"},
+    "nodes": [
+        {"id": "uuid-1", "name": "Trigger", "type": "n8n-nodes-base.webhook", "position": [0, 0],
+         "webhookId": "uuid-2", "typeVersion": 2, "parameters": {"path": "sync", "options": {}}},
+        {"id": "uuid-3", "name": "Query", "type": "n8n-nodes-base.postgres", "position": [200, 0],
+         "parameters": {"query": "select 1", "table": {"__rl": True, "mode": "list", "value": "users"}},
+         "credentials": {"postgres": {"id": "7", "name": "Prod DB"}}},
+        {"id": "uuid-4", "name": "Note", "type": "n8n-nodes-base.stickyNote", "position": [0, 200],
+         "parameters": {"content": "Runs nightly", "width": 300, "height": 200}},
+    ],
+    "connections": {"Trigger": {"main": [[{"node": "Query", "type": "main", "index": 0}]]}},
+}
+
+def test_compact_workflow_projection():
+    """IDs, layout, pinned data and credential IDs are dropped; edges and notes are kept."""
+    compact = compact_workflow(WORKFLOW)
+    assert compact == {
+        "name": "Sync",
+        "nodes": [
+            {"name": "Trigger", "type": "n8n-nodes-base.webhook", "parameters": {"path": "sync"}},
+            {"name": "Query", "type": "n8n-nodes-base.postgres",
+             "parameters": {"query": "select 1", "table": "users"}, "credentials": ["postgres"]},
+        ],
+        "edges": ["Trigger -> Query"],
+        "notes": ["Runs nightly"],
+    }
+
+def test_sections_and_budget():
+    """Node sections list each node once; long strings are shortened to fit the budget."""
+    template = "{{workflow_name}}\n{{#nodes}}\n- **{{name}}** ({{type}}):\n  - Purpose of {{name}}\n{{/nodes}}\n{{workflow_json}}"
+    rendered = render_sections(template, {"nodes": [{"name": "A", "type": "t"}, {"name": "B", "type": "t"}]})
+    assert rendered.count("Purpose of its name") == 1
+    assert "- **A** (t)\n- **B** (t)\n" in rendered
+
+    workflow = dict(WORKFLOW, nodes=WORKFLOW["nodes"] + [
+        {"name": "Code", "type": "n8n-nodes-base.code", "parameters": {"jsCode": "x" * 20000}}
+    ])
+    built = PromptBuilder(template, budget=1000).build(workflow)
+    assert built["fits"] and built["tokens"] <= 1000
+    assert built["reductions"] and "chars]" in built["prompt"]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for coalescing duplicate in-flight operations
+"""
+
+import asyncio
+import threading
+import time
+
+from src.utils.single_flight import SingleFlight, ThreadSingleFlight
+
+def test_async_calls_share_one_execution():
+    """Concurrent calls with the same key run once; a later call runs again."""
+    flight = SingleFlight("test")
+    runs = []
+
+    async def fetch(workflow_id):
+        runs.append(workflow_id)
+        await asyncio.sleep(0.05)
+        return {"id": workflow_id}
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("wf-1", fetch, "wf-1") for _ in range(5)),
+                                       flight.do("wf-2", fetch, "wf-2"))
+        again = await flight.do("wf-1", fetch, "wf-1")
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert results[:5] == [{"id": "wf-1"}] * 5
+    assert results[5] == {"id": "wf-2"}
+    assert again == {"id": "wf-1"}
+    assert runs == ["wf-1", "wf-2", "wf-1"]
+    assert flight.get_stats() == {"in_flight": 0, "executions": 3, "shared": 4}
+
+def test_thread_calls_share_result_and_error():
+    """Threads waiting on an in-flight call receive its result or exception."""
+    flight = ThreadSingleFlight("test")
+    started = threading.Event()
+    results, errors = [], []
+
+    def slow(value):
+        started.set()
+        time.sleep(0.1)
+        if value == "bad":
+            raise ValueError(value)
+        return value.upper()
+
+    def call(value):
+        try:
+            results.append(flight.do(value, slow, value))
+        except ValueError as e:
+            errors.append(str(e))
+
+    for value in ("ok", "bad"):
+        started.clear()
+        threads = [threading.Thread(target=call, args=(value,)) for _ in range(4)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert results == ["OK"] * 4
+    assert errors == ["bad"] * 4
+    assert flight.get_stats() == {"in_flight": 0, "executions": 2, "shared": 6}
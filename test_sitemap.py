@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming sitemap parser
+"""
+
+import gzip
+
+from src.utils.sitemap import SitemapParser, is_workflow_url
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://n8n.io/workflows/1-insert-excel-data-to-postgres/</loc></url>
+  <url><loc>https://n8n.io/workflows/2-send-slack-notifications/</loc></url>
+  <url><loc> https://n8n.io/workflows/3-write-http-query-string-on-image/ </loc></url>
+</urlset>"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://n8n.io/sitemap-workflows-1.xml.gz</loc></sitemap>
+  <sitemap><loc>https://n8n.io/sitemap-workflows-2.xml</loc></sitemap>
+</sitemapindex>"""
+
+def parse_in_chunks(data, chunk_size=7):
+    """Feed data through a fresh parser in small chunks."""
+    parser = SitemapParser()
+    entries = []
+    for i in range(0, len(data), chunk_size):
+        entries.extend(parser.feed(data[i:i + chunk_size]))
+    entries.extend(parser.close())
+    return parser, entries
+
+def test_urlset_chunked():
+    """Entries split across chunk boundaries are still parsed."""
+    parser, entries = parse_in_chunks(URLSET)
+    assert not parser.is_index
+    assert entries == [
+        ("url", "https://n8n.io/workflows/1-insert-excel-data-to-postgres/"),
+        ("url", "https://n8n.io/workflows/2-send-slack-notifications/"),
+        ("url", "https://n8n.io/workflows/3-write-http-query-string-on-image/"),
+    ]
+
+def test_gzip_sitemap():
+    """Gzip-compressed sitemaps are detected and decompressed."""
+    _, plain = parse_in_chunks(URLSET)
+    _, compressed = parse_in_chunks(gzip.compress(URLSET), chunk_size=1)
+    assert compressed == plain
+
+def test_sitemap_index():
+    """Sitemap indexes report nested sitemaps instead of page URLs."""
+    parser, entries = parse_in_chunks(SITEMAP_INDEX)
+    assert parser.is_index
+    assert [kind for kind, _ in entries] == ["sitemap", "sitemap"]
+    assert entries[0][1] == "https://n8n.io/sitemap-workflows-1.xml.gz"
+
+def test_is_workflow_url():
+    """Only workflow pages pass the filter used when queueing sitemap URLs."""
+    assert is_workflow_url("https://n8n.io/workflows/2-send-slack-notifications/")
+    assert not is_workflow_url("https://n8n.io/integrations/slack/")
+    assert not is_workflow_url("https://n8n.io/pricing/?ref=workflows/")
+
+if __name__ == "__main__":
+    test_urlset_chunked()
+    test_gzip_sitemap()
+    test_sitemap_index()
+    test_is_workflow_url()
+    print("✅ Sitemap parser tests passed!")
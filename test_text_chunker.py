@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the boundary-aware text chunker
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "python"))
+
+from text_chunker import TextChunker, extract_text, iter_html_blocks
+
+class WordEncoding:
+    """Offline stand-in for a tiktoken encoding: one token per word."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+SENTENCES = [f"Sentence {i} has exactly six words." for i in range(12)]
+
+def test_splits_on_sentence_boundaries():
+    """Chunks end where sentences end and stay within the token limit."""
+    chunker = TextChunker(WordEncoding(), chunk_size=20, overlap=7)
+    chunks = chunker.chunk_text(" ".join(SENTENCES))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk.split()) <= 20
+        assert chunk.startswith("Sentence ") and chunk.endswith(".")
+        # Every sentence of a chunk is whole
+        assert all(sentence + "." in SENTENCES for sentence in chunk[:-1].split(". "))
+    # Nothing is lost
+    assert set(SENTENCES) <= {s + "." for chunk in chunks for s in chunk[:-1].split(". ")}
+
+def test_overlap_tail_is_carried_into_the_next_chunk():
+    """The last sentence that fits the overlap budget starts the next chunk."""
+    chunker = TextChunker(WordEncoding(), chunk_size=20, overlap=7)
+    chunks = chunker.chunk_text(" ".join(SENTENCES))
+    for previous, current in zip(chunks, chunks[1:]):
+        tail = previous.rsplit(". ", 1)[-1]
+        assert current.startswith(tail[:-1])
+
+    # Without overlap no sentence is repeated
+    chunks = TextChunker(WordEncoding(), chunk_size=20, overlap=0).chunk_text(" ".join(SENTENCES))
+    assert sum(len(chunk.split()) for chunk in chunks) == 6 * len(SENTENCES)
+
+def test_oversized_sentence_is_split_into_token_windows():
+    """Text without any boundary still respects the token limit."""
+    chunker = TextChunker(WordEncoding(), chunk_size=10, overlap=2)
+    words = [f"w{i}" for i in range(35)]
+    chunks = chunker.chunk_text(" ".join(words))
+    assert all(len(chunk.split()) <= 10 for chunk in chunks)
+    assert [word for chunk in chunks for word in chunk.split() if word in words][:10] == words[:10]
+    assert set(words) <= {word for chunk in chunks for word in chunk.split()}
+
+def test_html_extraction_skips_scripts_and_styles():
+    """Script, style and head content is dropped; block elements become separate lines."""
+    html = ("<html><head><title>Hidden</title><style>p { color: red; }</style></head><body>"
+            "<script>var secret = 1;</script><h1>Title</h1><p>First  paragraph\n text.</p>"
+            "<div>Second <b>block</b></div><noscript>Enable JS</noscript></body></html>")
+    assert extract_text(html) == "Title\nFirst paragraph text.\nSecond block"
+
+    # HTML split at arbitrary points (file reads) yields the same blocks
+    pieces = [html[i:i + 7] for i in range(0, len(html), 7)]
+    assert list(iter_html_blocks(pieces)) == ["Title", "First paragraph text.", "Second block"]
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM token and cost budget
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils import common, token_budget
+from src.utils.token_budget import BudgetExceededError, TokenLimiter
+
+def test_reservation_is_reconciled_with_usage(tmp_path):
+    """Settled requests count their reported usage; released ones give their tokens back."""
+    state_file = tmp_path / "budget.json"
+    limiter = TokenLimiter(daily_tokens=10000, state_file=str(state_file))
+
+    reservation = limiter.reserve("openai/gpt-4o-mini", 500, 1000)
+    assert limiter.get_stats()["tokens_remaining"] == 8500
+    reservation.settle({"prompt_tokens": 480, "completion_tokens": 120, "cost": 0.002})
+    limiter.reserve("openai/gpt-4o-mini", 500, 1000).release()
+
+    stats = limiter.get_stats()
+    assert stats["tokens_today"] == 600
+    assert stats["cost_today"] == 0.002
+    assert stats["tokens_remaining"] == 9400 and stats["in_flight_tokens"] == 0
+
+    # Today's spend survives a restart
+    assert TokenLimiter(daily_tokens=10000, state_file=str(state_file)).get_stats()["tokens_today"] == 600
+
+def test_daily_caps():
+    """A request over the daily token or cost cap is refused until the budget resets."""
+    limiter = TokenLimiter(daily_tokens=1000)
+    limiter.reserve("openai/gpt-4o-mini", 200, 500).settle()
+    with pytest.raises(BudgetExceededError) as error:
+        limiter.reserve("openai/gpt-4o-mini", 200, 500)
+    assert 0 < error.value.retry_after <= 86400
+
+    limiter = TokenLimiter(daily_cost=0.01)
+    with pytest.raises(BudgetExceededError):
+        limiter.reserve("openai/gpt-4-turbo", 1000, 1000)
+
+def test_tokens_per_minute_waits_for_capacity(monkeypatch):
+    """A reservation that does not fit the rolling minute waits until older ones expire."""
+    monkeypatch.setattr(token_budget, "WINDOW_SECONDS", 0.2)
+    limiter = TokenLimiter(tokens_per_minute=1000)
+    limiter.reserve("m", 300, 500).settle()
+
+    start = time.perf_counter()
+    limiter.reserve("m", 300, 500)
+    assert time.perf_counter() - start >= 0.15
+
+    # Settling below the reservation frees capacity for waiting requests
+    limiter = TokenLimiter(tokens_per_minute=1000)
+    first = limiter.reserve("m", 300, 500)
+    threading.Timer(0.05, first.settle, [{"prompt_tokens": 100, "completion_tokens": 50}]).start()
+    start = time.perf_counter()
+    limiter.reserve("m", 300, 500)
+    assert time.perf_counter() - start < 0.15
+
+def test_spent_budget_is_raised_from_json_repair(monkeypatch):
+    """fix_json_with_llm lets BudgetExceededError through so the workflow is held, not failed."""
+    limiter = TokenLimiter(daily_tokens=1000)
+    limiter.reserve("openai/gpt-4o-mini", 600, 400).settle()
+    monkeypatch.setattr(token_budget, "_limiter", limiter)
+    monkeypatch.setattr(common, "OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(common, "OPENROUTER_BASE_URL", "http://127.0.0.1:9")
+
+    with pytest.raises(BudgetExceededError) as error:
+        common.fix_json_with_llm('{"nodes": [{"name": "Start"} {"name": "Next"')
+    assert error.value.upstream == "llm_budget" and error.value.retry_after > 0
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for pipeline tracing spans, percentiles and OTLP export
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.utils.tracing import Tracer, current_span, percentile
+
+def test_spans_nest_across_tasks():
+    """Child spans take the trace and parent of the span active in their context."""
+    tracer = Tracer()
+
+    async def child(name):
+        await asyncio.sleep(0)
+        with tracer.span(name) as span:
+            return span
+
+    async def run():
+        with tracer.span("root") as root:
+            first, second = await asyncio.gather(child("a"), child("b"))
+        return root, first, second
+
+    root, first, second = asyncio.run(run())
+    assert root.parent_id is None
+    for span in (first, second):
+        assert span.trace_id == root.trace_id
+        assert span.parent_id == root.span_id
+    assert first.span_id != second.span_id
+    assert current_span() is None
+
+    # Separate roots start separate traces
+    with tracer.span("other") as other:
+        assert current_span() is other
+    assert other.trace_id != root.trace_id
+
+def test_nearest_rank_percentiles():
+    """Percentiles pick the value at rank ceil(n * p / 100)."""
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 90) == 9
+    assert percentile(values, 95) == 10
+    assert percentile(values, 99) == 10
+    assert percentile([7], 50) == 7
+    assert percentile([], 50) is None
+
+    tracer = Tracer(window=4)
+    for duration in (9.0, 1.0, 2.0, 3.0, 4.0):
+        with tracer.span("stage"):
+            pass
+        tracer.durations["stage"][-1] = duration
+    stats = tracer.get_stats()["stage"]
+    # The oldest duration fell out of the window, but the count keeps it
+    assert stats["count"] == 5
+    assert (stats["p50"], stats["p99"], stats["mean"]) == (2.0, 4.0, 2.5)
+
+def test_otlp_export_lines(tmp_path):
+    """Every finished span is written as one OTLP/JSON resourceSpans line."""
+    trace_file = tmp_path / "traces" / "spans.jsonl"
+    tracer = Tracer(service_name="test-service", trace_file=str(trace_file))
+
+    with tracer.span("fetch", url="https://n8n.io/workflows/1", size=2048, cached=False):
+        pass
+    with pytest.raises(ValueError):
+        with tracer.span("parse"):
+            raise ValueError("bad json")
+
+    lines = trace_file.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    records = [json.loads(line) for line in lines]
+
+    resource_spans = records[0]["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": "test-service"}}]
+    fetch = resource_spans["scopeSpans"][0]["spans"][0]
+    assert fetch["name"] == "fetch" and fetch["status"] == {"code": 1}
+    assert len(fetch["traceId"]) == 32 and len(fetch["spanId"]) == 16
+    assert "parentSpanId" not in fetch
+    assert int(fetch["endTimeUnixNano"]) >= int(fetch["startTimeUnixNano"])
+    assert fetch["attributes"] == [
+        {"key": "url", "value": {"stringValue": "https://n8n.io/workflows/1"}},
+        {"key": "size", "value": {"intValue": "2048"}},
+        {"key": "cached", "value": {"boolValue": False}},
+    ]
+
+    parse = records[1]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert parse["status"] == {"code": 2, "message": "ValueError: bad json"}
+    assert tracer.get_stats()["parse"]["errors"] == 1
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test script for the local vector index backends
+"""
+
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "python"))
+
+from vector_index import HnswVectorIndex, NumpyVectorIndex, VectorIndex, _LocalVectorIndex, hnswlib
+
+BACKENDS = [
+    NumpyVectorIndex,
+    pytest.param(HnswVectorIndex, marks=pytest.mark.skipif(hnswlib is None, reason="hnswlib not installed")),
+]
+
+def embedding(seed, dim=16):
+    """Deterministic random embedding."""
+    return np.random.default_rng(seed).random(dim).tolist()
+
+def document(url, seeds):
+    """Chunk rows of one page, one per embedding seed."""
+    return [{"url": url, "chunk_index": i, "content": f"{url} #{seed}", "embedding": embedding(seed),
+             "metadata": {"seed": seed}} for i, seed in enumerate(seeds)]
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_recrawl_replaces_chunks_and_survives_reopen(backend, tmp_path):
+    """Re-adding a page replaces its chunks; searches never ask for more than the live rows."""
+    path = str(tmp_path / "index")
+    index = backend(path)
+    index.add(document("https://a", [1, 2, 3]))
+    index.add(document("https://b", [4]))
+
+    results = index.search(embedding(2), limit=10, threshold=-1)
+    assert len(results) == 4
+    assert results[0]["content"] == "https://a #2" and results[0]["similarity"] > 0.99
+
+    # Recrawl of a: its three old chunks are replaced by two new ones
+    index.add(document("https://a", [5, 6]))
+    assert index.count() == 3
+    results = index.search(embedding(6), limit=10, threshold=-1)
+    assert sorted(row["content"] for row in results) == ["https://a #5", "https://a #6", "https://b #4"]
+    assert results[0]["content"] == "https://a #6"
+    index.close()
+
+    reopened = backend(path)
+    assert reopened.count() == 3
+    results = reopened.search(embedding(5), limit=10, threshold=-1)
+    assert len(results) == 3 and results[0]["content"] == "https://a #5"
+    assert results[0]["metadata"] == {"seed": 5}
+    reopened.close()
+
+@pytest.mark.skipif(hnswlib is None, reason="hnswlib not installed")
+def test_hnsw_saves_periodically_and_on_close(tmp_path):
+    """The graph is written every save_every adds and on close, not on every add."""
+    path = str(tmp_path / "index")
+    index = HnswVectorIndex(path, save_every=2)
+    index_file = os.path.join(path, "hnsw.bin")
+    index.add(document("https://a", [1]))
+    assert not os.path.exists(index_file)
+    index.add(document("https://b", [2]))
+    assert os.path.exists(index_file)
+
+    # Rows added after the last save are dropped on reopen if the process dies without close()
+    index.add(document("https://c", [3]))
+    index.add(document("https://a", [4]))
+    index.add(document("https://d", [5]))
+    crashed = HnswVectorIndex(path)
+    assert crashed.count() == 3
+    results = crashed.search(embedding(5), limit=10, threshold=-1)
+    assert sorted(row["content"] for row in results) == ["https://a #4", "https://b #2", "https://c #3"]
+    crashed.close()
+    index.conn.close()
+
+class FailingCommit:
+    """SQLite connection whose next commit raises, as if the process died before it."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def commit(self):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+def crash_after_vector_write(index, seeds):
+    """Persist vectors for rows that are never committed, like a crash between the two writes."""
+    vectors = index._normalize([embedding(seed) for seed in seeds])
+    index._add_vectors(index.size, vectors, [])
+    if isinstance(index, HnswVectorIndex):
+        index._save()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_failed_commit_discards_the_written_vectors(backend, tmp_path):
+    """An add whose rows fail to commit leaves no vectors behind and replaces nothing."""
+    path = str(tmp_path / "index")
+    index = backend(path)
+    index.add(document("https://a", [1, 2]))
+
+    index.conn = FailingCommit(index.conn)
+    with pytest.raises(sqlite3.OperationalError):
+        index.add(document("https://a", [3]) + document("https://b", [4]))
+    index.conn = index.conn.conn
+
+    assert index.count() == 2
+    results = index.search(embedding(2), limit=10, threshold=-1)
+    assert [row["content"] for row in results] == ["https://a #2", "https://a #1"]
+    assert results[0]["similarity"] > 0.99
+
+    index.add(document("https://b", [5]))
+    index.close()
+    reopened = backend(path)
+    assert reopened.count() == 3
+    results = reopened.search(embedding(5), limit=10, threshold=-1)
+    assert results[0]["content"] == "https://b #5" and results[0]["similarity"] > 0.99
+    reopened.close()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_reopen_after_partial_write(backend, tmp_path):
+    """Vectors written without their rows are dropped on open and later rows keep their own vectors."""
+    path = str(tmp_path / "index")
+    index = backend(path)
+    index.add(document("https://a", [1, 2]))
+    index.close()
+    crash_after_vector_write(backend(path), [9])
+
+    reopened = backend(path)
+    assert reopened.count() == 2
+    reopened.add(document("https://b", [3]))
+    for seed, content in ((1, "https://a #1"), (3, "https://b #3")):
+        results = reopened.search(embedding(seed), limit=10, threshold=-1)
+        assert results[0]["content"] == content and results[0]["similarity"] > 0.99
+    assert len(reopened.search(embedding(9), limit=10, threshold=-1)) == 3
+    reopened.close()
+
+def test_numpy_missing_vectors_deactivate_their_rows(tmp_path):
+    """Rows whose vectors were cut off the file are dropped from search instead of misaligning it."""
+    path = str(tmp_path / "index")
+    index = NumpyVectorIndex(path)
+    index.add(document("https://a", [1, 2, 3]))
+    index.close()
+    vectors_file = os.path.join(path, "vectors.f32")
+    os.truncate(vectors_file, os.path.getsize(vectors_file) - 4 * 16)
+
+    reopened = NumpyVectorIndex(path)
+    assert reopened.count() == 2
+    assert os.path.getsize(vectors_file) == 3 * 4 * 16
+    results = reopened.search(embedding(2), limit=10, threshold=-1)
+    assert [row["content"] for row in results][0] == "https://a #2" and len(results) == 2
+    reopened.close()
+
+def test_incomplete_backends_fail_on_creation(tmp_path):
+    """Backends missing an interface method cannot be instantiated."""
+    class NoSearch(VectorIndex):
+        def add(self, rows):
+            return len(rows)
+
+        def count(self):
+            return 0
+
+    class NoVectors(_LocalVectorIndex):
+        def search(self, query_embedding, limit=5, threshold=0.5):
+            return []
+
+    with pytest.raises(TypeError, match="search"):
+        NoSearch()
+    with pytest.raises(TypeError, match="_add_vectors"):
+        NoVectors(str(tmp_path / "index"))
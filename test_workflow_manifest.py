@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the skip-unchanged workflow manifest
+"""
+
+import json
+import os
+import threading
+
+from src.utils.workflow_manifest import WorkflowManifest, canonical_workflow_hash
+
+WORKFLOW = {"name": "Test Workflow", "nodes": [{"name": "Node1", "type": "TestType"}], "connections": {}}
+
+def test_canonical_hash_ignores_key_order():
+    """Key order and whitespace do not change the hash."""
+    reordered = {"connections": {}, "nodes": [{"type": "TestType", "name": "Node1"}], "name": "Test Workflow"}
+    assert canonical_workflow_hash(WORKFLOW) == canonical_workflow_hash(reordered)
+    assert canonical_workflow_hash(WORKFLOW) != canonical_workflow_hash({**WORKFLOW, "name": "Other"})
+
+def test_raw_attribute_hash():
+    """The raw page attribute hashes like the parsed workflow, and malformed text is hashed as is."""
+    assert canonical_workflow_hash(json.dumps(WORKFLOW, indent=2)) == canonical_workflow_hash(WORKFLOW)
+    malformed = '{"name": "Test Workflow", "nodes": [{"name": "Node1"}'
+    assert canonical_workflow_hash(malformed) == canonical_workflow_hash(f"  {malformed}\n")
+    assert canonical_workflow_hash(malformed) != canonical_workflow_hash(malformed + "]}")
+
+def test_manifest_round_trip(tmp_path):
+    """Recorded runs are skipped until the workflow, model or outputs change."""
+    manifest_file = str(tmp_path / "db" / "workflow_manifest.json")
+    output_folder = tmp_path / "1234-test"
+    output_folder.mkdir()
+
+    manifest = WorkflowManifest(manifest_file)
+    fingerprint = WorkflowManifest.fingerprint(WORKFLOW, "openai/gpt-3.5-turbo")
+    assert not manifest.is_unchanged("1234-test", fingerprint)
+
+    manifest.record("1234-test", fingerprint, {"output_folder": str(output_folder)})
+    manifest.flush()
+
+    # A fresh instance reads the persisted manifest
+    reloaded = WorkflowManifest(manifest_file)
+    assert reloaded.is_unchanged("1234-test", fingerprint)
+    assert not reloaded.is_unchanged("1234-test", WorkflowManifest.fingerprint(WORKFLOW, "openai/gpt-4-turbo"))
+
+    os.rmdir(output_folder)
+    assert not reloaded.is_unchanged("1234-test", fingerprint)
+
+def test_concurrent_records_are_batched(tmp_path):
+    """Records from many threads all reach the file, written every flush_every records."""
+    manifest_file = str(tmp_path / "workflow_manifest.json")
+    manifest = WorkflowManifest(manifest_file, flush_every=10, flush_interval=3600)
+    fingerprint = WorkflowManifest.fingerprint(WORKFLOW, "openai/gpt-3.5-turbo")
+
+    def record(start):
+        for i in range(start, start + 25):
+            manifest.record(str(i), fingerprint, {})
+
+    threads = [threading.Thread(target=record, args=(start,)) for start in range(0, 100, 25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(manifest_file, encoding="utf-8") as f:
+        assert len(json.load(f)) == 100
+    manifest.record("100", fingerprint, {})
+    assert len(WorkflowManifest(manifest_file).entries) == 100
+    manifest.flush()
+    assert len(WorkflowManifest(manifest_file).entries) == 101
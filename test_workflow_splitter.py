@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Test script for splitting large workflows into connected parts
+"""
+
+from src.utils.workflow_splitter import connected_components, split_workflow
+
+def chain(prefix, length):
+    """Build the nodes and connections of a linear chain of nodes."""
+    nodes = [{"name": f"{prefix}{i}", "type": "n8n-nodes-base.set"} for i in range(length)]
+    connections = {
+        f"{prefix}{i}": {"main": [[{"node": f"{prefix}{i + 1}", "type": "main", "index": 0}]]}
+        for i in range(length - 1)
+    }
+    return nodes, connections
+
+def test_split_follows_connections():
+    """Chains stay together, oversized chains are cut and small groups are packed."""
+    a_nodes, a_connections = chain("A", 5)
+    b_nodes, b_connections = chain("B", 2)
+    workflow = {
+        "name": "Big",
+        "nodes": a_nodes + b_nodes + [{"name": "Note", "type": "n8n-nodes-base.stickyNote"}],
+        "connections": {**a_connections, **b_connections},
+    }
+
+    assert connected_components(workflow) == [["A0", "A1", "A2", "A3", "A4"], ["B0", "B1"]]
+
+    parts = split_workflow(workflow, max_nodes=3)
+    assert [[node["name"] for node in part["nodes"]] for part in parts] == [
+        ["A0", "A1", "A2"], ["A3", "A4"], ["B0", "B1"]
+    ]
+    assert parts[0]["external_edges"] == ["A2 -> A3"]
+    assert parts[1]["external_edges"] == ["A2 -> A3"]
+    assert parts[0]["connections"]["A2"] == {"main": [[]]}
+    assert parts[2]["external_edges"] == []
+    assert parts[0]["name"] == "Big (part 1/3)"